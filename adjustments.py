@@ -0,0 +1,200 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+
+def base_code(symbol: str) -> str:
+    return symbol.split('.')[0]
+
+
+def codes_by_ticker(codes: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Groups split calendar codes (e.g. 'VOD.US', 'VOD.LSE') by their bare ticker.
+    """
+    grouped = {}
+    for code in sorted(codes):
+        grouped.setdefault(base_code(code), []).append(code)
+    return grouped
+
+
+def split_code(symbol: str, grouped_codes: Dict[str, List[str]]) -> Optional[str]:
+    """
+    Returns the split calendar code whose splits apply to a symbol.
+    Exchange-qualified symbols only match their own code, so the splits of XYZ.US are never
+    applied to XYZ.LSE. Unqualified symbols fall back to the code with the same ticker,
+    preferring the US listing EODHD resolves them to.
+
+    :param symbol: Symbol of the bars, e.g. 'AAPL' or 'VOD.LSE'
+    :param grouped_codes: Output of codes_by_ticker
+    :return: Matching code, or None if no split applies
+    """
+    candidates = grouped_codes.get(base_code(symbol), [])
+    if symbol in candidates:
+        return symbol
+    if '.' in symbol:
+        return None
+    if f"{symbol}.US" in candidates:
+        return f"{symbol}.US"
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def split_ratios(splits: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes split calendar records to one row per (code, split_date) with the
+    share ratio new_shares / old_shares.
+
+    :param splits: Records of ipos_splits.splits
+    :return: DataFrame with the calendar 'code', 'split_date' (datetime64) and 'ratio', sorted by code and date
+    """
+    if splits is None or len(splits) == 0:
+        return pd.DataFrame({'code': pd.Series(dtype=object), 'split_date': pd.Series(dtype='datetime64[ns]'),
+                             'ratio': pd.Series(dtype=float)})
+    frame = pd.DataFrame({
+        'code': splits['code'],
+        'split_date': pd.to_datetime(splits['split_date']),
+        'ratio': pd.to_numeric(splits['new_shares']) / pd.to_numeric(splits['old_shares'])
+    })
+    frame = frame[np.isfinite(frame['ratio']) & (frame['ratio'] > 0)]
+    return frame.drop_duplicates(['code', 'split_date'], keep='last').sort_values(['code', 'split_date'], ignore_index=True)
+
+
+def adjustment_factors(dates: np.ndarray, split_dates: np.ndarray, ratios: np.ndarray) -> np.ndarray:
+    """
+    Returns the cumulative price adjustment factor of every date: the product of
+    1 / ratio over all splits that take effect after that date.
+
+    :param dates: Bar dates (datetime64)
+    :param split_dates: Split dates (datetime64), ascending
+    :param ratios: Share ratio of every split
+    :return: Factors aligned with dates; prices are multiplied and volumes divided by them
+    """
+    # suffix[i] is the factor of a bar that precedes splits i..n-1
+    suffix = np.append(np.cumprod((1.0 / np.asarray(ratios, dtype=float))[::-1])[::-1], 1.0)
+    return suffix[np.searchsorted(split_dates, dates, side='right')]
+
+
+def adjust_bars(bars: pd.DataFrame, splits: pd.DataFrame) -> pd.DataFrame:
+    """
+    Materializes split-adjusted OHLCV for all symbols of a long-format frame.
+
+    :param bars: Raw bars with 'symbol', 'date' and OHLCV columns
+    :param splits: Output of split_ratios
+    :return: Adjusted bars with a 'factor' column
+    """
+    adjusted = bars.copy()
+    adjusted['date'] = pd.to_datetime(adjusted['date'])
+    factors = np.ones(len(adjusted))
+    splits_by_code = {code: group for code, group in splits.groupby('code')}
+    grouped_codes = codes_by_ticker(splits_by_code)
+    symbols = adjusted['symbol'].to_numpy()
+    # Only symbols with splits need work; every other bar keeps a factor of 1
+    for symbol in adjusted['symbol'].unique():
+        code = split_code(symbol, grouped_codes)
+        if code is None:
+            continue
+        mask = symbols == symbol
+        symbol_splits = splits_by_code[code]
+        factors[mask] = adjustment_factors(
+            adjusted['date'].to_numpy()[mask], symbol_splits['split_date'].to_numpy(), symbol_splits['ratio'].to_numpy()
+        )
+    for field in PRICE_FIELDS:
+        if field in adjusted:
+            adjusted[field] = adjusted[field] * factors
+    if 'volume' in adjusted:
+        adjusted['volume'] = np.rint(adjusted['volume'] / factors).astype('int64')
+    adjusted['factor'] = factors
+    return adjusted
+
+
+class AdjustmentEngine:
+    """
+    Incrementally materializes split-adjusted bars into the adjusted_data database.
+    The splits applied to every symbol and its last adjusted date are kept in
+    adjustments.state, so a run only recomputes:
+      - bars before a split that is new or changed (their factor changed), and
+      - bars stored after the last adjusted date.
+    """
+
+    def __init__(self, mongo_client):
+        """
+        Initialize the AdjustmentEngine.
+
+        :param mongo_client: EodhdMongoClient with the raw bars and the splits calendar
+        """
+        self.__client = mongo_client
+        self.__state = mongo_client['adjustments']['state']
+
+    def _load_state(self, symbols: List[str]) -> Dict[str, dict]:
+        return {state['_id']: state for state in self.__state.find({'_id': {'$in': symbols}})}
+
+    @staticmethod
+    def _signature(symbol_splits: pd.DataFrame) -> List[list]:
+        # Lists rather than tuples, so the signature compares equal to the one read back from MongoDB
+        return [
+            [split_date.strftime('%Y-%m-%d'), float(ratio)]
+            for split_date, ratio in zip(symbol_splits['split_date'], symbol_splits['ratio'])
+        ]
+
+    @staticmethod
+    def _dirty_before(previous: Iterable, current: Iterable):
+        # Latest split date whose presence or ratio changed; bars before it need new factors
+        changed = set(map(tuple, previous or [])) ^ set(map(tuple, current))
+        return max(split_date for split_date, _ in changed) if changed else None
+
+    def run(self, symbols: List[str] = None) -> Dict[str, int]:
+        """
+        Brings the adjusted bars of the symbols up to date.
+
+        :param symbols: Symbols to adjust; defaults to all symbols with stored history
+        :return: Dictionary mapping symbol to the number of adjusted bars written
+        """
+        if symbols is None:
+            symbols = self.__client.symbols_with_history()
+        splits = split_ratios(self.__client.get_calendar_window('splits', output='frame'))
+        splits_by_code = {code: group for code, group in splits.groupby('code')}
+        grouped_codes = codes_by_ticker(splits_by_code)
+        states = self._load_state(list(symbols))
+
+        written = {}
+        for symbol in symbols:
+            code = split_code(symbol, grouped_codes)
+            symbol_splits = splits_by_code[code] if code else splits.iloc[0:0]
+            signature = self._signature(symbol_splits)
+            state = states.get(symbol, {})
+            last_date = state.get('last_date')
+
+            if not state:
+                ranges = [(None, None)]
+            else:
+                ranges = []
+                dirty_before = self._dirty_before(state.get('splits'), signature)
+                if dirty_before:
+                    ranges.append((None, (date.fromisoformat(dirty_before) - timedelta(days=1)).isoformat()))
+                ranges.append(((date.fromisoformat(last_date) + timedelta(days=1)).isoformat() if last_date else None, None))
+
+            count, latest = 0, last_date
+            for from_date, to_date in ranges:
+                bars = self.__client.get_historical_range([symbol], from_date=from_date, to_date=to_date)
+                if bars.empty:
+                    continue
+                adjusted = adjust_bars(bars, symbol_splits).drop(columns=['symbol'])
+                count += self.__client.store_adjusted_data(symbol, adjusted)
+                batch_latest = adjusted['date'].max().strftime('%Y-%m-%d')
+                latest = max(latest, batch_latest) if latest else batch_latest
+
+            if count or state.get('splits') != signature:
+                self.__state.replace_one(
+                    {'_id': symbol}, {'splits': signature, 'last_date': latest}, upsert=True
+                )
+            if count:
+                written[symbol] = count
+        logger.info(f"Adjusted bars written for {len(written)} of {len(symbols)} symbols")
+        return written
@@ -0,0 +1,186 @@
+"""
+Vectorized analytics over stored EODHD data.
+
+All functions take long-format DataFrames with one row per (symbol, date),
+as returned by EodhdMongoClient.get_historical_range, get_latest_news and
+get_calendar_window, and process all symbols at once.
+
+Usage:
+    bars = client.get_historical_range(symbols, from_date='2020-01-01')
+    prices = to_wide(bars, 'adjusted_close')
+    volatility = rolling_volatility(returns(prices), window=21)
+    report = data_quality_report(bars)
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def row_hashes(frame: pd.DataFrame, columns: Iterable[str] = None) -> pd.Series:
+    """
+    Returns a 64-bit hash per row over the given columns.
+
+    :param frame: DataFrame to hash
+    :param columns: Columns that make up the key; defaults to all columns
+    :return: Series of uint64 hashes aligned with frame
+    """
+    subset = frame[list(columns)] if columns is not None else frame
+    try:
+        return pd.util.hash_pandas_object(subset, index=False)
+    except TypeError:
+        # Nested values (lists, dicts) are not hashable by pandas, so object columns are hashed by their text
+        subset = subset.apply(lambda column: column.map(repr) if column.dtype == object else column)
+        return pd.util.hash_pandas_object(subset, index=False)
+
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """
+    Lower-cases text and collapses punctuation and whitespace, so that
+    near-identical titles share a key.
+    """
+    return values.fillna('').astype(str).str.lower().str.replace(r'\W+', ' ', regex=True).str.strip()
+
+
+def find_duplicates(
+    frame: pd.DataFrame,
+    key_columns: Iterable[str] = None,
+    text_columns: Iterable[str] = ()
+) -> pd.DataFrame:
+    """
+    Finds duplicate rows by hashed keys.
+    Exact duplicates hash all key columns as stored; near duplicates hash the
+    key columns with text_columns normalized by normalize_text.
+
+    :param frame: Records to check (e.g. news articles or earnings)
+    :param key_columns: Columns identifying a record; defaults to all columns
+    :param text_columns: Key columns compared after normalization
+    :return: The duplicated rows with 'duplicate_group' (shared hash) and 'duplicate_count' columns
+    """
+    key_columns = list(key_columns) if key_columns is not None else list(frame.columns)
+    keys = frame[key_columns].copy()
+    for column in text_columns:
+        keys[column] = normalize_text(keys[column])
+    hashes = row_hashes(keys)
+    counts = hashes.map(hashes.value_counts())
+    duplicated = counts > 1
+    result = frame[duplicated].copy()
+    result['duplicate_group'] = hashes[duplicated]
+    result['duplicate_count'] = counts[duplicated]
+    return result.sort_values('duplicate_group', kind='stable')
+
+
+def to_wide(frame: pd.DataFrame, field: str = 'adjusted_close') -> pd.DataFrame:
+    """
+    Pivots long-format bars into a date x symbol matrix of one field.
+    Duplicate (symbol, date) rows keep their last value.
+    """
+    bars = frame.drop_duplicates(['symbol', 'date'], keep='last')
+    return bars.pivot(index='date', columns='symbol', values=field).sort_index()
+
+
+def returns(prices: pd.DataFrame, log: bool = False) -> pd.DataFrame:
+    """
+    Returns simple or log returns of a date x symbol price matrix.
+    """
+    if log:
+        return np.log(prices).diff()
+    return prices.pct_change(fill_method=None)
+
+
+def rolling_volatility(
+    returns_wide: pd.DataFrame, window: int = 21, annualize: bool = True, min_periods: int = None
+) -> pd.DataFrame:
+    """
+    Returns the rolling standard deviation of a date x symbol return matrix.
+
+    :param returns_wide: Matrix of returns
+    :param window: Window length in rows (trading days)
+    :param annualize: Scale by the square root of TRADING_DAYS_PER_YEAR
+    :param min_periods: Minimum number of returns per window; defaults to window
+    """
+    volatility = returns_wide.rolling(window, min_periods=min_periods or window).std()
+    return volatility * np.sqrt(TRADING_DAYS_PER_YEAR) if annualize else volatility
+
+
+def cross_sectional_ranks(wide: pd.DataFrame, pct: bool = True, ascending: bool = True) -> pd.DataFrame:
+    """
+    Ranks symbols against each other on every date; missing values stay missing.
+    """
+    return wide.rank(axis=1, pct=pct, ascending=ascending)
+
+
+def data_quality_report(frame: pd.DataFrame, calendar: Iterable = None) -> pd.DataFrame:
+    """
+    Reports gaps and duplicate dates of every symbol.
+    Gaps are counted against a trading calendar: by default the union of the
+    dates of all symbols in frame, which skips market holidays.
+
+    :param frame: Long-format bars with 'symbol' and 'date' columns
+    :param calendar: Optional explicit trading dates
+    :return: One row per symbol with rows, duplicate_dates, first_date, last_date,
+             expected_dates, missing_dates and max_gap_days
+    """
+    dates = pd.to_datetime(frame['date'])
+    symbols = frame['symbol']
+    calendar = np.unique(pd.to_datetime(pd.Series(calendar)).to_numpy() if calendar is not None else dates.to_numpy())
+
+    rows = symbols.value_counts()
+    unique = pd.DataFrame({'symbol': symbols, 'date': dates}).drop_duplicates()
+    grouped = unique.groupby('symbol')['date']
+    first, last, present = grouped.min(), grouped.max(), grouped.size()
+
+    # Expected dates are the calendar dates between the first and last bar of every symbol
+    expected = (
+        np.searchsorted(calendar, last.to_numpy(), side='right')
+        - np.searchsorted(calendar, first.to_numpy(), side='left')
+    )
+    ordered = unique.sort_values(['symbol', 'date'])
+    gaps = ordered.groupby('symbol')['date'].diff().dt.days
+    max_gap = gaps.groupby(ordered['symbol']).max()
+
+    report = pd.DataFrame({
+        'rows': rows,
+        'duplicate_dates': rows - present,
+        'first_date': first,
+        'last_date': last,
+        'expected_dates': pd.Series(expected, index=first.index),
+        'missing_dates': pd.Series(expected, index=first.index) - present,
+        'max_gap_days': max_gap.fillna(0).astype(int)
+    })
+    report.index.name = 'symbol'
+    return report.sort_index()
+
+
+def split_by_symbol(frame: pd.DataFrame, parts: int) -> List[pd.DataFrame]:
+    """
+    Splits a long-format frame into parts with disjoint symbols.
+    """
+    symbols = np.array_split(frame['symbol'].unique(), parts)
+    return [frame[frame['symbol'].isin(chunk)] for chunk in symbols if len(chunk)]
+
+
+def map_symbols(func: Callable[[pd.DataFrame], pd.DataFrame], frame: pd.DataFrame, processes: int = None) -> pd.DataFrame:
+    """
+    Applies a per-symbol function to disjoint symbol chunks in a process pool and concatenates the results.
+    func must be picklable (a module-level function or a functools.partial of one). Functions that
+    compare symbols against each other (such as cross_sectional_ranks) need the whole frame, and
+    data_quality_report should get an explicit calendar so every chunk uses the same trading dates.
+
+    :param func: Function taking and returning a DataFrame (e.g. data_quality_report)
+    :param frame: Long-format data with a 'symbol' column
+    :param processes: Number of worker processes; 1 runs in this process
+    """
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        return func(frame)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return pd.concat(pool.map(func, split_by_symbol(frame, processes)))
@@ -1,34 +1,167 @@
 import asyncio
-from aiohttp import ClientSession, ClientError, ClientResponseError, ClientConnectorError
+import contextlib
+from aiohttp import ClientSession, ClientError, ClientResponseError, ClientConnectorError, ClientTimeout, TCPConnector, TraceConfig
 import time
-import functools
 import json
 import logging
-from typing import Dict, Any, List
+import multiprocessing
+from email.utils import parsedate_to_datetime
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
 
 import env_var
+from columnar import bars_to_array, bars_to_frame
+from json_stream import JSONStreamParser, loads
+from metrics import registry, timed
+from response_cache import ResponseCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def async_timer_decorator(func):
-    @functools.wraps(func)
-    async def wrapper(*args, **kwargs):
-        logger.info(f"Starting function: {func.__name__}")
-        start_time = time.time()
-        result = await func(*args, **kwargs)
-        end_time = time.time()
-        logger.info(f"Finished function: {func.__name__}")
-        logger.info(f"Execution time: {end_time - start_time:.4f} seconds")
-        return result
-    return wrapper
+# Endpoints whose last path segment is a symbol, exchange or country; it is dropped from metric labels
+PARAMETERIZED_ENDPOINTS = (
+    '/api/eod/', '/api/fundamentals/', '/api/eod-bulk-last-day/', '/api/exchange-symbol-list/', '/api/macro-indicator/'
+)
+
+def endpoint_label(endpoint: str) -> str:
+    for prefix in PARAMETERIZED_ENDPOINTS:
+        if endpoint.startswith(prefix):
+            return prefix + '{code}'
+    return endpoint
+
+class TokenBucket:
+    def __init__(self, requests_per_minute: float, burst: float = None):
+        self.__rate = requests_per_minute / 60.0
+        self.__capacity = burst if burst is not None else max(1.0, self.__rate)
+        self.__tokens = self.__capacity
+        self.__updated = time.monotonic()
+        self.__paused_until = 0.0
+        self.__lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        # Stop handing out tokens, e.g. after the server answered 429 with Retry-After
+        self.__paused_until = max(self.__paused_until, time.monotonic() + seconds)
+        self.__tokens = 0.0
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns the time spent waiting in seconds."""
+        start = time.monotonic()
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                if now < self.__paused_until:
+                    await asyncio.sleep(self.__paused_until - now)
+                    self.__updated = time.monotonic()
+                    continue
+                self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+                self.__updated = now
+                if self.__tokens >= 1.0:
+                    self.__tokens -= 1.0
+                    return time.monotonic() - start
+                await asyncio.sleep((1.0 - self.__tokens) / self.__rate)
+
+class SharedTokenBucket:
+    # Token bucket whose state lives in shared memory, so that worker processes share one rate budget.
+    # It has to be handed to the workers when they are started (e.g. as a pool initializer argument).
+    def __init__(self, requests_per_minute: float, burst: float = None, context=None):
+        context = context or multiprocessing.get_context()
+        self.__rate = requests_per_minute / 60.0
+        self.__capacity = burst if burst is not None else max(1.0, self.__rate)
+        # tokens, last refill time, paused until
+        self.__state = context.Array('d', [self.__capacity, time.time(), 0.0])
+
+    def pause(self, seconds: float):
+        with self.__state.get_lock():
+            self.__state[0] = 0.0
+            self.__state[2] = max(self.__state[2], time.time() + seconds)
+
+    def _try_acquire(self) -> float:
+        # Takes a token and returns 0, or returns the time to wait before trying again
+        with self.__state.get_lock():
+            tokens, updated, paused_until = self.__state[:]
+            now = time.time()
+            if now < paused_until:
+                return paused_until - now
+            tokens = min(self.__capacity, tokens + (now - updated) * self.__rate)
+            if tokens >= 1.0:
+                self.__state[:] = [tokens - 1.0, now, paused_until]
+                return 0.0
+            self.__state[:] = [tokens, now, paused_until]
+            return (1.0 - tokens) / self.__rate
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns the time spent waiting in seconds."""
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return time.monotonic() - start
+            await asyncio.sleep(wait)
+
+class CalendarChunkError(Exception):
+    # Raised when some chunks of a multi-symbol calendar request failed; maps chunk label -> exception
+    def __init__(self, failures: Dict[str, Exception]):
+        super().__init__(f"{len(failures)} calendar chunks failed: {', '.join(failures)}")
+        self.failures = failures
 
 class EodhdAPISession:
-    def __init__(self, api_key: str, max_retries: int = 3, retry_delay: float = 1.0):
+    def __init__(
+        self,
+        api_key: str,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        requests_per_minute: float = None,
+        burst: float = None,
+        max_concurrency: int = None,
+        pool_size: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        total_timeout: float = 300.0,
+        base_url: str = 'https://eodhd.com',
+        cache: ResponseCache = None,
+        rate_limiter=None,
+        coalesce: bool = True
+    ):
         self.__api_key = api_key
-        self.__session = ClientSession(base_url='https://eodhd.com')
+        self.__cache = cache
+        # Identical requests in flight share one HTTP call: request key -> task fetching the response
+        self.__coalesce = coalesce
+        self.__in_flight: Dict[str, asyncio.Task] = {}
+        self.__coalesce_stats = {'requests': 0, 'coalesced': 0}
+        self.__connection_stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'pool_waits': 0,
+            'pool_wait_time': 0.0
+        }
+        self.__session = ClientSession(
+            base_url=base_url,
+            connector=TCPConnector(
+                limit=pool_size,
+                limit_per_host=limit_per_host,
+                keepalive_timeout=keepalive_timeout,
+                ttl_dns_cache=ttl_dns_cache
+            ),
+            timeout=ClientTimeout(total=total_timeout, sock_connect=connect_timeout, sock_read=read_timeout),
+            trace_configs=[self._connection_trace_config()]
+        )
         self.__max_retries = max_retries
         self.__retry_delay = retry_delay
+        # An explicit rate limiter (e.g. a SharedTokenBucket) takes precedence over requests_per_minute
+        if rate_limiter is None and requests_per_minute:
+            rate_limiter = TokenBucket(requests_per_minute, burst)
+        self.__rate_limiter = rate_limiter
+        self.__semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.__throttle_stats = {
+            'rate_limit_wait': 0.0,
+            'concurrency_wait': 0.0,
+            'retry_after_wait': 0.0,
+            'rate_limited_responses': 0
+        }
 
     async def __aenter__(self):
         return self
@@ -38,92 +171,457 @@ class EodhdAPISession:
 
     async def close(self):
         await self.__session.close()
+        if self.__cache is not None:
+            await self.__cache.flush_async()
+
+    @property
+    def session(self) -> ClientSession:
+        return self.__session
+
+    def _connection_trace_config(self) -> TraceConfig:
+        stats = self.__connection_stats
+
+        async def on_request_start(session, ctx, params):
+            stats['requests'] += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.monotonic()
+
+        async def on_connection_queued_end(session, ctx, params):
+            stats['pool_waits'] += 1
+            stats['pool_wait_time'] += time.monotonic() - ctx.queued_at
+
+        async def on_connection_create_end(session, ctx, params):
+            stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats['connections_reused'] += 1
+
+        async def on_response_chunk_received(session, ctx, params):
+            # Sent once per fully read body; streamed responses count their chunks in _stream_request
+            registry.inc('eodhd_http_response_bytes_total', len(params.chunk), endpoint=endpoint_label(params.url.path))
+
+        trace_config = TraceConfig()
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def connection_stats(self) -> Dict[str, float]:
+        stats = dict(self.__connection_stats)
+        connections = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_ratio'] = stats['connections_reused'] / connections if connections else 0.0
+        return stats
+
+    def cache_stats(self) -> Dict[str, float]:
+        return self.__cache.stats() if self.__cache is not None else {}
+
+    def throttle_stats(self) -> Dict[str, float]:
+        return dict(self.__throttle_stats)
+
+    def coalesce_stats(self) -> Dict[str, float]:
+        stats = dict(self.__coalesce_stats)
+        stats['saved_ratio'] = stats['coalesced'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    @contextlib.asynccontextmanager
+    async def _throttle(self):
+        if self.__semaphore:
+            start = time.monotonic()
+            await self.__semaphore.acquire()
+            self.__throttle_stats['concurrency_wait'] += time.monotonic() - start
+        try:
+            if self.__rate_limiter:
+                self.__throttle_stats['rate_limit_wait'] += await self.__rate_limiter.acquire()
+            yield
+        finally:
+            if self.__semaphore:
+                self.__semaphore.release()
+
+    @staticmethod
+    def _retry_after(headers) -> Optional[float]:
+        value = headers.get('Retry-After') if headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _record_error(error: Exception, label: str):
+        # HTTP status errors are already counted per status code
+        if not isinstance(error, ClientResponseError):
+            registry.inc('eodhd_http_errors_total', endpoint=label, error=type(error).__name__)
+
+    async def _retry_or_raise(self, error: Exception, attempt: int, url: str):
+        # Sleeps before the next attempt if the error is retryable, re-raises it otherwise
+        if isinstance(error, ClientResponseError):
+            logger.error(f"HTTP error occurred: {str(error)}")
+            if error.status == 429:
+                delay = self._retry_after(error.headers)
+                if delay is None:
+                    delay = self.__retry_delay * (2 ** attempt)
+                if self.__rate_limiter:
+                    self.__rate_limiter.pause(delay)
+                self.__throttle_stats['rate_limited_responses'] += 1
+                self.__throttle_stats['retry_after_wait'] += delay
+                await asyncio.sleep(delay)
+                return
+            if error.status >= 500:
+                await asyncio.sleep(self.__retry_delay * (2 ** attempt))
+                return
+            raise error
+        if isinstance(error, ClientConnectorError):
+            logger.error(f"Connection error occurred: {str(error)}")
+            await asyncio.sleep(self.__retry_delay * (2 ** attempt))
+            return
+        if isinstance(error, asyncio.TimeoutError):
+            logger.error(f"Request timed out: {url}")
+            await asyncio.sleep(self.__retry_delay * (2 ** attempt))
+            return
+        if isinstance(error, ClientError):
+            logger.error(f"Client error occurred: {str(error)}")
+            raise error
+        logger.error(f"Unexpected error occurred: {str(error)}")
+        raise error
 
     async def _make_request(self, endpoint: str, params: Dict[str, Any]):
         params['api_token'] = self.__api_key
         if 'fmt' not in params:
             params['fmt'] = 'json'
+        self.__coalesce_stats['requests'] += 1
+        if not self.__coalesce:
+            return await self._fetch(endpoint, params)
+
+        key = f"{endpoint}?{json.dumps(params, sort_keys=True, default=str)}"
+        task = self.__in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(endpoint, params))
+            self.__in_flight[key] = task
+            task.add_done_callback(lambda _: self.__in_flight.pop(key, None))
+        else:
+            self.__coalesce_stats['coalesced'] += 1
+        # Callers share the decoded result, so it must not be mutated in place.
+        # shield() keeps a cancelled caller from cancelling the request for the others.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, endpoint: str, params: Dict[str, Any]):
         url = f"{self.__session._base_url}{endpoint}"
 
+        if self.__cache is not None:
+            cached = await self.__cache.get_async(endpoint, params)
+            if cached is not None:
+                return cached
+
+        label = endpoint_label(endpoint)
         for attempt in range(self.__max_retries):
             try:
-                async with self.__session.get(endpoint, params=params) as resp:
-                    resp.raise_for_status()
+                async with self._throttle():
+                    # Latency is measured after throttling, so it covers only the HTTP exchange
+                    start = time.perf_counter()
                     try:
-                        return await resp.json()
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to decode JSON response: {str(e)}")
-                        raise
-            except ClientResponseError as e:
-                logger.error(f"HTTP error occurred: {str(e)}")
-                if e.status >= 500:
-                    await asyncio.sleep(self.__retry_delay * (2 ** attempt))
-                    continue
-                raise
-            except ClientConnectorError as e:
-                logger.error(f"Connection error occurred: {str(e)}")
-                await asyncio.sleep(self.__retry_delay * (2 ** attempt))
-                continue
-            except ClientError as e:
-                logger.error(f"Client error occurred: {str(e)}")
-                raise
+                        async with self.__session.get(endpoint, params=params) as resp:
+                            registry.inc('eodhd_http_responses_total', endpoint=label, status=resp.status)
+                            resp.raise_for_status()
+                            try:
+                                data = await resp.json(loads=loads)
+                            except json.JSONDecodeError as e:
+                                logger.error(f"Failed to decode JSON response: {str(e)}")
+                                raise
+                    finally:
+                        registry.observe('eodhd_http_request_seconds', time.perf_counter() - start, endpoint=label)
+                if self.__cache is not None:
+                    await self.__cache.set_async(endpoint, params, data)
+                return data
             except Exception as e:
-                logger.error(f"Unexpected error occurred: {str(e)}")
-                raise
+                self._record_error(e, label)
+                await self._retry_or_raise(e, attempt, url)
+                registry.inc('eodhd_http_retries_total', endpoint=label)
 
         raise RuntimeError(f"Failed after {self.__max_retries} attempts. URL: {url}, Params: {params}")
 
-    @async_timer_decorator
-    async def get_exchange_symbols(self, exchange: str):
+    async def _stream_request(self, endpoint: str, params: Dict[str, Any], chunk_size: int = 64 * 1024):
+        # Yields top-level array elements (or object key/value pairs) as they arrive; bypasses the response cache
+        params['api_token'] = self.__api_key
+        if 'fmt' not in params:
+            params['fmt'] = 'json'
+        url = f"{self.__session._base_url}{endpoint}"
+
+        label = endpoint_label(endpoint)
+        for attempt in range(self.__max_retries):
+            received = False
+            try:
+                async with self._throttle(), self.__session.get(endpoint, params=params) as resp:
+                    registry.inc('eodhd_http_responses_total', endpoint=label, status=resp.status)
+                    resp.raise_for_status()
+                    parser = JSONStreamParser()
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        registry.inc('eodhd_http_response_bytes_total', len(chunk), endpoint=label)
+                        for item in parser.feed(chunk):
+                            received = True
+                            yield item
+                    for item in parser.close():
+                        yield item
+                    return
+            except Exception as e:
+                self._record_error(e, label)
+                # Items already handed to the consumer cannot be replayed
+                if received:
+                    logger.error(f"Stream interrupted: {url}: {str(e)}")
+                    raise
+                await self._retry_or_raise(e, attempt, url)
+                registry.inc('eodhd_http_retries_total', endpoint=label)
+
+        raise RuntimeError(f"Failed after {self.__max_retries} attempts. URL: {url}, Params: {params}")
+
+    @timed('eodhd_api_call_seconds')
+    async def get_exchange_symbols(self, exchange: str, types: List[str] = None):
         data = await self._make_request(f'/api/exchange-symbol-list/{exchange}', {})
-        return [item['Code'] for item in data]
+        return [item['Code'] for item in data if not types or item.get('Type') in types]
 
-    @async_timer_decorator
-    async def get_historical_data(self, symbol: str):
-        data = await self._make_request(f'/api/eod/{symbol}', {'period': 'd'})
+    @timed('eodhd_api_call_seconds')
+    async def get_historical_data(self, symbol: str, from_date: str = None, to_date: str = None, output: str = 'records'):
+        params = {'period': 'd'}
+        if from_date:
+            params['from'] = from_date
+        if to_date:
+            params['to'] = to_date
+        data = await self._make_request(f'/api/eod/{symbol}', params)
         logger.info(f"Received historical data for symbol {symbol}")
+        if output == 'array':
+            data = bars_to_array(data)
+        elif output == 'frame':
+            data = bars_to_frame(data)
+        elif output != 'records':
+            raise ValueError(f"Unknown output format: {output}")
         return (symbol, data)
 
-    @async_timer_decorator
+    async def stream_historical_data(self, symbol: str, from_date: str = None, to_date: str = None, batch_size: int = 5000):
+        params = {'period': 'd'}
+        if from_date:
+            params['from'] = from_date
+        if to_date:
+            params['to'] = to_date
+        batch = []
+        async for bar in self._stream_request(f'/api/eod/{symbol}', params):
+            batch.append(bar)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        logger.info(f"Streamed historical data for symbol {symbol}")
+
+    @timed('eodhd_api_call_seconds')
+    async def get_bulk_last_day_data(self, exchange: str, date: str = None, symbols: List[str] = None):
+        params = {}
+        if date:
+            params['date'] = date
+        if symbols:
+            params['symbols'] = ','.join(symbols)
+        data = await self._make_request(f'/api/eod-bulk-last-day/{exchange}', params)
+        logger.info(f"Received bulk end-of-day data for exchange {exchange}: {len(data)} rows")
+        return (exchange, data)
+
+    @timed('eodhd_api_call_seconds')
     async def get_index_data(self, index: str):
         data = await self._make_request(f'/api/eod/{index}', {'period': 'd'})
         logger.info(f"Received historical data for index {index}")
         return (index, data)
 
-    @async_timer_decorator
-    async def get_fundamental_data(self, symbol: str):
-        data = await self._make_request(f'/api/fundamentals/{symbol}', {})
+    @timed('eodhd_api_call_seconds')
+    async def get_fundamental_data(self, symbol: str, sections: List[str] = None):
+        params = {'filter': ','.join(sections)} if sections else {}
+        data = await self._make_request(f'/api/fundamentals/{symbol}', params)
+        if sections and len(sections) == 1:
+            # A single filter returns the section itself instead of an object keyed by section
+            data = {sections[0]: data}
         logger.info(f"Received fundamental data for symbol {symbol}")
         return (symbol, data)
 
-    @async_timer_decorator
-    async def get_news_data(self, symbol: str):
-        data = await self._make_request('/api/news', {'s': symbol})
-        logger.info(f"Received {len(data)} news articles for symbol {symbol}")
-        return (symbol, data)
+    @timed('eodhd_api_call_seconds')
+    async def get_bulk_fundamental_data(
+        self, exchange: str, symbols: List[str] = None, offset: int = 0, limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        params = {'offset': offset, 'limit': limit}
+        if symbols:
+            params['symbols'] = ','.join(symbols)
+        data = await self._make_request(f'/api/bulk-fundamentals/{exchange}', params)
+        # The endpoint returns an object keyed by row number
+        companies = list(data.values()) if isinstance(data, dict) else data
+        logger.info(f"Received bulk fundamental data for {len(companies)} companies of exchange {exchange}")
+        return companies
 
-    @async_timer_decorator
-    async def get_earnings_data(self, symbols: List[str] = None, from_date: str = None, to_date: str = None, fmt: str = 'json'):
-        params = {}
+    async def iter_bulk_fundamental_data(
+        self, exchange: str, symbols: List[str] = None, page_size: int = 500, max_symbols_chars: int = 1500
+    ):
+        # Yields pages of companies until a page comes back short; long symbol lists are split into
+        # chunks that keep the URL short, and every chunk is paged on its own
+        for chunk_symbols in self._symbol_chunks(symbols, max_symbols_chars) if symbols else [None]:
+            offset = 0
+            while True:
+                companies = await self.get_bulk_fundamental_data(
+                    exchange, symbols=chunk_symbols, offset=offset, limit=page_size
+                )
+                if companies:
+                    yield companies
+                if len(companies) < page_size:
+                    break
+                offset += page_size
+
+    async def stream_fundamental_data(self, symbol: str):
+        async for section, data in self._stream_request(f'/api/fundamentals/{symbol}', {}):
+            yield section, data
+        logger.info(f"Streamed fundamental data for symbol {symbol}")
+
+    @timed('eodhd_api_call_seconds')
+    async def get_news_data(
+        self, symbol: str, from_date: str = None, to_date: str = None, offset: int = None, limit: int = None
+    ):
+        params = {'s': symbol}
         if from_date:
             params['from'] = from_date
         if to_date:
             params['to'] = to_date
-        if symbols:
-            params['symbols'] = ','.join(symbols)
-        params['fmt'] = fmt
-        data = await self._make_request('/api/calendar/earnings', params)
+        if offset is not None:
+            params['offset'] = offset
+        if limit is not None:
+            params['limit'] = limit
+        data = await self._make_request('/api/news', params)
+        logger.info(f"Received {len(data)} news articles for symbol {symbol}")
+        return (symbol, data)
+
+    async def iter_news_data(self, symbol: str, from_date: str = None, page_size: int = 100, max_pages: int = None):
+        # Yields pages of articles, newest first, until a page comes back short or max_pages are fetched
+        offset = pages = 0
+        while max_pages is None or pages < max_pages:
+            _, articles = await self.get_news_data(symbol, from_date=from_date, offset=offset, limit=page_size)
+            if articles:
+                yield articles
+            if len(articles) < page_size:
+                return
+            offset += page_size
+            pages += 1
+
+    @staticmethod
+    def _symbol_chunks(symbols: List[str], max_chars: int) -> List[List[str]]:
+        # Packs symbols into chunks whose comma-joined length stays below max_chars
+        chunks, chunk, length = [], [], 0
+        for symbol in symbols:
+            if chunk and length + len(symbol) + 1 > max_chars:
+                chunks.append(chunk)
+                chunk, length = [], 0
+            chunk.append(symbol)
+            length += len(symbol) + 1
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def _date_windows(from_date: str = None, to_date: str = None, window_days: int = None) -> List[tuple]:
+        # Splits [from_date, to_date] into consecutive windows of at most window_days days
+        if not (from_date and to_date and window_days):
+            return [(from_date, to_date)]
+        windows = []
+        start, end = date.fromisoformat(from_date), date.fromisoformat(to_date)
+        while start <= end:
+            window_end = min(end, start + timedelta(days=window_days - 1))
+            windows.append((start.isoformat(), window_end.isoformat()))
+            start = window_end + timedelta(days=1)
+        return windows
+
+    async def _calendar_request(
+        self,
+        endpoint: str,
+        list_key: str,
+        params: Dict[str, Any],
+        symbols: List[str] = None,
+        from_date: str = None,
+        to_date: str = None,
+        window_days: int = None,
+        max_symbols_chars: int = 1500
+    ) -> Dict[str, Any]:
+        # Requests every (symbol chunk, date window) concurrently; the session's semaphore and rate limiter bound them
+        symbol_chunks = self._symbol_chunks(symbols, max_symbols_chars) if symbols else [None]
+        chunks = [
+            (chunk_symbols, window)
+            for chunk_symbols in symbol_chunks
+            for window in self._date_windows(from_date, to_date, window_days)
+        ]
+
+        async def fetch(chunk_symbols, window):
+            chunk_params = dict(params)
+            if chunk_symbols:
+                chunk_params['symbols'] = ','.join(chunk_symbols)
+            if window[0]:
+                chunk_params['from'] = window[0]
+            if window[1]:
+                chunk_params['to'] = window[1]
+            return await self._make_request(endpoint, chunk_params)
+
+        results = await asyncio.gather(*(fetch(*chunk) for chunk in chunks), return_exceptions=True)
+        if len(chunks) == 1 and isinstance(results[0], Exception):
+            raise results[0]
+
+        merged, items, seen, failures = None, [], set(), {}
+        for (chunk_symbols, window), result in zip(chunks, results):
+            if isinstance(result, Exception):
+                label = f"{chunk_symbols[0]}..{chunk_symbols[-1]}" if chunk_symbols else "all"
+                if window[0] or window[1]:
+                    label += f"@{window[0] or ''}..{window[1] or ''}"
+                failures[label] = result
+                continue
+            if merged is None:
+                merged = {key: value for key, value in result.items() if key != list_key}
+            # Overlapping windows can return the same record twice
+            for item in result.get(list_key) or []:
+                item_key = json.dumps(item, sort_keys=True, default=str)
+                if item_key not in seen:
+                    seen.add(item_key)
+                    items.append(item)
+
+        if merged is None:
+            raise CalendarChunkError(failures)
+        if failures:
+            logger.error(f"{len(failures)} of {len(chunks)} chunks of {endpoint} failed")
+        merged[list_key] = items
+        merged['failed_chunks'] = failures
+        return merged
+
+    @timed('eodhd_api_call_seconds')
+    async def get_earnings_data(
+        self,
+        symbols: List[str] = None,
+        from_date: str = None,
+        to_date: str = None,
+        fmt: str = 'json',
+        window_days: int = 31,
+        max_symbols_chars: int = 1500
+    ):
+        data = await self._calendar_request(
+            '/api/calendar/earnings', 'earnings', {'fmt': fmt}, symbols=symbols, from_date=from_date,
+            to_date=to_date, window_days=window_days, max_symbols_chars=max_symbols_chars
+        )
         logger.info(f"Received earnings data")
         return data
 
-    @async_timer_decorator
-    async def get_trends_data(self, symbols: List[str], fmt: str = 'json'):
-        params = {'symbols': ','.join(symbols), 'fmt': fmt}
-        data = await self._make_request('/api/calendar/trends', params)
+    @timed('eodhd_api_call_seconds')
+    async def get_trends_data(self, symbols: List[str], fmt: str = 'json', max_symbols_chars: int = 1500):
+        data = await self._calendar_request(
+            '/api/calendar/trends', 'trends', {'fmt': fmt}, symbols=symbols, max_symbols_chars=max_symbols_chars
+        )
         logger.info(f"Received trends data")
         return data
 
-    @async_timer_decorator
+    @timed('eodhd_api_call_seconds')
     async def get_ipos_data(self, from_date: str = None, to_date: str = None, fmt: str = 'json'):
         params = {}
         if from_date:
@@ -135,7 +633,7 @@ class EodhdAPISession:
         logger.info(f"Received IPOs data")
         return data
 
-    @async_timer_decorator
+    @timed('eodhd_api_call_seconds')
     async def get_splits_data(self, from_date: str = None, to_date: str = None, fmt: str = 'json'):
         params = {}
         if from_date:
@@ -147,7 +645,7 @@ class EodhdAPISession:
         logger.info(f"Received splits data")
         return data
 
-    @async_timer_decorator
+    @timed('eodhd_api_call_seconds')
     async def get_macro_indicators_data(self, country: str, indicator: str = None, fmt: str = 'json'):
         params = {'fmt': fmt}
         if indicator:
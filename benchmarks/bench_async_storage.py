@@ -0,0 +1,91 @@
+"""
+Compares the blocking EodhdMongoClient against AsyncEodhdMongoClient
+when network fetches and database writes are interleaved on one event loop.
+
+Usage:
+    python -m benchmarks.bench_async_storage --mongo-uri mongodb://localhost:27017/ --symbols 200
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from db_operations import AsyncEodhdMongoClient, EodhdMongoClient
+
+SYMBOL_PREFIX = 'BENCH_'
+
+
+def make_bars(count: int):
+    return [
+        {
+            'date': (date(2000, 1, 1) + timedelta(days=i)).isoformat(),
+            'open': 100.0 + i, 'high': 101.0 + i, 'low': 99.0 + i, 'close': 100.5 + i,
+            'adjusted_close': 100.5 + i, 'volume': 1_000_000 + i
+        }
+        for i in range(count)
+    ]
+
+
+async def fake_fetch(bars, latency: float):
+    await asyncio.sleep(latency)
+    return bars
+
+
+async def run_blocking(mongo_uri: str, symbols, bars, latency: float):
+    client = EodhdMongoClient(mongo_uri)
+
+    async def collect(symbol):
+        data = await fake_fetch(bars, latency)
+        client.store_historical_data(symbol, data)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(collect(symbol) for symbol in symbols))
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed
+
+
+async def run_async(mongo_uri: str, symbols, bars, latency: float, max_workers: int):
+    async with AsyncEodhdMongoClient(mongo_uri, max_workers=max_workers) as client:
+        async def collect(symbol):
+            data = await fake_fetch(bars, latency)
+            await client.store_historical_data(symbol, data)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(collect(symbol) for symbol in symbols))
+        return time.perf_counter() - start
+
+
+def drop_bench_collections(mongo_uri: str):
+    with EodhdMongoClient(mongo_uri) as client:
+        for name in client.historical_data.list_collection_names():
+            if name.startswith(SYMBOL_PREFIX):
+                client.historical_data.drop_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--bars', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated API latency in seconds')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    symbols = [f'{SYMBOL_PREFIX}{i}' for i in range(args.symbols)]
+    bars = make_bars(args.bars)
+    total_docs = args.symbols * args.bars
+
+    for name, runner in (
+        ('blocking', lambda: run_blocking(args.mongo_uri, symbols, bars, args.latency)),
+        ('async', lambda: run_async(args.mongo_uri, symbols, bars, args.latency, args.workers)),
+    ):
+        drop_bench_collections(args.mongo_uri)
+        elapsed = asyncio.run(runner())
+        print(f'{name:>8}: {elapsed:8.3f} s, {total_docs / elapsed:12.0f} docs/s')
+
+    drop_bench_collections(args.mongo_uri)
+
+
+if __name__ == '__main__':
+    main()
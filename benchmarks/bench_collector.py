@@ -0,0 +1,130 @@
+"""
+End-to-end collector benchmark against the local mock EODHD server.
+
+For every universe size the collector is run against a MockEodhdServer and
+a throwaway MongoDB (use a scratch instance, e.g. `docker run -p 27018:27017 mongo`).
+Two modes are measured:
+  collector        DataCollector.collect_and_store_historical_data for every symbol
+  collecting_data  the full main.collecting_data run (all data types)
+
+Reported per run: API requests per second, documents written per second,
+p50/p99 request latency and the peak RSS of the process. Peak RSS never
+decreases within a process, so sizes are run in increasing order.
+
+Usage:
+    python -m benchmarks.bench_collector --mongo-uri mongodb://localhost:27018/ --sizes 10 100 1000 --latency 0.02
+"""
+import argparse
+import asyncio
+import resource
+import sys
+import time
+
+from benchmarks.mock_server import MockEodhdServer
+from data_collection import DataCollector
+from db_operations import EodhdMongoClient
+from main import collecting_data
+from metrics import registry
+
+SYMBOL_PREFIX = 'BENCH_'
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def drop_bench_data(mongo_uri: str):
+    with EodhdMongoClient(mongo_uri) as client:
+        for database in ('historical_data', 'fundamental_data', 'news_data', 'earnings_data', 'trends_data'):
+            for name in client[database].list_collection_names():
+                if name.startswith(SYMBOL_PREFIX):
+                    client[database].drop_collection(name)
+
+
+def request_latency():
+    histogram = registry.histogram('eodhd_http_request_seconds')
+    return histogram.quantile(0.5), histogram.quantile(0.99)
+
+
+def documents_written() -> float:
+    series = registry.summary().get('eodhd_bulk_write_documents_total', [])
+    return sum(item['value'] for item in series)
+
+
+async def run_collector(server: MockEodhdServer, mongo_uri: str, symbols, session_options):
+    async with DataCollector('bench', mongo_uri, base_url=server.url, **session_options) as dc:
+        await asyncio.gather(
+            *(dc.collect_and_store_historical_data(symbol) for symbol in symbols), return_exceptions=True
+        )
+
+
+async def run_collecting_data(server: MockEodhdServer, mongo_uri: str, symbols, session_options):
+    await collecting_data('bench', mongo_uri, symbols=symbols, base_url=server.url, **session_options)
+
+
+async def bench(mode: str, size: int, args) -> dict:
+    symbols = [f'{SYMBOL_PREFIX}{i}' for i in range(size)]
+    drop_bench_data(args.mongo_uri)
+    registry.reset()
+    session_options = {
+        'max_concurrency': args.concurrency,
+        'requests_per_minute': args.requests_per_minute,
+        'retry_delay': 0.05
+    }
+    runner = run_collector if mode == 'collector' else run_collecting_data
+    async with MockEodhdServer(
+        symbols=symbols,
+        bars=args.bars,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    ) as server:
+        start = time.perf_counter()
+        await runner(server, args.mongo_uri, symbols, session_options)
+        elapsed = time.perf_counter() - start
+        requests = server.stats['requests']
+    p50, p99 = request_latency()
+    return {
+        'mode': mode,
+        'symbols': size,
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed,
+        'docs_per_second': documents_written() / elapsed,
+        'p50_ms': p50 * 1000,
+        'p99_ms': p99 * 1000,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--modes', nargs='+', default=['collector', 'collecting_data'],
+                        choices=['collector', 'collecting_data'])
+    parser.add_argument('--bars', type=int, default=2500)
+    parser.add_argument('--latency', type=float, default=0.02, help='Simulated API latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests-per-minute', type=float, default=None)
+    args = parser.parse_args()
+
+    print(f"{'mode':>16} {'symbols':>8} {'seconds':>9} {'req/s':>9} {'docs/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'rss MB':>8}")
+    for size in sorted(args.sizes):
+        for mode in args.modes:
+            result = asyncio.run(bench(mode, size, args))
+            print(
+                f"{result['mode']:>16} {result['symbols']:>8} {result['seconds']:>9.2f} "
+                f"{result['requests_per_second']:>9.0f} {result['docs_per_second']:>11.0f} "
+                f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['peak_rss_mb']:>8.0f}"
+            )
+    drop_bench_data(args.mongo_uri)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares the per-symbol and consolidated storage layouts:
+write throughput for historical bars and latency of a cross-sectional
+query (one date across all symbols).
+
+Usage:
+    python -m benchmarks.bench_storage_layout --mongo-uri mongodb://localhost:27017/ --symbols 500
+"""
+import argparse
+import time
+
+from benchmarks.bench_async_storage import SYMBOL_PREFIX, make_bars
+from db_operations import EodhdMongoClient
+
+
+def cleanup(client: EodhdMongoClient):
+    for name in client.historical_data.list_collection_names():
+        if name.startswith(SYMBOL_PREFIX):
+            client.historical_data.drop_collection(name)
+    client[EodhdMongoClient.CONSOLIDATED_DB].historical_data.delete_many({"symbol": {"$regex": f"^{SYMBOL_PREFIX}"}})
+
+
+def bench_layout(mongo_uri: str, layout: str, symbols, bars, queries: int):
+    with EodhdMongoClient(mongo_uri, storage_layout=layout) as client:
+        cleanup(client)
+        start = time.perf_counter()
+        for symbol in symbols:
+            client.store_historical_data(symbol, bars)
+        write_time = time.perf_counter() - start
+
+        dates = [bar['date'] for bar in bars[:queries]]
+        start = time.perf_counter()
+        for date in dates:
+            client.get_cross_section(date, symbols)
+        query_time = (time.perf_counter() - start) / len(dates)
+
+        cleanup(client)
+    return write_time, query_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--bars', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+
+    symbols = [f'{SYMBOL_PREFIX}{i}' for i in range(args.symbols)]
+    bars = make_bars(args.bars)
+    total_docs = args.symbols * args.bars
+
+    for layout in (EodhdMongoClient.PER_SYMBOL, EodhdMongoClient.CONSOLIDATED):
+        write_time, query_time = bench_layout(args.mongo_uri, layout, symbols, bars, args.queries)
+        print(f'{layout:>12}: write {total_docs / write_time:10.0f} docs/s, '
+              f'cross-section {query_time * 1000:8.2f} ms/query')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Local stand-in for the EODHD API serving synthetic payloads.
+
+Serves /api/eod, /api/eod-bulk-last-day, /api/fundamentals, /api/news,
+/api/exchange-symbol-list, /api/macro-indicator and the calendar endpoints.
+Latency, server errors and 429 responses can be injected to exercise the
+retry and throttling paths of EodhdAPISession.
+
+Usage:
+    async with MockEodhdServer(latency=0.02, error_rate=0.01) as server:
+        session = EodhdAPISession('token', base_url=server.url)
+"""
+import asyncio
+import random
+from datetime import date, timedelta
+from typing import Dict, List
+
+from aiohttp import web
+
+from benchmarks.bench_async_storage import make_bars
+
+FUNDAMENTAL_SECTIONS = ('General', 'Highlights', 'Valuation', 'SharesStats', 'Technicals', 'SplitsDividends')
+
+
+class MockEodhdServer:
+    def __init__(
+        self,
+        symbols: List[str] = None,
+        bars: int = 2500,
+        news: int = 50,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 0.1,
+        seed: int = 0
+    ):
+        """
+        Initialize the MockEodhdServer.
+
+        :param symbols: Symbols listed on every exchange; defaults to BENCH_0..BENCH_99
+        :param bars: Number of daily bars per symbol
+        :param news: Number of news articles per symbol
+        :param latency: Delay added to every response in seconds
+        :param jitter: Maximum random delay added on top of latency
+        :param error_rate: Share of requests answered with 500
+        :param rate_limit_rate: Share of requests answered with 429
+        :param retry_after: Retry-After of injected 429 responses in seconds
+        :param seed: Seed of the random generator used for injection
+        """
+        self.symbols = symbols or [f'BENCH_{i}' for i in range(100)]
+        self.__bars = make_bars(bars)
+        self.__news = news
+        self.__latency = latency
+        self.__jitter = jitter
+        self.__error_rate = error_rate
+        self.__rate_limit_rate = rate_limit_rate
+        self.__retry_after = retry_after
+        self.__random = random.Random(seed)
+        self.__runner = None
+        self.url = None
+        self.stats: Dict[str, int] = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_get('/api/eod/{code}', self._eod)
+        app.router.add_get('/api/eod-bulk-last-day/{exchange}', self._bulk_last_day)
+        app.router.add_get('/api/fundamentals/{code}', self._fundamentals)
+        app.router.add_get('/api/news', self._news)
+        app.router.add_get('/api/exchange-symbol-list/{exchange}', self._exchange_symbols)
+        app.router.add_get('/api/macro-indicator/{country}', self._macro_indicator)
+        app.router.add_get('/api/calendar/earnings', self._earnings)
+        app.router.add_get('/api/calendar/trends', self._trends)
+        app.router.add_get('/api/calendar/ipos', self._ipos)
+        app.router.add_get('/api/calendar/splits', self._splits)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    async def stop(self):
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        self.stats['requests'] += 1
+        delay = self.__latency + (self.__random.random() * self.__jitter if self.__jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self.__random.random()
+        if roll < self.__rate_limit_rate:
+            self.stats['rate_limited'] += 1
+            return web.Response(status=429, headers={'Retry-After': str(self.__retry_after)})
+        if roll < self.__rate_limit_rate + self.__error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=500)
+        return await handler(request)
+
+    def _query_symbols(self, request) -> List[str]:
+        symbols = request.query.get('symbols')
+        return symbols.split(',') if symbols else self.symbols
+
+    async def _eod(self, request):
+        bars = self.__bars
+        if 'from' in request.query:
+            bars = [bar for bar in bars if bar['date'] >= request.query['from']]
+        if 'to' in request.query:
+            bars = [bar for bar in bars if bar['date'] <= request.query['to']]
+        return web.json_response(bars)
+
+    async def _bulk_last_day(self, request):
+        last = self.__bars[-1]
+        return web.json_response([
+            {**last, 'code': symbol.split('.')[0], 'exchange_short_name': request.match_info['exchange']}
+            for symbol in self._query_symbols(request)
+        ])
+
+    async def _fundamentals(self, request):
+        code = request.match_info['code']
+        data = {
+            section: {f'{section}Field{i}': i * 1.5 for i in range(20)}
+            for section in FUNDAMENTAL_SECTIONS
+        }
+        data['General']['Code'] = code
+        return web.json_response(data)
+
+    async def _news(self, request):
+        symbol = request.query.get('s', '')
+        start = date(2024, 1, 1)
+        return web.json_response([
+            {
+                'date': f"{start + timedelta(days=i // 4)}T{i % 24:02d}:00:00+00:00",
+                'title': f'{symbol} headline {i}',
+                'content': 'Lorem ipsum ' * 40,
+                'symbols': [symbol],
+                'tags': ['benchmark']
+            }
+            for i in range(self.__news)
+        ])
+
+    async def _exchange_symbols(self, request):
+        return web.json_response([
+            {'Code': symbol, 'Name': symbol, 'Exchange': request.match_info['exchange'], 'Type': 'Common Stock'}
+            for symbol in self.symbols
+        ])
+
+    async def _macro_indicator(self, request):
+        country = request.match_info['country']
+        return web.json_response([
+            {'CountryCode': country, 'Indicator': 'GDP (current US$)', 'Date': f'{year}-12-31', 'Value': year * 1e9}
+            for year in range(1960, 2024)
+        ])
+
+    async def _earnings(self, request):
+        return web.json_response({'type': 'Earnings', 'earnings': [
+            {'code': symbol, 'report_date': '2024-01-25', 'date': '2023-12-31', 'actual': 1.5, 'estimate': 1.4}
+            for symbol in self._query_symbols(request)
+        ]})
+
+    async def _trends(self, request):
+        return web.json_response({'type': 'Trends', 'trends': [
+            [{'code': symbol, 'date': '2024-03-31', 'earningsEstimateAvg': 1.6}]
+            for symbol in self._query_symbols(request)
+        ]})
+
+    async def _ipos(self, request):
+        return web.json_response({'type': 'IPOs', 'ipos': [
+            {'code': f'IPO_{i}', 'start_date': '2024-02-01', 'name': f'IPO {i}'} for i in range(50)
+        ]})
+
+    async def _splits(self, request):
+        return web.json_response({'type': 'Splits', 'splits': [
+            {'code': symbol, 'split_date': '2020-08-31', 'optionable': 'Y', 'old_shares': 1, 'new_shares': 4}
+            for symbol in self.symbols[:10]
+        ]})
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+# Typed layout of a daily bar as returned by /api/eod
+BAR_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('adjusted_close', 'f8'),
+    ('volume', 'i8'),
+])
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'adjusted_close')
+
+
+def bars_to_array(bars: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Converts a list of bar dictionaries into a structured NumPy array.
+
+    :param bars: List of dictionaries with historical data
+    :return: Structured array with BAR_DTYPE
+    """
+    array = np.empty(len(bars), dtype=BAR_DTYPE)
+    if not bars:
+        return array
+    array['date'] = np.array([bar['date'] for bar in bars], dtype='datetime64[D]')
+    for field in PRICE_FIELDS:
+        array[field] = np.array([bar.get(field) for bar in bars], dtype='f8')
+    array['volume'] = np.array([bar.get('volume') or 0 for bar in bars], dtype='i8')
+    return array
+
+
+def bars_to_frame(bars: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Converts a list of bar dictionaries into a DataFrame with typed columns.
+
+    :param bars: List of dictionaries with historical data
+    :return: DataFrame with a datetime64 'date' column, float64 prices and int64 volume
+    """
+    return pd.DataFrame(bars_to_array(bars))
+
+
+def to_records(data: Union[List[Dict[str, Any]], np.ndarray, pd.DataFrame]) -> List[Dict[str, Any]]:
+    """
+    Converts columnar bars back into the dictionary layout stored in MongoDB.
+    Lists are returned unchanged.
+
+    :param data: List of dictionaries, structured array or DataFrame
+    :return: List of dictionaries with ISO date strings
+    """
+    if isinstance(data, list) or data is None:
+        return data
+    if isinstance(data, pd.DataFrame):
+        frame = data.reset_index() if 'date' not in data.columns else data
+        columns = {name: frame[name].to_numpy() for name in frame.columns if name != 'index'}
+    else:
+        columns = {name: data[name] for name in data.dtype.names}
+
+    converted = {}
+    for name, values in columns.items():
+        if np.issubdtype(values.dtype, np.datetime64):
+            converted[name] = np.datetime_as_string(values.astype('datetime64[D]'), unit='D').tolist()
+        elif np.issubdtype(values.dtype, np.floating):
+            converted[name] = [None if value != value else value for value in values.tolist()]
+        else:
+            converted[name] = values.tolist()
+
+    names = list(converted)
+    return [dict(zip(names, row)) for row in zip(*converted.values())]
@@ -1,54 +1,392 @@
-from async_eodhd_api import EodhdAPISession
-from db_operations import EodhdMongoClient
-from typing import List
+import asyncio
+import logging
+from datetime import date, timedelta
+from async_eodhd_api import CalendarChunkError, EodhdAPISession
+from db_operations import AsyncEodhdMongoClient, EodhdMongoClient, StoreError, news_key
+from pipeline import CollectionPipeline
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sections the bulk fundamentals endpoint trims to the most recent periods. They are stored under
+# 'Bulk<section>', so they neither replace the full sections of a per-symbol fetch nor record
+# spurious changes in the fundamental history.
+BULK_TRIMMED_SECTIONS = ('Earnings', 'Financials')
 
 class DataCollector:
-    def __init__(self, eodhd_api_token: str, mongo_uri: str):
+    def __init__(
+        self,
+        eodhd_api_token: str,
+        mongo_uri: str,
+        max_db_workers: int = 4,
+        storage_layout: str = EodhdMongoClient.PER_SYMBOL,
+        skip_unchanged: bool = False,
+        **session_options
+    ):
         self.__eodhd_api_token = eodhd_api_token
         self.__mongo_uri = mongo_uri
-        self.__session = EodhdAPISession(self.__eodhd_api_token)
-        self.__mongo_client = EodhdMongoClient(self.__mongo_uri)
+        self.__session = EodhdAPISession(self.__eodhd_api_token, **session_options)
+        self.__mongo_client = AsyncEodhdMongoClient(
+            self.__mongo_uri, max_workers=max_db_workers, storage_layout=storage_layout, skip_unchanged=skip_unchanged
+        )
 
     async def __aenter__(self):
-        self.__mongo_client.test_connection()
+        await self.__mongo_client.test_connection()
+        await self.__mongo_client.ensure_indexes()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        logger.info(f"API throttling stats: {self.__session.throttle_stats()}")
+        logger.info(f"API connection stats: {self.__session.connection_stats()}")
+        logger.info(f"API response cache stats: {self.__session.cache_stats()}")
+        logger.info(f"API request coalescing stats: {self.__session.coalesce_stats()}")
+        bulk_stats = await self.__mongo_client.bulk_write_stats()
+        logger.info(
+            f"MongoDB bulk writes: {bulk_stats['documents']} documents at {bulk_stats['docs_per_second']:.0f} docs/s, "
+            f"{bulk_stats['failed']} failed in {len(bulk_stats['errors'])} chunks"
+        )
         await self.__session.close()
-        self.__mongo_client.close()
+        await self.__mongo_client.close()
+
+    async def _incremental_range(self, symbol: str, incremental: bool):
+        latest_date = await self.__mongo_client.get_latest_historical_date(symbol) if incremental else None
+        from_date = (date.fromisoformat(latest_date) + timedelta(days=1)).isoformat() if latest_date else None
+        return latest_date, from_date
+
+    async def discover_universe(
+        self, exchanges: List[str], refresh_seconds: float = 86400, types: List[str] = None
+    ) -> Dict[str, List[str]]:
+        # The symbol list of each exchange is cached in MongoDB and only refetched after refresh_seconds
+        symbols, new, delisted = [], [], []
+        for exchange in exchanges:
+            universe = await self.__mongo_client.get_universe(exchange, max_age_seconds=refresh_seconds)
+            if universe is None:
+                codes = await self.__session.get_exchange_symbols(exchange, types=types)
+                exchange_symbols = [f"{code}.{exchange}" for code in codes]
+                added, removed = await self.__mongo_client.store_universe(exchange, exchange_symbols)
+            else:
+                exchange_symbols, added, removed = universe['symbols'], universe['added'], universe['delisted']
+            symbols.extend(exchange_symbols)
+            new.extend(added)
+            delisted.extend(removed)
+
+        # Symbols without stored history need a full backfill, including new listings and earlier failed backfills
+        backfill = await self.__mongo_client.symbols_without_history(symbols)
+        backfill_set = set(backfill)
+        update = [symbol for symbol in symbols if symbol not in backfill_set]
+        logger.info(
+            f"Universe of {', '.join(exchanges)}: {len(symbols)} symbols, {len(backfill)} to backfill, "
+            f"{len(update)} to update, {len(new)} new listings, {len(delisted)} delisted and skipped"
+        )
+        return {'symbols': symbols, 'backfill': backfill, 'update': update, 'new': new, 'delisted': delisted}
+
+    async def collect_and_store_historical_data(self, symbol: str, incremental: bool = False) -> Dict[str, int]:
+        latest_date, from_date = await self._incremental_range(symbol, incremental)
+
+        _, historical_data = await self.__session.get_historical_data(symbol, from_date=from_date)
+        if latest_date:
+            historical_data = [bar for bar in historical_data if bar['date'] > latest_date]
+
+        written = await self.__mongo_client.store_historical_data(symbol, historical_data)
+        logger.info(f"Historical data for {symbol}: {len(historical_data)} bars fetched, {written} bars written")
+        return {'fetched': len(historical_data), 'written': written}
+
+    async def collect_and_store_historical_data_streaming(
+        self, symbol: str, incremental: bool = False, batch_size: int = 5000
+    ) -> Dict[str, int]:
+        latest_date, from_date = await self._incremental_range(symbol, incremental)
+
+        fetched = written = 0
+        async for bars in self.__session.stream_historical_data(symbol, from_date=from_date, batch_size=batch_size):
+            if latest_date:
+                bars = [bar for bar in bars if bar['date'] > latest_date]
+            fetched += len(bars)
+            written += await self.__mongo_client.store_historical_data(symbol, bars)
+
+        logger.info(f"Historical data for {symbol}: {fetched} bars fetched, {written} bars written")
+        return {'fetched': fetched, 'written': written}
+
+    @staticmethod
+    def _exchange_symbol_map(exchange: str, symbols: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        # Bulk rows carry the bare ticker of one exchange, so only bare symbols and symbols of that
+        # exchange can be mapped back; VOD.LSE must not receive the rows of VOD.US
+        symbol_map, other_exchanges = {}, []
+        for symbol in symbols:
+            code, _, suffix = symbol.rpartition('.')
+            if not code:
+                symbol_map[symbol] = symbol
+            elif suffix == exchange:
+                symbol_map[code] = symbol
+            else:
+                other_exchanges.append(symbol)
+        return symbol_map, other_exchanges
+
+    async def _plan_bulk_historical(self, exchange: str, symbols: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        # One bulk request covers the last trading day of the exchange; symbols without stored history
+        # need a full backfill and symbols of other exchanges are updated one by one
+        missing = await self.__mongo_client.symbols_without_history(symbols)
+        missing_set = set(missing)
+        symbol_map, other_exchanges = self._exchange_symbol_map(exchange, [s for s in symbols if s not in missing_set])
+        return symbol_map, missing + other_exchanges
+
+    async def collect_and_store_bulk_last_day(self, exchange: str, symbols: List[str]) -> List[str]:
+        # Stores the bulk last-day bars and returns the symbols that still need per-symbol collection
+        symbol_map, per_symbol = await self._plan_bulk_historical(exchange, symbols)
+        _, bulk_data = await self.__session.get_bulk_last_day_data(exchange)
+        try:
+            await self.__mongo_client.store_bulk_historical_data(bulk_data, symbol_map)
+        except StoreError as e:
+            # Symbols whose bulk bars were not written are retried one by one
+            logger.warning(f"Bulk end-of-day data of {exchange} not written for {len(e.failures)} symbols: {e}")
+            per_symbol = per_symbol + [symbol for symbol in e.failures if symbol not in per_symbol]
+        return per_symbol
 
-    async def collect_and_store_historical_data(self, symbol: str):
-        historical_data = await self.__session.get_historical_data(symbol)
-        self.__mongo_client.store_historical_data(symbol, historical_data[1])
+    async def collect_and_store_bulk_historical_data(self, exchange: str, symbols: List[str]) -> Dict[str, Exception]:
+        per_symbol = await self.collect_and_store_bulk_last_day(exchange, symbols)
+        results = await asyncio.gather(
+            *(self.collect_and_store_historical_data(symbol, incremental=True) for symbol in per_symbol),
+            return_exceptions=True
+        )
+        return {symbol: result for symbol, result in zip(per_symbol, results) if isinstance(result, Exception)}
 
-    async def collect_and_store_fundamental_data(self, symbol: str):
-        fundamental_data = await self.__session.get_fundamental_data(symbol)
-        self.__mongo_client.store_fundamental_data(symbol, fundamental_data[1])
+    async def collect_and_store_fundamental_data(self, symbol: str, sections: List[str] = None):
+        fundamental_data = await self.__session.get_fundamental_data(symbol, sections=sections)
+        await self.__mongo_client.store_fundamental_data(symbol, fundamental_data[1])
 
-    async def collect_and_store_news_data(self, symbol: str):
-        news_data = await self.__session.get_news_data(symbol)
-        self.__mongo_client.store_news_data(symbol, news_data[1])
+    async def collect_and_store_bulk_fundamental_data(
+        self,
+        exchange: str,
+        symbols: List[str] = None,
+        page_size: int = 500,
+        sections: List[str] = None,
+        max_filtered_symbols: int = 1000
+    ) -> List[str]:
+        # Bulk rows carry the bare ticker; map them back to the requested symbols of this exchange
+        symbol_map, other_exchanges = self._exchange_symbol_map(exchange, symbols) if symbols else (None, [])
+        stored = set()
+        if symbol_map is None or symbol_map:
+            # A large universe (e.g. the discovered exchange) is paged without a symbol filter and
+            # filtered locally; smaller lists are sent in URL-sized chunks
+            codes = list(symbol_map) if symbol_map and len(symbol_map) <= max_filtered_symbols else None
+            async for companies in self.__session.iter_bulk_fundamental_data(exchange, symbols=codes, page_size=page_size):
+                for company in companies:
+                    code = company.get('General', {}).get('Code')
+                    symbol = symbol_map.get(code) if symbol_map else f"{code}.{exchange}"
+                    if not symbol:
+                        continue
+                    await self.__mongo_client.store_fundamental_data(symbol, self._bulk_sections(company))
+                    stored.add(symbol)
+
+        # Symbols of other exchanges are not part of the bulk payload and are fetched one by one
+        results = await asyncio.gather(
+            *(self.collect_and_store_fundamental_data(symbol, sections=sections) for symbol in other_exchanges),
+            return_exceptions=True
+        )
+        stored.update(symbol for symbol, result in zip(other_exchanges, results) if not isinstance(result, Exception))
+        missing = [symbol for symbol in symbols if symbol not in stored] if symbols else []
+        logger.info(f"Bulk fundamental data of {exchange}: {len(stored)} companies stored, {len(missing)} missing")
+        return missing
+
+    @staticmethod
+    def _bulk_sections(company: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            f"Bulk{section}" if section in BULK_TRIMMED_SECTIONS else section: payload
+            for section, payload in company.items()
+        }
+
+    async def collect_and_store_fundamental_data_streaming(self, symbol: str):
+        async for section, data in self.__session.stream_fundamental_data(symbol):
+            await self.__mongo_client.store_fundamental_section(symbol, section, data)
+
+    async def _fetch_news(self, symbol: str, incremental: bool = False, page_size: int = 100, max_pages: int = 10):
+        if not incremental:
+            _, news_data = await self.__session.get_news_data(symbol)
+            return news_data
+
+        # Pages run newest first from the watermark day; the first stored article ends the sync.
+        # The watermark is the newest stored article, so a sync bounded by it must page to the end:
+        # stopping early would leave a gap of new articles that the next run never fetches.
+        from_date, stored = await self.__mongo_client.get_news_sync_state(symbol)
+        articles, seen = [], set()
+        pages = 0
+        async for page in self.__session.iter_news_data(
+            symbol, from_date=from_date, page_size=page_size, max_pages=None if from_date else max_pages
+        ):
+            pages += 1
+            if not from_date and pages == max_pages and len(page) == page_size:
+                # The first sync keeps the newest articles; older ones are not backfilled, but
+                # nothing newer than the stored articles is missing
+                logger.warning(
+                    f"News sync for {symbol} stopped after {max_pages} pages; older articles were not fetched"
+                )
+            reached_stored = False
+            for article in page:
+                key = news_key(article)
+                if key in stored:
+                    reached_stored = True
+                elif key not in seen:
+                    seen.add(key)
+                    articles.append(article)
+            if reached_stored:
+                break
+        logger.info(f"News sync for {symbol} from {from_date or 'the start'}: {len(articles)} new articles")
+        return articles
+
+    async def collect_and_store_news_data(
+        self, symbol: str, incremental: bool = False, page_size: int = 100, max_pages: int = 10
+    ) -> Dict[str, int]:
+        news_data = await self._fetch_news(symbol, incremental, page_size, max_pages)
+        written = await self.__mongo_client.store_news_data(symbol, news_data) if news_data else 0
+        return {'fetched': len(news_data), 'written': written}
 
     async def collect_and_store_indices_data(self, index: str):
         index_data = await self.__session.get_index_data(index)
-        self.__mongo_client.store_historical_data(index, index_data[1])
+        await self.__mongo_client.store_historical_data(index, index_data[1])
+
+    @staticmethod
+    def _raise_failed_chunks(calendar_data: dict):
+        # The successful chunks are stored first; failed chunks are reported individually
+        if calendar_data.get('failed_chunks'):
+            raise CalendarChunkError(calendar_data['failed_chunks'])
 
     async def collect_and_store_earnings_data(self, symbols: List[str] = []):
         earnings_data = await self.__session.get_earnings_data(symbols=symbols)
-        self.__mongo_client.store_earnings_data(earnings_data)
+        await self.__mongo_client.store_earnings_data(earnings_data)
+        self._raise_failed_chunks(earnings_data)
 
     async def collect_and_store_trends_data(self, symbols: List[str]):
         trends_data = await self.__session.get_trends_data(symbols)
-        self.__mongo_client.store_trends_data(trends_data)
+        await self.__mongo_client.store_trends_data(trends_data)
+        self._raise_failed_chunks(trends_data)
 
     async def collect_and_store_ipos_data(self):
         ipos_data = await self.__session.get_ipos_data()
-        self.__mongo_client.store_ipos_data(ipos_data)
+        await self.__mongo_client.store_ipos_data(ipos_data)
 
     async def collect_and_store_splits_data(self):
         splits_data = await self.__session.get_splits_data()
-        self.__mongo_client.store_splits_data(splits_data)
+        await self.__mongo_client.store_splits_data(splits_data)
 
     async def collect_and_store_macro_indicators_data(self, country: str):
         macro_indicators_data = await self.__session.get_macro_indicators_data(country)
-        self.__mongo_client.store_macro_indicators_data(macro_indicators_data)
\ No newline at end of file
+        await self.__mongo_client.store_macro_indicators_data(macro_indicators_data)
+
+    async def _fetch_payload(
+        self,
+        data_type: str,
+        key: str,
+        symbols: List[str],
+        fundamental_sections: List[str] = None,
+        incremental: bool = False,
+        bulk_symbol_map: Dict[str, str] = None
+    ) -> Tuple[str, str, Any]:
+        if data_type == 'historical':
+            latest_date, from_date = await self._incremental_range(key, incremental)
+            _, data = await self.__session.get_historical_data(key, from_date=from_date)
+            if latest_date:
+                data = [bar for bar in data if bar['date'] > latest_date]
+            return 'historical', key, data
+        if data_type == 'bulk_historical':
+            _, data = await self.__session.get_bulk_last_day_data(key)
+            return 'bulk_historical', key, (data, bulk_symbol_map)
+        if data_type == 'indices':
+            _, data = await self.__session.get_index_data(key)
+            return 'historical', key, data
+        if data_type == 'fundamental':
+            _, data = await self.__session.get_fundamental_data(key, sections=fundamental_sections)
+            return 'fundamental', key, data
+        if data_type == 'news':
+            return 'news', key, await self._fetch_news(key, incremental)
+        if data_type == 'earnings':
+            return 'earnings', key, await self.__session.get_earnings_data(symbols=[])
+        if data_type == 'trends':
+            return 'trends', key, await self.__session.get_trends_data(symbols)
+        if data_type == 'ipos':
+            return 'ipos', key, await self.__session.get_ipos_data()
+        if data_type == 'splits':
+            return 'splits', key, await self.__session.get_splits_data()
+        if data_type == 'macro_indicators':
+            return 'macro_indicators', key, await self.__session.get_macro_indicators_data(key)
+        raise ValueError(f"Unknown data type: {data_type}")
+
+    async def _store_payload(self, store_type: str, key: str, payload: Any):
+        if store_type == 'historical':
+            await self.__mongo_client.store_historical_data(key, payload)
+        elif store_type == 'bulk_historical':
+            await self.__mongo_client.store_bulk_historical_data(*payload)
+        elif store_type == 'fundamental':
+            await self.__mongo_client.store_fundamental_data(key, payload)
+        elif store_type == 'news':
+            await self.__mongo_client.store_news_data(key, payload)
+        elif store_type == 'earnings':
+            await self.__mongo_client.store_earnings_data(payload)
+            self._raise_failed_chunks(payload)
+        elif store_type == 'trends':
+            await self.__mongo_client.store_trends_data(payload)
+            self._raise_failed_chunks(payload)
+        elif store_type == 'ipos':
+            await self.__mongo_client.store_ipos_data(payload)
+        elif store_type == 'splits':
+            await self.__mongo_client.store_splits_data(payload)
+        elif store_type == 'macro_indicators':
+            await self.__mongo_client.store_macro_indicators_data(payload)
+        else:
+            raise ValueError(f"Unknown store type: {store_type}")
+
+    async def _store_payloads(self, store_type: str, payloads: Dict[str, list]) -> Dict[str, Exception]:
+        # Bars and articles of many symbols go out in one concurrent bulk write, whose failed writes
+        # StoreError reports per symbol; other types are stored per key
+        store_many = {
+            'historical': self.__mongo_client.store_historical_data_many,
+            'news': self.__mongo_client.store_news_data_many
+        }.get(store_type)
+        if store_many is not None:
+            try:
+                await store_many(payloads)
+            except StoreError as e:
+                return e.failures
+            return {}
+        errors = {}
+        for key, payload in payloads.items():
+            try:
+                await self._store_payload(store_type, key, payload)
+            except Exception as e:
+                errors[key] = e
+        return errors
+
+    async def run_pipeline(
+        self,
+        jobs: Iterable[Tuple[str, str]],
+        symbols: List[str] = None,
+        fetchers: int = 8,
+        writers: int = 2,
+        queue_size: int = 100,
+        fundamental_sections: List[str] = None,
+        incremental: bool = False,
+        updated_symbols: Iterable[str] = (),
+        bulk_exchange: str = None
+    ) -> Dict[str, Dict[str, Exception]]:
+        jobs = list(jobs)
+        incremental_symbols = set(updated_symbols)
+        bulk_symbol_map = None
+        historical_symbols = [key for data_type, key in jobs if data_type == 'historical']
+        if bulk_exchange and historical_symbols:
+            # The bulk last-day job replaces the per-symbol history of symbols that only need the latest bar
+            bulk_symbol_map, per_symbol = await self._plan_bulk_historical(bulk_exchange, historical_symbols)
+            incremental_symbols.update(per_symbol)
+            jobs = [job for job in jobs if job[0] != 'historical'] + [('bulk_historical', bulk_exchange)] + [
+                ('historical', symbol) for symbol in per_symbol
+            ]
+
+        pipeline = CollectionPipeline(
+            lambda data_type, key: self._fetch_payload(
+                data_type, key, symbols or [], fundamental_sections, incremental or key in incremental_symbols, bulk_symbol_map
+            ),
+            self._store_payload,
+            fetchers=fetchers,
+            writers=writers,
+            queue_size=queue_size,
+            store_many=self._store_payloads
+        )
+        return await pipeline.run(jobs)
+
@@ -1,9 +1,199 @@
+import asyncio
+import functools
+import hashlib
+import json
 import logging
-from pymongo import MongoClient, UpdateOne, ASCENDING
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import pandas as pd
+from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from columnar import to_records
+from query_cache import QueryCache
+from metrics import registry, timed
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Natural (unique) key of every data type. In the consolidated layout the key
+# of per-symbol data types is prefixed with 'symbol'.
+NATURAL_KEYS = {
+    'historical_data': ('date',),
+    'adjusted_data': ('date',),
+    'news_data': ('date', 'title'),
+    # The earnings calendar can list one period end under several report dates (e.g. rescheduled reports)
+    'earnings_data': ('date', 'report_date'),
+    # The trends feed returns one row per forecast period ('0q', '0y', '+1q', ...) for the same date
+    'trends_data': ('date', 'period'),
+    'ipos': ('code', 'start_date'),
+    'splits': ('code', 'split_date'),
+    'macro_indicators': ('CountryCode', 'Indicator', 'Date'),
+}
+
+# Field used to bound the bulk lookup of stored content hashes
+HASH_RANGE_FIELDS = {
+    'historical_data': 'date',
+    'adjusted_data': 'date',
+    'ipos': 'start_date',
+    'splits': 'split_date',
+    'macro_indicators': 'Date',
+}
+
+# Data types that are not split by symbol and their (database, collection)
+CALENDAR_COLLECTIONS = {
+    'ipos': ('ipos_splits', 'ipos'),
+    'splits': ('ipos_splits', 'splits'),
+    'macro_indicators': ('macro_indicators', 'data'),
+}
+
+def content_hash(item):
+    """
+    Returns a stable hash of a document's content.
+
+    :param item: Dictionary as received from the API
+    :return: Hex digest that is independent of key order
+    """
+    return hashlib.sha1(json.dumps(item, sort_keys=True, default=str).encode()).hexdigest()
+
+def news_key(item):
+    """
+    Returns a compact 64-bit key of a news article's natural key (date and title).
+
+    :param item: News article as received from the API or stored
+    :return: Integer key for in-memory seen-sets
+    """
+    digest = hashlib.blake2b(f"{item.get('date')}\x00{item.get('title')}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+class StoreError(Exception):
+    # Raised when bulk writes failed after the rest of the batch was stored; maps symbol -> exception
+    def __init__(self, data_type, failures):
+        super().__init__(f"Writing {data_type} failed for {len(failures)} keys: {', '.join(failures)}")
+        self.failures = failures
+
+class BulkWriter:
+    """
+    Shared bulk write pipeline.
+    Splits operation lists into unordered chunks so that a failing document
+    does not abort the rest of the batch, writes chunks of different
+    collections concurrently and collects BulkWriteError details per chunk.
+    """
+
+    COUNTERS = ('documents', 'inserted', 'upserted', 'modified', 'matched', 'failed')
+
+    def __init__(self, chunk_size=1000, max_workers=4):
+        """
+        Initialize the BulkWriter.
+
+        :param chunk_size: Maximum number of operations per bulk_write call
+        :param max_workers: Maximum number of collections written concurrently
+        """
+        self.__chunk_size = chunk_size
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='eodhd-bulk')
+        self.__lock = threading.Lock()
+        self.__stats = dict.fromkeys(self.COUNTERS, 0)
+        self.__stats['seconds'] = 0.0
+        self.__errors = []
+
+    def close(self):
+        self.__executor.shutdown()
+
+    def write(self, collection, operations):
+        """
+        Writes the operations to one collection chunk by chunk.
+
+        :param collection: Target collection
+        :param operations: List of write operations
+        :return: Dictionary with the counters and chunk errors of this call
+        """
+        summary = dict.fromkeys(self.COUNTERS, 0)
+        summary['errors'] = []
+        start = time.perf_counter()
+        for chunk_index, offset in enumerate(range(0, len(operations), self.__chunk_size)):
+            chunk = operations[offset:offset + self.__chunk_size]
+            summary['documents'] += len(chunk)
+            try:
+                result = collection.bulk_write(chunk, ordered=False)
+                counts = (result.inserted_count, result.upserted_count, result.modified_count, result.matched_count)
+            except BulkWriteError as e:
+                details = e.details
+                counts = (details.get('nInserted', 0), details.get('nUpserted', 0),
+                          details.get('nModified', 0), details.get('nMatched', 0))
+                error = {
+                    'collection': collection.full_name,
+                    'chunk': chunk_index,
+                    'write_errors': [
+                        {'index': offset + item['index'], 'code': item.get('code'), 'message': item.get('errmsg')}
+                        for item in details.get('writeErrors', [])
+                    ],
+                    'write_concern_errors': details.get('writeConcernErrors', [])
+                }
+                summary['failed'] += len(error['write_errors'])
+                summary['errors'].append(error)
+                logger.error(f"Bulk write to {collection.full_name} chunk {chunk_index} had "
+                             f"{len(error['write_errors'])} errors")
+            for name, count in zip(('inserted', 'upserted', 'modified', 'matched'), counts):
+                summary[name] += count
+        elapsed = time.perf_counter() - start
+        registry.inc('eodhd_bulk_write_documents_total', summary['documents'])
+        registry.observe('eodhd_bulk_write_seconds', elapsed)
+
+        with self.__lock:
+            for name in self.COUNTERS:
+                self.__stats[name] += summary[name]
+            self.__stats['seconds'] += elapsed
+            self.__errors.extend(summary['errors'])
+        return summary
+
+    def write_many(self, batches):
+        """
+        Writes operations to several collections concurrently.
+
+        :param batches: List of (collection, operations) tuples
+        :return: List of per-collection summaries in the order of batches
+        """
+        batches = [(collection, operations) for collection, operations in batches if operations]
+        if len(batches) <= 1:
+            return [self.write(collection, operations) for collection, operations in batches]
+        futures = [self.__executor.submit(self.write, collection, operations) for collection, operations in batches]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def raise_for_errors(data_type, summaries):
+        """
+        Raises StoreError if any of the writes had chunk errors, so callers can
+        report the affected symbols instead of treating the store as successful.
+
+        :param data_type: Data type of the writes, used in the error message
+        :param summaries: Dictionary mapping symbol (or 'all_data') to the summary of its write
+        """
+        failures = {}
+        for key, summary in summaries.items():
+            if not summary['errors']:
+                continue
+            messages = [item['message'] for error in summary['errors'] for item in error['write_errors']]
+            messages += [str(item) for error in summary['errors'] for item in error['write_concern_errors']]
+            failures[key] = RuntimeError(
+                f"{summary['failed']} of {summary['documents']} documents not written to "
+                f"{summary['errors'][0]['collection']}: {messages[0] if messages else 'unknown error'}"
+            )
+        if failures:
+            raise StoreError(data_type, failures)
+
+    def stats(self):
+        """
+        Returns the accumulated counters, the documents-per-second throughput
+        of the write calls and the collected chunk errors.
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats['errors'] = list(self.__errors)
+        stats['docs_per_second'] = stats['documents'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
 class EodhdMongoClient(MongoClient):
     """
     MongoDB client for working with EODHD data.
@@ -11,14 +201,241 @@ class EodhdMongoClient(MongoClient):
     for working with historical, news, and fundamental data.
     """
 
-    def __init__(self, mongo_uri):
+    PER_SYMBOL = 'per_symbol'
+    CONSOLIDATED = 'consolidated'
+    # Database holding one collection per data type when the consolidated layout is used
+    CONSOLIDATED_DB = 'market_data'
+
+    def __init__(
+        self,
+        mongo_uri,
+        storage_layout=PER_SYMBOL,
+        skip_unchanged=False,
+        bulk_chunk_size=1000,
+        bulk_workers=4,
+        query_cache_bytes=256 * 1024 * 1024
+    ):
         """
         Initialize the EodhdMongoClient.
 
         :param mongo_uri: MongoDB connection URI
+        :param storage_layout: 'per_symbol' stores every ticker in its own collection,
+                               'consolidated' stores all tickers of a data type in one
+                               collection keyed by (symbol, date)
+        :param skip_unchanged: Store a content hash with historical, IPO, split and
+                               macro indicator documents and skip writes of documents
+                               whose stored hash is unchanged
+        :param bulk_chunk_size: Maximum number of operations per bulk_write call
+        :param bulk_workers: Maximum number of collections written concurrently
+        :param query_cache_bytes: Memory bound of the cache of read query results; 0 disables it
         """
+        if storage_layout not in (self.PER_SYMBOL, self.CONSOLIDATED):
+            raise ValueError(f"Unknown storage layout: {storage_layout}")
         super().__init__(mongo_uri)
         self.__logger = logging.getLogger(__name__)
+        self.__storage_layout = storage_layout
+        self.__skip_unchanged = skip_unchanged
+        self.__bulk_writer = BulkWriter(chunk_size=bulk_chunk_size, max_workers=bulk_workers)
+        # Full names of collections whose indexes have been ensured by this process
+        self.__indexed_collections = set()
+        self.__index_lock = threading.Lock()
+        self.__query_cache = QueryCache(query_cache_bytes) if query_cache_bytes else None
+
+    @property
+    def storage_layout(self):
+        return self.__storage_layout
+
+    def _symbol_collection(self, data_type, symbol, storage_layout=None):
+        """
+        Returns the collection holding a symbol's data and the fields identifying
+        the symbol inside it, depending on the storage layout.
+
+        :param data_type: Data type database name (e.g. 'historical_data')
+        :param symbol: Stock symbol (ticker)
+        :param storage_layout: Overrides the client's storage layout
+        :return: Tuple of (collection, symbol key fields)
+        """
+        if (storage_layout or self.__storage_layout) == self.CONSOLIDATED:
+            collection, key = self[self.CONSOLIDATED_DB][data_type], {"symbol": symbol}
+        else:
+            collection, key = self[data_type][symbol], {}
+        self._ensure_indexes(collection, data_type, key)
+        return collection, key
+
+    def _read_collection(self, data_type, symbol):
+        """
+        Returns the collection holding a symbol's data and the symbol key fields
+        like _symbol_collection, but without ensuring indexes: creating an index
+        would create an empty collection for a symbol that has no data.
+        """
+        if self.__storage_layout == self.CONSOLIDATED:
+            return self[self.CONSOLIDATED_DB][data_type], {"symbol": symbol}
+        return self[data_type][symbol], {}
+
+    def _calendar_collection(self, data_type):
+        """
+        Returns the collection of a data type that is not split by symbol.
+
+        :param data_type: One of CALENDAR_COLLECTIONS
+        :return: Collection with its indexes ensured
+        """
+        db_name, collection_name = CALENDAR_COLLECTIONS[data_type]
+        collection = self[db_name][collection_name]
+        self._ensure_indexes(collection, data_type, {})
+        return collection
+
+    def _index_specs(self, data_type, key):
+        """
+        Returns the index key lists declared for a data type.
+        """
+        specs = [[(field, ASCENDING) for field in list(key) + list(NATURAL_KEYS[data_type])]]
+        if key and 'date' in NATURAL_KEYS[data_type]:
+            # Cross-sectional queries (all symbols on a date)
+            specs.append([("date", ASCENDING), ("symbol", ASCENDING)])
+        return specs
+
+    def _ensure_indexes(self, collection, data_type, key):
+        """
+        Creates the declared indexes of a collection the first time this
+        process touches it; subsequent calls are free.
+        """
+        if collection.full_name in self.__indexed_collections:
+            return
+        with self.__index_lock:
+            if collection.full_name in self.__indexed_collections:
+                return
+            specs = self._index_specs(data_type, key)
+            try:
+                collection.create_index(specs[0], unique=True)
+            except DuplicateKeyError as e:
+                # Collections written by older versions can hold several documents per natural key;
+                # writes still work without the unique index until drop_legacy_indexes deduplicates them
+                logger.warning(
+                    f"Unique index on {collection.full_name} not created, duplicate {data_type} documents exist "
+                    f"(run migrate_storage.py --drop-legacy-indexes): {e}"
+                )
+            for spec in specs[1:]:
+                collection.create_index(spec)
+            self.__indexed_collections.add(collection.full_name)
+
+    def _deduplicate(self, collection, data_type, key):
+        """
+        Deletes all but the most recently inserted document of every natural key.
+
+        :param collection: Collection to clean up
+        :param data_type: Data type name from NATURAL_KEYS
+        :param key: Symbol key fields of the collection
+        :return: Number of deleted documents
+        """
+        fields = list(key) + list(NATURAL_KEYS[data_type])
+        duplicates = collection.aggregate([
+            {"$sort": {"_id": ASCENDING}},
+            {"$group": {"_id": {field: f"${field}" for field in fields}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ], allowDiskUse=True)
+        # ObjectIds grow with insertion time, so the last id is the newest version of the document
+        stale = [document_id for group in duplicates for document_id in group["ids"][:-1]]
+        if not stale:
+            return 0
+        return collection.delete_many({"_id": {"$in": stale}}).deleted_count
+
+    def _upsert_operations(self, collection, data_type, key, items):
+        """
+        Builds upserts keyed on the natural key of the data type. In change-detection
+        mode the stored hashes of the batch's key range are fetched in one query,
+        narrowed by the other natural-key fields of the batch (e.g. the country and
+        indicator of macro indicators), and items whose content is unchanged are left out.
+
+        :param collection: Target collection
+        :param data_type: Data type name from NATURAL_KEYS
+        :param key: Symbol key fields of the collection
+        :param items: List of dictionaries to store
+        :return: List of UpdateOne operations
+        """
+        fields = NATURAL_KEYS[data_type]
+        if not items:
+            return []
+        if not self.__skip_unchanged:
+            return [
+                UpdateOne({**key, **{field: item[field] for field in fields}}, {"$set": {**item, **key}}, upsert=True)
+                for item in items
+            ]
+
+        range_field = HASH_RANGE_FIELDS[data_type]
+        # Items without a range value (e.g. an IPO without a start date) cannot bound the range
+        # and are looked up by exact match
+        values = [item.get(range_field) for item in items if item.get(range_field) is not None]
+        bounds = [{range_field: {"$gte": min(values), "$lte": max(values)}}] if values else []
+        if len(values) < len(items):
+            bounds.append({range_field: None})
+        query = {**key, **bounds[0]} if len(bounds) == 1 else {**key, "$or": bounds}
+        for field in fields:
+            if field != range_field:
+                field_values = list(dict.fromkeys(item[field] for item in items))
+                query[field] = field_values[0] if len(field_values) == 1 else {"$in": field_values}
+        projection = {field: 1 for field in fields}
+        projection.update({"_hash": 1, "_id": 0})
+        stored = {
+            tuple(document.get(field) for field in fields): document.get("_hash")
+            for document in collection.find(query, projection)
+        }
+
+        operations = []
+        for item in items:
+            item_hash = content_hash(item)
+            item_key = {field: item[field] for field in fields}
+            if stored.get(tuple(item_key.values())) == item_hash:
+                continue
+            operations.append(UpdateOne({**key, **item_key}, {"$set": {**item, **key, "_hash": item_hash}}, upsert=True))
+
+        if len(operations) < len(items):
+            logger.info(f"Skipped {len(items) - len(operations)} unchanged {data_type} documents in {collection.full_name}")
+        return operations
+
+    def ensure_indexes(self):
+        """
+        Ensures the indexes of all collections known up front: the calendar
+        collections and, in the consolidated layout, the per-data-type collections.
+        Per-symbol collections are indexed on first touch.
+        """
+        for data_type in CALENDAR_COLLECTIONS:
+            self._calendar_collection(data_type)
+        self.fundamental_history.changes.create_index(
+            [("symbol", ASCENDING), ("section", ASCENDING), ("changed_at", DESCENDING)]
+        )
+        if self.__storage_layout == self.CONSOLIDATED:
+            for data_type in ('historical_data', 'adjusted_data', 'news_data', 'earnings_data', 'trends_data'):
+                self._symbol_collection(data_type, None)
+
+    def drop_legacy_indexes(self, data_types=('earnings_data', 'trends_data')):
+        """
+        Drops indexes that are not declared in the schema, such as the
+        all-fields indexes older versions created for earnings and trends.
+        Older versions also inserted a new document whenever a record changed, so
+        duplicate documents per natural key are deleted (keeping the newest) and the
+        declared unique index is created.
+
+        :param data_types: Per-symbol data types to clean up
+        :return: Number of dropped indexes
+        """
+        dropped = deleted = 0
+        for data_type in data_types:
+            if self.__storage_layout == self.CONSOLIDATED:
+                collections = [(self[self.CONSOLIDATED_DB][data_type], {"symbol": None})]
+            else:
+                collections = [(self[data_type][name], {}) for name in self[data_type].list_collection_names()]
+            for collection, key in collections:
+                declared = self._index_specs(data_type, key)
+                for name, info in collection.index_information().items():
+                    if name == '_id_' or [tuple(field) for field in info['key']] in declared:
+                        continue
+                    collection.drop_index(name)
+                    dropped += 1
+                deleted += self._deduplicate(collection, data_type, key)
+                self.__indexed_collections.discard(collection.full_name)
+                self._ensure_indexes(collection, data_type, key)
+        logger.info(f"Dropped {dropped} legacy indexes and {deleted} duplicate documents")
+        return dropped
 
     def __enter__(self):
         """
@@ -33,6 +450,19 @@ class EodhdMongoClient(MongoClient):
         self.close()
         logger.info("MongoDB connection closed.")
 
+    def close(self):
+        """
+        Closes the bulk writer and the MongoDB connection.
+        """
+        self.__bulk_writer.close()
+        super().close()
+
+    def bulk_write_stats(self):
+        """
+        Returns the counters, throughput and errors of all bulk writes.
+        """
+        return self.__bulk_writer.stats()
+
     def test_connection(self):
         """
         Tests the connection to MongoDB.
@@ -43,51 +473,582 @@ class EodhdMongoClient(MongoClient):
         except Exception as e:
             logger.error(f"Error connecting to MongoDB: {e}")
 
+    @timed('eodhd_store_seconds')
     def store_historical_data(self, symbol, data):
         """
         Stores historical data for the specified symbol.
         
         :param symbol: Stock symbol (ticker)
-        :param data: List of dictionaries with historical data
+        :param data: List of dictionaries, structured array or DataFrame with historical data
+        :return: Number of bars inserted or modified
         """
-        if data:
-            self.historical_data[symbol].create_index([("date", ASCENDING)], unique=True)
-            operations = [
-                UpdateOne({"date": item["date"]}, {"$set": item}, upsert=True)
-                for item in data
-            ]
-            self.historical_data[symbol].bulk_write(operations)
+        return self._store_bars(symbol, data)
+
+    def _store_bars(self, symbol, data, storage_layout=None):
+        data = to_records(data)
+        if not data:
+            return 0
+        collection, key = self._symbol_collection('historical_data', symbol, storage_layout)
+        operations = self._upsert_operations(collection, 'historical_data', key, data)
+        if not operations:
+            return 0
+        summary = self.__bulk_writer.write(collection, operations)
+        self._invalidate('historical_data', symbol)
+        BulkWriter.raise_for_errors('historical_data', {symbol: summary})
+        return summary['upserted'] + summary['modified']
+
+    @timed('eodhd_store_seconds')
+    def store_adjusted_data(self, symbol, data):
+        """
+        Stores split-adjusted bars for the specified symbol.
+
+        :param symbol: Stock symbol (ticker)
+        :param data: List of dictionaries, structured array or DataFrame with adjusted bars
+        :return: Number of bars inserted or modified
+        """
+        data = to_records(data)
+        if not data:
+            return 0
+        collection, key = self._symbol_collection('adjusted_data', symbol)
+        operations = self._upsert_operations(collection, 'adjusted_data', key, data)
+        if not operations:
+            return 0
+        summary = self.__bulk_writer.write(collection, operations)
+        self._invalidate('adjusted_data', symbol)
+        BulkWriter.raise_for_errors('adjusted_data', {symbol: summary})
+        return summary['upserted'] + summary['modified']
+
+    def get_latest_historical_date(self, symbol):
+        """
+        Returns the most recent bar date stored for the specified symbol.
+
+        :param symbol: Stock symbol (ticker)
+        :return: Date string (YYYY-MM-DD) or None if no history is stored
+        """
+        collection, key = self._read_collection('historical_data', symbol)
+        latest = collection.find_one(key, {"date": 1, "_id": 0}, sort=[("date", DESCENDING)])
+        return latest["date"] if latest else None
+
+    def get_cross_section(self, date, symbols=None, fields=("close",)):
+        """
+        Returns the bars of many symbols for a single date.
+
+        :param date: Date string (YYYY-MM-DD)
+        :param symbols: Optional list of symbols; defaults to all stored symbols
+        :param fields: Bar fields to return
+        :return: Dictionary mapping symbol to a dictionary with the requested fields
+        """
+        projection = {field: 1 for field in fields}
+        projection["_id"] = 0
+        if self.__storage_layout == self.CONSOLIDATED:
+            query = {"date": date}
+            if symbols is not None:
+                query["symbol"] = {"$in": list(symbols)}
+            projection["symbol"] = 1
+            return {
+                bar.pop("symbol"): bar
+                for bar in self[self.CONSOLIDATED_DB].historical_data.find(query, projection)
+            }
+
+        cross_section = {}
+        for symbol in symbols if symbols is not None else self.historical_data.list_collection_names():
+            bar = self.historical_data[symbol].find_one({"date": date}, projection)
+            if bar is not None:
+                cross_section[symbol] = bar
+        return cross_section
+
+    def _invalidate(self, data_type, symbol=None):
+        if self.__query_cache is not None:
+            self.__query_cache.invalidate(data_type, symbol)
+
+    def query_cache_stats(self):
+        """
+        Returns the hit, miss, eviction and invalidation counters of the query cache.
+        """
+        return self.__query_cache.stats() if self.__query_cache is not None else {}
+
+    def _cached_query(self, key, tags, query):
+        # Cached results are shared, so frames are copied and records shallow-copied on the way out
+        if self.__query_cache is None:
+            return query()
+        result = self.__query_cache.get(key)
+        if result is None:
+            generation = self.__query_cache.generation
+            result = query()
+            self.__query_cache.set(key, result, tags, generation=generation)
+        if isinstance(result, pd.DataFrame):
+            return result.copy()
+        return [dict(record) for record in result]
+
+    def _read_projection(self, fields, required=()):
+        if fields is None:
+            return {"_id": 0, "_hash": 0}
+        projection = {field: 1 for field in (*required, *fields)}
+        projection["_id"] = 0
+        return projection
+
+    def _find_symbols(self, data_type, symbols, query, projection, sort=None, limit=None):
+        """
+        Runs one query for many symbols of a per-symbol data type.
+        The consolidated layout answers with a single $in query unless a per-symbol limit is needed.
+
+        :return: List of documents, each with a 'symbol' field
+        """
+        if self.__storage_layout == self.CONSOLIDATED and limit is None:
+            collection = self[self.CONSOLIDATED_DB][data_type]
+            if projection.get("_hash") != 0:
+                # Inclusion projections have to name the symbol field
+                projection = {**projection, "symbol": 1}
+            query = {**query, "symbol": {"$in": list(symbols)}}
+            cursor = collection.find(query, projection)
+            return list(cursor.sort(sort) if sort else cursor)
+
+        records = []
+        for symbol in symbols:
+            collection, key = self._read_collection(data_type, symbol)
+            cursor = collection.find({**query, **key}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            for record in cursor:
+                record["symbol"] = symbol
+                records.append(record)
+        return records
+
+    @staticmethod
+    def _to_output(records, output, date_field=None):
+        if output == 'records':
+            return records
+        if output != 'frame':
+            raise ValueError(f"Unknown output: {output}")
+        frame = pd.DataFrame(records)
+        if date_field and date_field in frame.columns:
+            frame[date_field] = pd.to_datetime(frame[date_field])
+        return frame
+
+    def get_historical_range(self, symbols, from_date=None, to_date=None, fields=None, output='frame', adjusted=False):
+        """
+        Returns the bars of many symbols within a date range.
+        The date range and projection are evaluated by MongoDB.
+
+        :param symbols: List of stock symbols (tickers)
+        :param from_date: First date (YYYY-MM-DD), inclusive
+        :param to_date: Last date (YYYY-MM-DD), inclusive
+        :param fields: Bar fields to return (e.g. ('close', 'volume')); defaults to all fields
+        :param output: 'frame' for a DataFrame with symbol and date columns, 'records' for a list of dictionaries
+        :param adjusted: Read the split-adjusted bars materialized by adjustments.AdjustmentEngine
+        :return: Bars sorted by symbol and date
+        """
+        data_type = 'adjusted_data' if adjusted else 'historical_data'
+        symbols = list(symbols)
+        query = {}
+        if from_date or to_date:
+            query["date"] = {}
+            if from_date:
+                query["date"]["$gte"] = from_date
+            if to_date:
+                query["date"]["$lte"] = to_date
+        key = ('historical_range', data_type, tuple(symbols), from_date, to_date, tuple(fields) if fields else None, output)
+        tags = [(data_type, symbol) for symbol in symbols]
+
+        def query_bars():
+            projection = self._read_projection(fields, required=("date",))
+            records = self._find_symbols(data_type, symbols, query, projection, sort=[("date", ASCENDING)])
+            records.sort(key=lambda record: (record["symbol"], record["date"]))
+            return self._to_output(records, output, date_field="date")
+
+        return self._cached_query(key, tags, query_bars)
+
+    def get_latest_news(self, symbols, limit=10, fields=None, output='records'):
+        """
+        Returns the latest news articles of every symbol.
+
+        :param symbols: List of stock symbols (tickers)
+        :param limit: Number of articles per symbol
+        :param fields: Article fields to return (e.g. ('title', 'sentiment')); defaults to all fields
+        :param output: 'records' for a list of dictionaries, 'frame' for a DataFrame
+        :return: Articles of every symbol, newest first
+        """
+        symbols = list(symbols)
+        key = ('latest_news', tuple(symbols), limit, tuple(fields) if fields else None, output)
+        tags = [('news_data', symbol) for symbol in symbols]
+
+        def query_news():
+            projection = self._read_projection(fields, required=("date",))
+            records = self._find_symbols('news_data', symbols, {}, projection, sort=[("date", DESCENDING)], limit=limit)
+            return self._to_output(records, output, date_field="date")
+
+        return self._cached_query(key, tags, query_news)
+
+    def get_calendar_window(self, data_type, from_date=None, to_date=None, symbols=None, fields=None, output='frame'):
+        """
+        Returns calendar records within a date window.
+
+        :param data_type: 'earnings_data', 'trends_data', 'ipos', 'splits' or 'macro_indicators'
+        :param from_date: First date (YYYY-MM-DD), inclusive
+        :param to_date: Last date (YYYY-MM-DD), inclusive
+        :param symbols: Symbols to return for earnings and trends; defaults to all stored symbols
+        :param fields: Fields to return; defaults to all fields
+        :param output: 'frame' for a DataFrame, 'records' for a list of dictionaries
+        :return: Records sorted by date
+        """
+        date_field = HASH_RANGE_FIELDS.get(data_type, 'date')
+        query = {}
+        if from_date or to_date:
+            query[date_field] = {}
+            if from_date:
+                query[date_field]["$gte"] = from_date
+            if to_date:
+                query[date_field]["$lte"] = to_date
+        if symbols is not None:
+            symbols = list(symbols)
+        key = ('calendar_window', data_type, from_date, to_date,
+               tuple(symbols) if symbols is not None else None, tuple(fields) if fields else None, output)
+        tags = [(data_type, symbol) for symbol in symbols] if symbols is not None else [(data_type, None)]
+
+        def query_calendar():
+            projection = self._read_projection(fields, required=(date_field,))
+            if data_type in CALENDAR_COLLECTIONS:
+                records = list(self._calendar_collection(data_type).find(query, projection).sort(date_field, ASCENDING))
+            else:
+                window_symbols = symbols
+                if window_symbols is None:
+                    if self.__storage_layout == self.CONSOLIDATED:
+                        window_symbols = self[self.CONSOLIDATED_DB][data_type].distinct("symbol")
+                    else:
+                        window_symbols = self[data_type].list_collection_names()
+                records = self._find_symbols(data_type, window_symbols, query, projection)
+                records.sort(key=lambda record: (record[date_field], record["symbol"]))
+            return self._to_output(records, output, date_field=date_field)
+
+        return self._cached_query(key, tags, query_calendar)
+
+    @timed('eodhd_store_seconds')
+    def store_bulk_historical_data(self, data, symbol_map=None):
+        """
+        Stores exchange-wide end-of-day rows, fanning them out to the
+        per-symbol historical data collections; the symbols are written concurrently.
 
+        :param data: List of dictionaries from the bulk end-of-day endpoint
+        :param symbol_map: Optional mapping of bulk row ``code`` to symbol
+                           (collection name); rows with unmapped codes are skipped
+        :return: Dictionary mapping symbol to the number of bars written
+        """
+        symbol_bars = {}
+        for row in data or []:
+            code = row.get('code')
+            if not code:
+                logger.warning(f"Symbol code is missing in bulk end-of-day data: {row}")
+                continue
+            symbol = code if symbol_map is None else symbol_map.get(code)
+            if symbol is None:
+                continue
+            bar = {key: value for key, value in row.items() if key not in ('code', 'exchange_short_name')}
+            symbol_bars.setdefault(symbol, []).append(bar)
+
+        written = self.store_historical_data_many(symbol_bars)
+        logger.info(f"Bulk end-of-day data stored for {len(written)} symbols")
+        return written
+
+    @timed('eodhd_store_seconds')
+    def store_historical_data_many(self, symbol_bars):
+        """
+        Stores historical data of many symbols; the symbols are written concurrently.
+
+        :param symbol_bars: Dictionary mapping symbol to a list of bar dictionaries
+        :return: Dictionary mapping symbol to the number of bars written
+        """
+        symbols, batches = [], []
+        for symbol, bars in symbol_bars.items():
+            bars = to_records(bars)
+            if not bars:
+                continue
+            collection, key = self._symbol_collection('historical_data', symbol)
+            operations = self._upsert_operations(collection, 'historical_data', key, bars)
+            if operations:
+                symbols.append(symbol)
+                batches.append((collection, operations))
+
+        written = dict.fromkeys(symbol_bars, 0)
+        summaries = dict(zip(symbols, self.__bulk_writer.write_many(batches)))
+        for symbol, summary in summaries.items():
+            written[symbol] = summary['upserted'] + summary['modified']
+            self._invalidate('historical_data', symbol)
+        BulkWriter.raise_for_errors('historical_data', summaries)
+        return written
+
+    def _symbols_with_bars(self, symbols=None):
+        # A collection name alone does not mean history is stored: the collection may have been
+        # created empty (e.g. by an index), so every candidate is checked for a document
+        if self.__storage_layout == self.CONSOLIDATED:
+            query = {"symbol": {"$in": list(symbols)}} if symbols is not None else {}
+            return set(self[self.CONSOLIDATED_DB].historical_data.distinct("symbol", query))
+        names = set(self.historical_data.list_collection_names())
+        candidates = names if symbols is None else names.intersection(symbols)
+        return {symbol for symbol in candidates if self.historical_data[symbol].find_one({}, {"_id": 1}) is not None}
+
+    def symbols_without_history(self, symbols):
+        """
+        Returns the symbols that have no stored bars yet.
+
+        :param symbols: List of stock symbols (tickers)
+        :return: List of symbols that need a full backfill
+        """
+        existing = self._symbols_with_bars(symbols)
+        return [symbol for symbol in symbols if symbol not in existing]
+
+    def symbols_with_history(self):
+        """
+        Returns all symbols with stored historical data.
+        """
+        return sorted(self._symbols_with_bars())
+
+    def get_universe(self, exchange, max_age_seconds=None):
+        """
+        Returns the cached symbol list of an exchange.
+
+        :param exchange: Exchange code (e.g. 'US')
+        :param max_age_seconds: Treat lists refreshed longer ago than this as missing
+        :return: Document with 'symbols', 'added', 'delisted' and 'refreshed_at', or None
+        """
+        universe = self.universe.exchanges.find_one({"_id": exchange})
+        if universe is None or max_age_seconds is None:
+            return universe
+        refreshed_at = universe["refreshed_at"]
+        if refreshed_at.tzinfo is None:
+            refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - refreshed_at).total_seconds() > max_age_seconds:
+            return None
+        return universe
+
+    @timed('eodhd_store_seconds')
+    def store_universe(self, exchange, symbols):
+        """
+        Replaces the cached symbol list of an exchange and diffs it against the previous list.
+
+        :param exchange: Exchange code (e.g. 'US')
+        :param symbols: Symbols currently listed on the exchange
+        :return: Tuple of (new listings, delisted symbols)
+        """
+        previous = self.universe.exchanges.find_one({"_id": exchange}, {"symbols": 1})
+        previous_symbols = set(previous["symbols"]) if previous else set()
+        current_symbols = set(symbols)
+        added = sorted(current_symbols - previous_symbols)
+        delisted = sorted(previous_symbols - current_symbols)
+        self.universe.exchanges.replace_one(
+            {"_id": exchange},
+            {
+                "symbols": sorted(current_symbols),
+                "added": added,
+                "delisted": delisted,
+                "refreshed_at": datetime.now(timezone.utc)
+            },
+            upsert=True
+        )
+        logger.info(f"Universe of {exchange}: {len(current_symbols)} symbols, {len(added)} new, {len(delisted)} delisted")
+        return added, delisted
+
+    MIGRATED_DATA_TYPES = ('historical_data', 'news_data', 'earnings_data', 'trends_data', 'adjusted_data')
+
+    def migrate_to_consolidated(self, data_types=MIGRATED_DATA_TYPES, batch_size=10000, drop_source=False):
+        """
+        Copies per-symbol collections into the consolidated layout.
+        The migration is idempotent: documents are upserted on their natural key.
+
+        :param data_types: Per-symbol databases to migrate
+        :param batch_size: Number of documents written per bulk write
+        :param drop_source: Drop each source collection after it has been copied
+        :return: Dictionary mapping data type to the number of documents copied
+        """
+        store = {
+            'historical_data': self._store_bars,
+            'news_data': self._store_news,
+        }
+
+        copied = {}
+        for data_type in data_types:
+            store_documents = store.get(data_type, functools.partial(self._store_documents, data_type))
+            copied[data_type] = 0
+            for symbol in self[data_type].list_collection_names():
+                batch = []
+                # Insertion order, so the newest of several legacy documents per natural key wins
+                for document in self[data_type][symbol].find({}, {"_id": 0}).sort("_id", ASCENDING):
+                    batch.append(document)
+                    if len(batch) >= batch_size:
+                        store_documents(symbol, batch, self.CONSOLIDATED)
+                        copied[data_type] += len(batch)
+                        batch = []
+                if batch:
+                    store_documents(symbol, batch, self.CONSOLIDATED)
+                    copied[data_type] += len(batch)
+                if drop_source:
+                    self[data_type].drop_collection(symbol)
+            logger.info(f"Migrated {copied[data_type]} {data_type} documents to the consolidated layout")
+        return copied
+
+    def _store_documents(self, data_type, symbol, documents, storage_layout=None):
+        # Upserts documents of a per-symbol data type on its natural key
+        fields = NATURAL_KEYS[data_type]
+        collection, key = self._symbol_collection(data_type, symbol, storage_layout)
+        operations = [
+            UpdateOne({**key, **{field: document.get(field) for field in fields}}, {"$set": {**document, **key}}, upsert=True)
+            for document in documents
+        ]
+        summary = self.__bulk_writer.write(collection, operations)
+        self._invalidate(data_type, symbol)
+        BulkWriter.raise_for_errors(data_type, {symbol: summary})
+        return summary['upserted'] + summary['modified']
+
+    @timed('eodhd_store_seconds')
     def store_news_data(self, symbol, data):
         """
         Stores news data for the specified symbol.
         
         :param symbol: Stock symbol (ticker)
         :param data: List of dictionaries with news data
+        :return: Number of articles inserted or modified
         """
-        if data:
-            # Create a compound index on date and title (assuming title is unique for a given date)
-            self.news_data[symbol].create_index([("date", ASCENDING), ("title", ASCENDING)], unique=True)
-            operations = [
-                UpdateOne(
-                    {"date": item["date"], "title": item["title"]},
-                    {"$set": item},
-                    upsert=True
-                )
-                for item in data
-            ]
-            self.news_data[symbol].bulk_write(operations)
+        return self._store_news(symbol, data)
 
+    @timed('eodhd_store_seconds')
+    def store_news_data_many(self, symbol_articles):
+        """
+        Stores news data of many symbols; the symbols are written concurrently.
+
+        :param symbol_articles: Dictionary mapping symbol to a list of articles
+        :return: Dictionary mapping symbol to the number of articles written
+        """
+        symbols, batches = [], []
+        for symbol, data in symbol_articles.items():
+            if data:
+                symbols.append(symbol)
+                batches.append(self._news_batch(symbol, data))
+
+        written = dict.fromkeys(symbol_articles, 0)
+        summaries = dict(zip(symbols, self.__bulk_writer.write_many(batches)))
+        for symbol, summary in summaries.items():
+            written[symbol] = summary['upserted'] + summary['modified']
+            self._invalidate('news_data', symbol)
+        BulkWriter.raise_for_errors('news_data', summaries)
+        return written
+
+    def _news_batch(self, symbol, data, storage_layout=None):
+        # Keyed on date and title (assuming title is unique for a given date).
+        # The feed repeats articles, so duplicates within the batch are dropped before the bulk write.
+        articles = {(item["date"], item["title"]): item for item in data}
+        collection, key = self._symbol_collection('news_data', symbol, storage_layout)
+        operations = [
+            UpdateOne(
+                {**key, "date": date, "title": title},
+                {"$set": {**item, **key}},
+                upsert=True
+            )
+            for (date, title), item in articles.items()
+        ]
+        return collection, operations
+
+    def _store_news(self, symbol, data, storage_layout=None):
+        if not data:
+            return 0
+        summary = self.__bulk_writer.write(*self._news_batch(symbol, data, storage_layout))
+        self._invalidate('news_data', symbol)
+        BulkWriter.raise_for_errors('news_data', {symbol: summary})
+        return summary['upserted'] + summary['modified']
+
+    def get_news_sync_state(self, symbol):
+        """
+        Returns the watermark of a symbol's stored news and the keys of the articles
+        stored since the start of the watermark day, for incremental news sync.
+
+        :param symbol: Stock symbol (ticker)
+        :return: Tuple of (from date YYYY-MM-DD or None, set of news_key values)
+        """
+        collection, key = self._read_collection('news_data', symbol)
+        latest = collection.find_one(key, {"date": 1, "_id": 0}, sort=[("date", DESCENDING)])
+        if latest is None:
+            return None, set()
+        # The API's from filter has day granularity, so every article of the watermark day is returned again
+        from_date = latest["date"][:10]
+        seen = {
+            news_key(article)
+            for article in collection.find({**key, "date": {"$gte": from_date}}, {"date": 1, "title": 1, "_id": 0})
+        }
+        return from_date, seen
+
+    @timed('eodhd_store_seconds')
     def store_fundamental_data(self, symbol, data):
         """
         Stores fundamental data for the specified symbol.
+        Only sections whose content hash changed are written; sections missing
+        from data (e.g. because of a section filter) are left untouched.
         
         :param symbol: Stock symbol (ticker)
-        :param data: Dictionary with fundamental data
+        :param data: Dictionary with fundamental data keyed by section
+        :return: Names of the sections that were written
+        """
+        if not data:
+            return []
+        return self._store_fundamental_sections(symbol, data)
+
+    @timed('eodhd_store_seconds')
+    def store_fundamental_section(self, symbol, section, data):
+        """
+        Stores a single section of fundamental data for the specified symbol,
+        leaving the other sections of the document untouched.
+
+        :param symbol: Stock symbol (ticker)
+        :param section: Name of the fundamentals section (e.g. 'Highlights')
+        :param data: Section payload
+        :return: Names of the sections that were written
+        """
+        return self._store_fundamental_sections(symbol, {section: data})
+
+    def _store_fundamental_sections(self, symbol, sections):
+        # Section hashes are kept next to the sections in '_hashes', so one small read tells what changed
+        collection = self.fundamental_data[symbol]
+        stored = collection.find_one({}, {"_hashes": 1}) or {}
+        stored_hashes = stored.get("_hashes", {})
+        hashes = {section: content_hash(payload) for section, payload in sections.items()}
+        changed = [section for section, section_hash in hashes.items() if stored_hashes.get(section) != section_hash]
+        if not changed:
+            return []
+
+        now = datetime.now(timezone.utc)
+        update = {"_updated_at": now}
+        for section in changed:
+            update[section] = sections[section]
+            update[f"_hashes.{section}"] = hashes[section]
+        collection.update_one({}, {"$set": update}, upsert=True)
+
+        # Compact version history: one small document per section change, without the payload
+        self.fundamental_history.changes.insert_many([
+            {
+                "symbol": symbol,
+                "section": section,
+                "hash": hashes[section],
+                "previous_hash": stored_hashes.get(section),
+                "changed_at": now
+            }
+            for section in changed
+        ])
+        logger.info(f"Fundamental data for {symbol}: {len(changed)} of {len(sections)} sections changed")
+        return changed
+
+    def get_fundamental_history(self, symbol, section=None):
+        """
+        Returns the recorded section changes of a symbol, newest first.
+
+        :param symbol: Stock symbol (ticker)
+        :param section: Optional section name to filter on
+        :return: List of change documents (section, hash, previous_hash, changed_at)
         """
-        if data:
-            self.fundamental_data[symbol].replace_one({}, data, upsert=True)
+        query = {"symbol": symbol}
+        if section:
+            query["section"] = section
+        return list(self.fundamental_history.changes.find(query, {"_id": 0}).sort("changed_at", DESCENDING))
 
+    @timed('eodhd_store_seconds')
     def store_earnings_data(self, data: dict):
         """
         Stores earnings data in the database.
@@ -114,30 +1075,33 @@ class EodhdMongoClient(MongoClient):
                     symbol_data[symbol] = []
                 symbol_data[symbol].append(item)
 
+            batches = []
             for symbol, items in symbol_data.items():
-                collection = self.earnings_data[symbol]
+                collection, key = self._symbol_collection('earnings_data', symbol)
                 
-                # Create a compound index on all fields of the first item
-                if items:
-                    index_fields = [(field, ASCENDING) for field in items[0].keys()]
-                    collection.create_index(index_fields, unique=True)
-                
-                    operations = [
-                        UpdateOne(
-                            item,  # Use all fields as the filter
-                            {"$set": item},
-                            upsert=True
-                        ) for item in items
-                    ]
-                    result = collection.bulk_write(operations)
-                    logger.info(f"Upserted {result.upserted_count} and modified {result.modified_count} earnings records for symbol: {symbol}")
-                else:
-                    logger.info(f"No earnings data found for symbol: {symbol}")
+                # One record per symbol, period date and report date
+                operations = [
+                    UpdateOne(
+                        {**key, **{field: item.get(field) for field in NATURAL_KEYS['earnings_data']}},
+                        {"$set": {**item, **key}},
+                        upsert=True
+                    ) for item in items
+                ]
+                batches.append((collection, operations))
+
+            summaries = dict(zip(symbol_data, self.__bulk_writer.write_many(batches)))
+            for symbol, summary in summaries.items():
+                self._invalidate('earnings_data', symbol)
+                logger.info(f"Upserted {summary['upserted']} and modified {summary['modified']} earnings records for symbol: {symbol}")
+            BulkWriter.raise_for_errors('earnings_data', summaries)
 
             logger.info(f"Earnings data processing completed for {len(symbol_data)} symbols")
+        except StoreError:
+            raise
         except Exception as e:
             logger.error(f"Error occurred while storing earnings data: {e}")
 
+    @timed('eodhd_store_seconds')
     def store_trends_data(self, data: dict):
         """
         Stores trends data in the database.
@@ -151,6 +1115,7 @@ class EodhdMongoClient(MongoClient):
         trends = data['trends']
 
         try:
+            symbols, batches = [], []
             for symbol_data in trends:
                 if not symbol_data:
                     continue
@@ -159,29 +1124,32 @@ class EodhdMongoClient(MongoClient):
                     logger.warning(f"Symbol code is missing in trends data: {symbol_data}")
                     continue
 
-                collection = self.trends_data[symbol]
+                collection, key = self._symbol_collection('trends_data', symbol)
                 
-                # Create a compound index on all fields of the first item
-                if symbol_data:
-                    index_fields = [(field, ASCENDING) for field in symbol_data[0].keys()]
-                    collection.create_index(index_fields, unique=True)
-                
-                    operations = [
-                        UpdateOne(
-                            item,  # Use all fields as the filter
-                            {"$set": item},
-                            upsert=True
-                        ) for item in symbol_data
-                    ]
-                    result = collection.bulk_write(operations)
-                    logger.info(f"Upserted {result.upserted_count} and modified {result.modified_count} trends records for symbol: {symbol}")
-                else:
-                    logger.info(f"No trends data found for symbol: {symbol}")
+                # One record per symbol, date and forecast period
+                operations = [
+                    UpdateOne(
+                        {**key, **{field: item.get(field) for field in NATURAL_KEYS['trends_data']}},
+                        {"$set": {**item, **key}},
+                        upsert=True
+                    ) for item in symbol_data
+                ]
+                symbols.append(symbol)
+                batches.append((collection, operations))
+
+            summaries = dict(zip(symbols, self.__bulk_writer.write_many(batches)))
+            for symbol, summary in summaries.items():
+                self._invalidate('trends_data', symbol)
+                logger.info(f"Upserted {summary['upserted']} and modified {summary['modified']} trends records for symbol: {symbol}")
+            BulkWriter.raise_for_errors('trends_data', summaries)
 
             logger.info(f"Trends data processing completed for {len(trends)} symbols")
+        except StoreError:
+            raise
         except Exception as e:
             logger.error(f"Error occurred while storing trends data: {e}")
 
+    @timed('eodhd_store_seconds')
     def store_ipos_data(self, data: dict):
         """
         Stores IPOs data in the database.
@@ -195,30 +1163,23 @@ class EodhdMongoClient(MongoClient):
         ipos = data['ipos']
 
         try:
-            collection = self['ipos_splits']['ipos']
-            
-            # Create a compound index on 'code' and 'start_date' fields
-            collection.create_index([("code", ASCENDING), ("start_date", ASCENDING)], unique=True)
-            
-            operations = []
-            for ipo in ipos:
-                operations.append(
-                    UpdateOne(
-                        {"code": ipo['code'], "start_date": ipo['start_date']},
-                        {"$set": ipo},
-                        upsert=True
-                    )
-                )
+            collection = self._calendar_collection('ipos')
+            operations = self._upsert_operations(collection, 'ipos', {}, ipos)
             
             if operations:
-                result = collection.bulk_write(operations)
-                logger.info(f"Upserted {result.upserted_count} and modified {result.modified_count} IPO records")
+                summary = self.__bulk_writer.write(collection, operations)
+                self._invalidate('ipos')
+                logger.info(f"Upserted {summary['upserted']} and modified {summary['modified']} IPO records")
+                BulkWriter.raise_for_errors('ipos', {'all_data': summary})
             else:
                 logger.info("No IPO data to insert")
 
+        except StoreError:
+            raise
         except Exception as e:
             logger.error(f"Error occurred while storing IPOs data: {e}")
 
+    @timed('eodhd_store_seconds')
     def store_splits_data(self, data: dict):
         """
         Stores splits data in the database.
@@ -232,30 +1193,23 @@ class EodhdMongoClient(MongoClient):
         splits = data['splits']
 
         try:
-            collection = self['ipos_splits']['splits']
-            
-            # Create a compound index on 'code' and 'split_date' fields
-            collection.create_index([("code", ASCENDING), ("split_date", ASCENDING)], unique=True)
-            
-            operations = []
-            for split in splits:
-                operations.append(
-                    UpdateOne(
-                        {"code": split['code'], "split_date": split['split_date']},
-                        {"$set": split},
-                        upsert=True
-                    )
-                )
+            collection = self._calendar_collection('splits')
+            operations = self._upsert_operations(collection, 'splits', {}, splits)
             
             if operations:
-                result = collection.bulk_write(operations)
-                logger.info(f"Upserted {result.upserted_count} and modified {result.modified_count} split records")
+                summary = self.__bulk_writer.write(collection, operations)
+                self._invalidate('splits')
+                logger.info(f"Upserted {summary['upserted']} and modified {summary['modified']} split records")
+                BulkWriter.raise_for_errors('splits', {'all_data': summary})
             else:
                 logger.info("No split data to insert")
 
+        except StoreError:
+            raise
         except Exception as e:
             logger.error(f"Error occurred while storing splits data: {e}")
 
+    @timed('eodhd_store_seconds')
     def store_macro_indicators_data(self, data: dict):
         """
         Stores macro indicators data in the database.
@@ -267,34 +1221,153 @@ class EodhdMongoClient(MongoClient):
             return
 
         try:
-            collection = self['macro_indicators']['data']
-            
-            # Create a compound index on 'CountryCode', 'Indicator', and 'Date' fields
-            collection.create_index([
-                ("CountryCode", ASCENDING),
-                ("Indicator", ASCENDING),
-                ("Date", ASCENDING)
-            ], unique=True)
-            
-            operations = []
-            for indicator in data:
-                operations.append(
-                    UpdateOne(
-                        {
-                            "CountryCode": indicator['CountryCode'],
-                            "Indicator": indicator['Indicator'],
-                            "Date": indicator['Date']
-                        },
-                        {"$set": indicator},
-                        upsert=True
-                    )
-                )
+            collection = self._calendar_collection('macro_indicators')
+            operations = self._upsert_operations(collection, 'macro_indicators', {}, data)
             
             if operations:
-                result = collection.bulk_write(operations)
-                logger.info(f"Upserted {result.upserted_count} and modified {result.modified_count} macro indicator records")
+                summary = self.__bulk_writer.write(collection, operations)
+                self._invalidate('macro_indicators')
+                logger.info(f"Upserted {summary['upserted']} and modified {summary['modified']} macro indicator records")
+                BulkWriter.raise_for_errors('macro_indicators', {'all_data': summary})
             else:
                 logger.info("No macro indicators data to insert")
 
+        except StoreError:
+            raise
         except Exception as e:
-            logger.error(f"Error occurred while storing macro indicators data: {e}")
\ No newline at end of file
+            logger.error(f"Error occurred while storing macro indicators data: {e}")
+
+
+class AsyncEodhdMongoClient:
+    """
+    Asynchronous MongoDB client for working with EODHD data.
+    Exposes the same store_* methods as EodhdMongoClient, but runs them
+    in a bounded thread pool so that writes never block the event loop.
+    """
+
+    def __init__(self, mongo_uri, max_workers=4, **client_options):
+        """
+        Initialize the AsyncEodhdMongoClient.
+
+        :param mongo_uri: MongoDB connection URI
+        :param max_workers: Maximum number of concurrent database operations
+        :param client_options: Options of the underlying EodhdMongoClient
+        """
+        self.__client = EodhdMongoClient(mongo_uri, **client_options)
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='eodhd-mongo')
+
+    async def __aenter__(self):
+        """
+        Enter the asynchronous runtime context related to this object.
+        """
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Exit the asynchronous runtime context related to this object.
+        """
+        await self.close()
+
+    @property
+    def client(self):
+        """
+        The underlying synchronous EodhdMongoClient.
+        """
+        return self.__client
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        Runs a blocking client method in the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(func, *args, **kwargs))
+
+    async def close(self):
+        """
+        Waits for pending operations and closes the MongoDB connection.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.__executor.shutdown)
+        self.__client.close()
+        logger.info("MongoDB connection closed.")
+
+    async def test_connection(self):
+        return await self._run(self.__client.test_connection)
+
+    async def bulk_write_stats(self):
+        return await self._run(self.__client.bulk_write_stats)
+
+    async def ensure_indexes(self):
+        return await self._run(self.__client.ensure_indexes)
+
+    async def store_historical_data(self, symbol, data):
+        return await self._run(self.__client.store_historical_data, symbol, data)
+
+    async def store_adjusted_data(self, symbol, data):
+        return await self._run(self.__client.store_adjusted_data, symbol, data)
+
+    async def get_latest_historical_date(self, symbol):
+        return await self._run(self.__client.get_latest_historical_date, symbol)
+
+    async def get_cross_section(self, date, symbols=None, fields=("close",)):
+        return await self._run(self.__client.get_cross_section, date, symbols, fields)
+
+    async def get_historical_range(self, symbols, from_date=None, to_date=None, fields=None, output='frame', adjusted=False):
+        return await self._run(self.__client.get_historical_range, symbols, from_date, to_date, fields, output, adjusted)
+
+    async def get_latest_news(self, symbols, limit=10, fields=None, output='records'):
+        return await self._run(self.__client.get_latest_news, symbols, limit, fields, output)
+
+    async def get_calendar_window(self, data_type, from_date=None, to_date=None, symbols=None, fields=None, output='frame'):
+        return await self._run(self.__client.get_calendar_window, data_type, from_date, to_date, symbols, fields, output)
+
+    async def get_universe(self, exchange, max_age_seconds=None):
+        return await self._run(self.__client.get_universe, exchange, max_age_seconds)
+
+    async def store_universe(self, exchange, symbols):
+        return await self._run(self.__client.store_universe, exchange, symbols)
+
+    async def store_bulk_historical_data(self, data, symbol_map=None):
+        return await self._run(self.__client.store_bulk_historical_data, data, symbol_map)
+
+    async def store_historical_data_many(self, symbol_bars):
+        return await self._run(self.__client.store_historical_data_many, symbol_bars)
+
+    async def symbols_with_history(self):
+        return await self._run(self.__client.symbols_with_history)
+
+    async def symbols_without_history(self, symbols):
+        return await self._run(self.__client.symbols_without_history, symbols)
+
+    async def store_news_data(self, symbol, data):
+        return await self._run(self.__client.store_news_data, symbol, data)
+
+    async def store_news_data_many(self, symbol_articles):
+        return await self._run(self.__client.store_news_data_many, symbol_articles)
+
+    async def get_news_sync_state(self, symbol):
+        return await self._run(self.__client.get_news_sync_state, symbol)
+
+    async def store_fundamental_data(self, symbol, data):
+        return await self._run(self.__client.store_fundamental_data, symbol, data)
+
+    async def store_fundamental_section(self, symbol, section, data):
+        return await self._run(self.__client.store_fundamental_section, symbol, section, data)
+
+    async def get_fundamental_history(self, symbol, section=None):
+        return await self._run(self.__client.get_fundamental_history, symbol, section)
+
+    async def store_earnings_data(self, data: dict):
+        return await self._run(self.__client.store_earnings_data, data)
+
+    async def store_trends_data(self, data: dict):
+        return await self._run(self.__client.store_trends_data, data)
+
+    async def store_ipos_data(self, data: dict):
+        return await self._run(self.__client.store_ipos_data, data)
+
+    async def store_splits_data(self, data: dict):
+        return await self._run(self.__client.store_splits_data, data)
+
+    async def store_macro_indicators_data(self, data: dict):
+        return await self._run(self.__client.store_macro_indicators_data, data)
@@ -6,3 +6,25 @@ load_dotenv(override=True)
 EODHD_REAL_TOKEN = os.getenv("EODHD_REAL_TOKEN")
 EODHD_DEMO_TOKEN = os.getenv("EODHD_DEMO_TOKEN")
 MONGO_HOST = os.getenv("MONGO_HOST")
+EODHD_BULK_EXCHANGE = os.getenv("EODHD_BULK_EXCHANGE")
+EODHD_INCREMENTAL = os.getenv("EODHD_INCREMENTAL", "false").lower() == "true"
+EODHD_REQUESTS_PER_MINUTE = float(os.getenv("EODHD_REQUESTS_PER_MINUTE", "1000"))
+EODHD_MAX_CONCURRENCY = int(os.getenv("EODHD_MAX_CONCURRENCY", "20"))
+EODHD_CACHE_PATH = os.getenv("EODHD_CACHE_PATH")
+EODHD_STREAMING = os.getenv("EODHD_STREAMING", "false").lower() == "true"
+EODHD_RESUMABLE = os.getenv("EODHD_RESUMABLE", "false").lower() == "true"
+EODHD_RUN_ID = os.getenv("EODHD_RUN_ID")
+EODHD_STORAGE_LAYOUT = os.getenv("EODHD_STORAGE_LAYOUT", "per_symbol")
+EODHD_SKIP_UNCHANGED = os.getenv("EODHD_SKIP_UNCHANGED", "false").lower() == "true"
+EODHD_PIPELINE = os.getenv("EODHD_PIPELINE", "false").lower() == "true"
+EODHD_SYMBOLS = os.getenv("EODHD_SYMBOLS")
+EODHD_PROCESSES = int(os.getenv("EODHD_PROCESSES", "0")) or None
+EODHD_EXCHANGES = [exchange.strip() for exchange in os.getenv("EODHD_EXCHANGES", "").split(",") if exchange.strip()]
+EODHD_UNIVERSE_REFRESH_SECONDS = float(os.getenv("EODHD_UNIVERSE_REFRESH_SECONDS", "86400"))
+EODHD_SYMBOL_TYPES = [symbol_type.strip() for symbol_type in os.getenv("EODHD_SYMBOL_TYPES", "").split(",") if symbol_type.strip()]
+EODHD_LOG_CALLS = os.getenv("EODHD_LOG_CALLS", "false").lower() == "true"
+EODHD_METRICS_PORT = int(os.getenv("EODHD_METRICS_PORT", "0")) or None
+EODHD_METRICS_PATH = os.getenv("EODHD_METRICS_PATH")
+EODHD_FUNDAMENTAL_SECTIONS = [section.strip() for section in os.getenv("EODHD_FUNDAMENTAL_SECTIONS", "").split(",") if section.strip()]
+EODHD_BULK_FUNDAMENTALS = os.getenv("EODHD_BULK_FUNDAMENTALS", "false").lower() == "true"
+EODHD_ADJUST_SPLITS = os.getenv("EODHD_ADJUST_SPLITS", "false").lower() == "true"
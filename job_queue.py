@@ -0,0 +1,242 @@
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Durable queue of collection jobs stored in MongoDB.
+    Each job is one (data type, key) pair of a run, where the key is a symbol,
+    index, country or 'all_data'. Workers lease jobs for a limited time, so jobs
+    of a crashed worker become available again and a restarted run only
+    processes unfinished or failed work. Every lease carries a lease id: a
+    running job renews its lease, and complete/fail only apply while the
+    worker still owns the lease.
+    """
+
+    PENDING = 'pending'
+    IN_FLIGHT = 'in_flight'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(
+        self,
+        mongo_client,
+        run_id: str,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+        retry_delay_seconds: float = 30
+    ):
+        """
+        Initialize the JobQueue.
+
+        :param mongo_client: MongoClient used to store the jobs
+        :param run_id: Identifier of the collection run (e.g. the collection date)
+        :param lease_seconds: Time after which an in-flight job may be leased again
+        :param max_attempts: Number of attempts before a job stays failed
+        :param retry_delay_seconds: Delay before a failed job may be leased again; doubles with every attempt
+        """
+        self.__collection = mongo_client['collector']['jobs']
+        self.__run_id = run_id
+        self.__lease_seconds = lease_seconds
+        self.__max_attempts = max_attempts
+        self.__retry_delay_seconds = retry_delay_seconds
+        self.__collection.create_index(
+            [("run_id", ASCENDING), ("data_type", ASCENDING), ("key", ASCENDING)], unique=True
+        )
+        self.__collection.create_index([("run_id", ASCENDING), ("state", ASCENDING)])
+
+    @property
+    def run_id(self) -> str:
+        return self.__run_id
+
+    @property
+    def lease_seconds(self) -> float:
+        return self.__lease_seconds
+
+    def enqueue(self, data_type: str, keys: Iterable[str]) -> int:
+        """
+        Adds jobs to the run. Jobs that already exist keep their state.
+
+        :param data_type: Type of data to collect (e.g. 'historical')
+        :param keys: Symbols, indices or countries to collect
+        :return: Number of newly created jobs
+        """
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"run_id": self.__run_id, "data_type": data_type, "key": key},
+                {"$setOnInsert": {
+                    "state": self.PENDING,
+                    "attempts": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                    "lease_expires_at": None,
+                    "not_before": None,
+                    "last_error": None
+                }},
+                upsert=True
+            )
+            for key in keys
+        ]
+        if not operations:
+            return 0
+        result = self.__collection.bulk_write(operations, ordered=False)
+        return result.upserted_count
+
+    def _runnable(self, now: datetime, data_types: Iterable[str] = None) -> dict:
+        # Pending jobs, failed jobs with attempts left whose retry delay has passed,
+        # and in-flight jobs whose lease expired
+        query = {
+            "run_id": self.__run_id,
+            "attempts": {"$lt": self.__max_attempts},
+            "$or": [
+                {"state": self.PENDING},
+                {"state": self.FAILED, "not_before": {"$not": {"$gt": now}}},
+                {"state": self.IN_FLIGHT, "lease_expires_at": {"$lt": now}}
+            ]
+        }
+        if data_types is not None:
+            # Jobs left in the run by a configuration with other data types are not leased
+            query["data_type"] = {"$in": list(data_types)}
+        return query
+
+    def lease(
+        self, worker_id: str = None, data_types: Iterable[str] = None, exclude_ids: Iterable = None
+    ) -> Optional[dict]:
+        """
+        Leases the next runnable job: pending, failed with attempts left and
+        its retry delay passed, or in flight with an expired lease.
+
+        :param worker_id: Optional identifier of the leasing worker
+        :param data_types: Only lease jobs of these data types; defaults to all
+        :param exclude_ids: Ids of jobs not to lease, e.g. the jobs the calling process is running
+        :return: Job document with its lease_id, or None if no job is runnable
+        """
+        now = datetime.now(timezone.utc)
+        query = self._runnable(now, data_types)
+        if exclude_ids:
+            query["_id"] = {"$nin": list(exclude_ids)}
+        return self.__collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "state": self.IN_FLIGHT,
+                    "worker_id": worker_id,
+                    "lease_id": uuid.uuid4().hex,
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.__lease_seconds)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("attempts", ASCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def next_retry_in(self, data_types: Iterable[str] = None) -> Optional[float]:
+        """
+        Returns the seconds until the next failed job may be retried, or None if no failed job has attempts left.
+
+        :param data_types: Only consider jobs of these data types; defaults to all
+        """
+        query = {"run_id": self.__run_id, "state": self.FAILED, "attempts": {"$lt": self.__max_attempts}}
+        if data_types is not None:
+            query["data_type"] = {"$in": list(data_types)}
+        job = self.__collection.find_one(query, {"not_before": 1}, sort=[("not_before", ASCENDING)])
+        if job is None:
+            return None
+        if job.get("not_before") is None:
+            return 0.0
+        not_before = job["not_before"]
+        if not_before.tzinfo is None:
+            # MongoDB returns naive UTC datetimes unless the client is timezone aware
+            not_before = not_before.replace(tzinfo=timezone.utc)
+        return max(0.0, (not_before - datetime.now(timezone.utc)).total_seconds())
+
+    def _owned(self, job: dict) -> dict:
+        # Matches the job only while the lease of this job document is still held
+        return {"_id": job["_id"], "state": self.IN_FLIGHT, "lease_id": job.get("lease_id")}
+
+    def renew(self, job: dict) -> bool:
+        """
+        Extends the lease of a running job, so it is not leased again while it runs.
+
+        :return: False if the lease was lost, e.g. because it expired and another worker leased the job
+        """
+        now = datetime.now(timezone.utc)
+        result = self.__collection.update_one(
+            self._owned(job),
+            {"$set": {"updated_at": now, "lease_expires_at": now + timedelta(seconds=self.__lease_seconds)}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, job: dict) -> bool:
+        """
+        Marks a leased job as done.
+
+        :return: False if the worker no longer owned the lease and the job was left unchanged
+        """
+        result = self.__collection.update_one(
+            self._owned(job),
+            {"$set": {
+                "state": self.DONE,
+                "updated_at": datetime.now(timezone.utc),
+                "lease_expires_at": None,
+                "last_error": None
+            }}
+        )
+        if result.matched_count != 1:
+            logger.warning(f"Job {job['data_type']}/{job['key']} completed after its lease was lost")
+            return False
+        return True
+
+    def fail(self, job: dict, error: Exception, retry: bool = True) -> bool:
+        """
+        Marks a leased job as failed and records the error.
+        The job may be leased again after an exponential backoff, so a burst of
+        transient errors (e.g. 429) does not use up all attempts at once.
+
+        :param retry: False keeps the job failed without further attempts
+        :return: False if the worker no longer owned the lease and the job was left unchanged
+        """
+        now = datetime.now(timezone.utc)
+        update = {
+            "state": self.FAILED,
+            "updated_at": now,
+            "lease_expires_at": None,
+            "not_before": now + timedelta(seconds=self.__retry_delay_seconds * 2 ** max(job["attempts"] - 1, 0)),
+            "last_error": f"{type(error).__name__}: {error}"
+        }
+        if not retry:
+            update["attempts"] = self.__max_attempts
+        result = self.__collection.update_one(self._owned(job), {"$set": update})
+        if result.matched_count != 1:
+            logger.warning(f"Job {job['data_type']}/{job['key']} failed after its lease was lost: {error}")
+            return False
+        logger.warning(f"Job {job['data_type']}/{job['key']} failed (attempt {job['attempts']}): {error}")
+        return True
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Returns the number of jobs of the run per state.
+        """
+        pipeline = [
+            {"$match": {"run_id": self.__run_id}},
+            {"$group": {"_id": "$state", "count": {"$sum": 1}}}
+        ]
+        return {item["_id"]: item["count"] for item in self.__collection.aggregate(pipeline)}
+
+    def failed_operations(self) -> Dict[str, Dict[str, str]]:
+        """
+        Returns the last error of every failed job, grouped by data type.
+        """
+        failed = {}
+        for job in self.__collection.find({"run_id": self.__run_id, "state": self.FAILED}):
+            failed.setdefault(job["data_type"], {})[job["key"]] = job["last_error"]
+        return failed
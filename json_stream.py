@@ -0,0 +1,123 @@
+import codecs
+import json
+from typing import Any, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """
+    Decodes a JSON document, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for a top-level JSON array or object.
+    Bytes are fed in arbitrary chunks; every complete array element
+    (or ``(key, value)`` pair for an object) is returned as soon as it
+    has been received, so only one element is held in memory at a time.
+    """
+
+    def __init__(self):
+        self.__decoder = json.JSONDecoder()
+        self.__text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__buffer = ''
+        self.__pos = 0
+        self.__container = None
+        self.__done = False
+        # Partial elements are only re-parsed once the buffer has doubled, keeping parsing linear
+        self.__retry_size = 0
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self.__buffer += self.__text_decoder.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        self.__buffer += self.__text_decoder.decode(b'', final=True)
+        items = self._drain(final=True)
+        if not self.__done:
+            raise json.JSONDecodeError('Unexpected end of JSON stream', self.__buffer, len(self.__buffer))
+        return items
+
+    def _skip(self, chars: str):
+        while self.__pos < len(self.__buffer) and self.__buffer[self.__pos] in chars:
+            self.__pos += 1
+
+    def _decode_value(self, pos: int, final: bool):
+        value, end = self.__decoder.raw_decode(self.__buffer, pos)
+        if isinstance(value, (dict, list, str)):
+            return value, end
+        # A number or literal is only complete once a delimiter follows it: '2.' or '1e' may be the
+        # start of a number that continues in the next chunk
+        if end == len(self.__buffer):
+            if not final:
+                raise json.JSONDecodeError('Incomplete value', self.__buffer, pos)
+        elif self.__buffer[end] not in _WHITESPACE + ',]}':
+            raise json.JSONDecodeError('Expecting a delimiter after the value', self.__buffer, end)
+        return value, end
+
+    def _next_item(self, final: bool):
+        if self.__container == '[':
+            value, end = self._decode_value(self.__pos, final)
+            return value, end
+
+        key, pos = self.__decoder.raw_decode(self.__buffer, self.__pos)
+        while pos < len(self.__buffer) and self.__buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(self.__buffer) or self.__buffer[pos] != ':':
+            raise json.JSONDecodeError("Expecting ':' delimiter", self.__buffer, pos)
+        pos += 1
+        while pos < len(self.__buffer) and self.__buffer[pos] in _WHITESPACE:
+            pos += 1
+        value, end = self._decode_value(pos, final)
+        return (key, value), end
+
+    def _drain(self, final: bool) -> List[Any]:
+        items = []
+        while not self.__done:
+            self._skip(_WHITESPACE)
+            if self.__pos >= len(self.__buffer):
+                break
+
+            if self.__container is None:
+                char = self.__buffer[self.__pos]
+                if char not in '[{':
+                    raise json.JSONDecodeError('Expecting a JSON array or object', self.__buffer, self.__pos)
+                self.__container = char
+                self.__pos += 1
+                continue
+
+            self._skip(_WHITESPACE + ',')
+            if self.__pos >= len(self.__buffer):
+                break
+            if self.__buffer[self.__pos] == (']' if self.__container == '[' else '}'):
+                self.__pos += 1
+                self.__done = True
+                break
+
+            pending = len(self.__buffer) - self.__pos
+            if not final and pending < self.__retry_size:
+                break
+            try:
+                item, self.__pos = self._next_item(final)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                self.__retry_size = pending * 2
+                break
+            self.__retry_size = 0
+            items.append(item)
+
+        self.__buffer = self.__buffer[self.__pos:]
+        self.__pos = 0
+        return items
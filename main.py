@@ -1,51 +1,211 @@
 import env_var
 import asyncio
 import logging
-from typing import Dict
+import metrics
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+from adjustments import AdjustmentEngine
+from async_eodhd_api import CalendarChunkError
 from data_collection import DataCollector
+from db_operations import EodhdMongoClient, StoreError
+from job_queue import JobQueue
+from response_cache import ResponseCache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-async def collecting_data(eodhd_api_token: str, mongo_uri: str):
+async def run_queued_jobs(
+    job_queue: JobQueue,
+    jobs: Dict[str, Tuple[List[str], Callable[[str], Awaitable]]],
+    workers: int = 20
+):
+    for data_type, (keys, _) in jobs.items():
+        await asyncio.to_thread(job_queue.enqueue, data_type, keys)
+    # Jobs left in the run by an earlier configuration must not run under this one
+    run_keys = {data_type: set(keys) for data_type, (keys, _) in jobs.items()}
+
+    # Ids of the jobs this process is running; their leases are renewed and they are never leased twice
+    running = set()
+
+    async def heartbeat(job: dict):
+        while True:
+            await asyncio.sleep(job_queue.lease_seconds / 3)
+            if not await asyncio.to_thread(job_queue.renew, job):
+                logging.warning(f"Lease of job {job['data_type']}/{job['key']} was lost while it was running")
+                return
+
+    async def worker(worker_id: str):
+        while True:
+            job = await asyncio.to_thread(job_queue.lease, worker_id, list(jobs), set(running))
+            if job is None:
+                # Failed jobs wait out their backoff; stop once none of them can be retried
+                retry_in = await asyncio.to_thread(job_queue.next_retry_in, list(jobs))
+                if retry_in is None:
+                    return
+                await asyncio.sleep(max(retry_in, 0.1))
+                continue
+            if job['key'] not in run_keys.get(job['data_type'], ()):
+                error = ValueError(f"Job {job['data_type']}/{job['key']} is not part of this run's configuration")
+                await asyncio.to_thread(job_queue.fail, job, error, False)
+                continue
+            running.add(job['_id'])
+            renewal = asyncio.create_task(heartbeat(job))
+            try:
+                _, collect = jobs[job['data_type']]
+                result = await collect(job['key'])
+                if job['data_type'] in ('historical', 'fundamental') and job['key'] == 'all_data' and result:
+                    # Bulk jobs return the symbols they could not collect; rerunning the job retries only those
+                    raise RuntimeError(f"Failed for symbols: {', '.join(result)}")
+            except Exception as e:
+                await asyncio.to_thread(job_queue.fail, job, e)
+            else:
+                await asyncio.to_thread(job_queue.complete, job)
+            finally:
+                # A renewal racing the final update no longer matches the in-flight lease
+                renewal.cancel()
+                running.discard(job['_id'])
+
+    await asyncio.gather(*(worker(f"worker-{i}") for i in range(workers)))
+
+async def collecting_data(
+    eodhd_api_token: str,
+    mongo_uri: str,
+    bulk_exchange: str = None,
+    incremental: bool = False,
+    streaming: bool = False,
+    job_queue: JobQueue = None,
+    queue_workers: int = 20,
+    pipeline: bool = False,
+    symbols: List[str] = None,
+    data_types: Iterable[str] = None,
+    exchanges: List[str] = None,
+    universe_refresh_seconds: float = 86400,
+    symbol_types: List[str] = None,
+    fundamental_sections: List[str] = None,
+    bulk_fundamentals: bool = False,
+    **collector_options
+):
     failed_operations: Dict[str, Dict[str, Exception]] = {}
     
-    async with DataCollector(eodhd_api_token, mongo_uri) as dc:
-        symbols = ['AAPL', 'TSLA', 'MSFT']
+    async with DataCollector(eodhd_api_token, mongo_uri, **collector_options) as dc:
+        updated_symbols = set()
+        if exchanges:
+            # Delisted symbols are not part of the discovered universe, so no requests are spent on them
+            universe = await dc.discover_universe(exchanges, refresh_seconds=universe_refresh_seconds, types=symbol_types)
+            symbols = universe['symbols']
+            updated_symbols = set(universe['update'])
+        symbols = symbols or ['AAPL', 'TSLA', 'MSFT']
         indices = ['GSPC.INDX']
         country = ['USA']
 
-        tasks = {
-            'historical': [dc.collect_and_store_historical_data(symbol) for symbol in symbols],
-            'fundamental': [dc.collect_and_store_fundamental_data(symbol) for symbol in symbols],
-            'news': [dc.collect_and_store_news_data(symbol) for symbol in symbols],
-            'earnings': [dc.collect_and_store_earnings_data()],
-            'trends': [dc.collect_and_store_trends_data(symbols)],
-            'ipos': [dc.collect_and_store_ipos_data()],
-            'splits': [dc.collect_and_store_splits_data()],
-            'macro_indicators': [dc.collect_and_store_macro_indicators_data(country) for country in country],
-            'indices': [dc.collect_and_store_indices_data(index) for index in indices]
+        collect_historical = dc.collect_and_store_historical_data_streaming if streaming else dc.collect_and_store_historical_data
+        if streaming and not fundamental_sections:
+            collect_fundamental = dc.collect_and_store_fundamental_data_streaming
+        else:
+            collect_fundamental = lambda symbol: dc.collect_and_store_fundamental_data(symbol, sections=fundamental_sections)
+        if bulk_exchange and bulk_fundamentals:
+            fundamental_job = (
+                ['all_data'],
+                lambda _: dc.collect_and_store_bulk_fundamental_data(bulk_exchange, symbols, sections=fundamental_sections)
+            )
+        else:
+            fundamental_job = (symbols, collect_fundamental)
+        if bulk_exchange:
+            historical_job = (['all_data'], lambda _: dc.collect_and_store_bulk_historical_data(bulk_exchange, symbols))
+        else:
+            # Symbols with stored history only fetch the bars after their latest date; the rest are backfilled
+            historical_job = (
+                symbols, lambda symbol: collect_historical(symbol, incremental=incremental or symbol in updated_symbols)
+            )
+
+        # Data type -> (keys, coroutine function collecting one key)
+        jobs = {
+            'historical': historical_job,
+            'fundamental': fundamental_job,
+            # Symbols with stored news only page back to their watermark
+            'news': (
+                symbols, lambda symbol: dc.collect_and_store_news_data(symbol, incremental=incremental or symbol in updated_symbols)
+            ),
+            'earnings': (['all_data'], lambda _: dc.collect_and_store_earnings_data()),
+            'trends': (['all_data'], lambda _: dc.collect_and_store_trends_data(symbols)),
+            'ipos': (['all_data'], lambda _: dc.collect_and_store_ipos_data()),
+            'splits': (['all_data'], lambda _: dc.collect_and_store_splits_data()),
+            'macro_indicators': (country, dc.collect_and_store_macro_indicators_data),
+            'indices': (indices, dc.collect_and_store_indices_data)
         }
-        
-        results = dict(
-            zip(
-                tasks.keys(),
-                await asyncio.gather(
-                    *(asyncio.gather(*task_list, return_exceptions=True) for task_list in tasks.values())
+        if data_types is not None:
+            jobs = {task_type: job for task_type, job in jobs.items() if task_type in data_types}
+
+        if job_queue is not None:
+            await run_queued_jobs(job_queue, jobs, workers=queue_workers)
+            failed_operations.update(job_queue.failed_operations())
+            logging.info(f"Job queue {job_queue.run_id} summary: {job_queue.summary()}")
+            results = {}
+        elif pipeline:
+            # The pipeline plans history per symbol (using the bulk last-day data where possible)
+            # and always collects fundamentals per symbol
+            per_symbol_types = [task_type for task_type in ('historical', 'fundamental') if task_type in jobs]
+            pipeline_jobs = [(task_type, symbol) for task_type in per_symbol_types for symbol in symbols] + [
+                (task_type, key) for task_type, (keys, _) in jobs.items() if task_type not in per_symbol_types for key in keys
+            ]
+            failed_operations.update(
+                await dc.run_pipeline(
+                    pipeline_jobs,
+                    symbols=symbols,
+                    fundamental_sections=fundamental_sections,
+                    incremental=incremental,
+                    updated_symbols=updated_symbols,
+                    bulk_exchange=bulk_exchange
+                )
+            )
+            results = {}
+        else:
+            tasks = {task_type: [collect(key) for key in keys] for task_type, (keys, collect) in jobs.items()}
+            results = dict(
+                zip(
+                    tasks.keys(),
+                    await asyncio.gather(
+                        *(asyncio.gather(*task_list, return_exceptions=True) for task_list in tasks.values())
+                    )
                 )
             )
-        )
 
     for task_type, task_results in results.items():
         if task_type == "indices":
             for index, result in zip(indices, task_results):
                 if isinstance(result, Exception):
                     failed_operations.setdefault(task_type, {})[index] = result
+        elif task_type == "historical" and bulk_exchange:
+            if isinstance(task_results[0], Exception):
+                failed_operations.setdefault(task_type, {})['all_data'] = task_results[0]
+            else:
+                for symbol, error in task_results[0].items():
+                    failed_operations.setdefault(task_type, {})[symbol] = error
+        elif task_type == "fundamental" and bulk_exchange and bulk_fundamentals:
+            if isinstance(task_results[0], Exception):
+                failed_operations.setdefault(task_type, {})['all_data'] = task_results[0]
+            else:
+                for symbol in task_results[0]:
+                    failed_operations.setdefault(task_type, {})[symbol] = RuntimeError("Missing from bulk fundamentals")
         elif task_type in ['historical', 'fundamental', 'news']:
             for symbol, result in zip(symbols, task_results):
                 if isinstance(result, Exception):
                     failed_operations.setdefault(task_type, {})[symbol] = result
+            if task_type == "historical":
+                counts = [result for result in task_results if isinstance(result, dict)]
+                logging.info(
+                    f"Historical data: {sum(c['fetched'] for c in counts)} bars fetched, "
+                    f"{sum(c['written'] for c in counts)} bars written for {len(counts)} symbols"
+                )
+            elif task_type == "news":
+                counts = [result for result in task_results if isinstance(result, dict)]
+                logging.info(
+                    f"News data: {sum(c['fetched'] for c in counts)} articles fetched, "
+                    f"{sum(c['written'] for c in counts)} articles written for {len(counts)} symbols"
+                )
         elif task_type in ['earnings', 'trends', 'ipos', 'splits', 'macro_indicators']:
-            if isinstance(task_results[0], Exception):
+            if isinstance(task_results[0], (CalendarChunkError, StoreError)):
+                failed_operations.setdefault(task_type, {}).update(task_results[0].failures)
+            elif isinstance(task_results[0], Exception):
                 failed_operations.setdefault(task_type, {})['all_data'] = task_results[0]
 
     # Log the results of the operation
@@ -61,9 +221,45 @@ async def collecting_data(eodhd_api_token: str, mongo_uri: str):
     return failed_operations
 
 async def main():
+    metrics.registry.configure(log_calls=env_var.EODHD_LOG_CALLS)
+    metrics_server = await metrics.registry.start_http_server(port=env_var.EODHD_METRICS_PORT) if env_var.EODHD_METRICS_PORT else None
     eodhd_api_token = env_var.EODHD_REAL_TOKEN
     mongo_uri = f"mongodb://{env_var.MONGO_HOST}:27017/"
-    failed_operations = await collecting_data(eodhd_api_token, mongo_uri)
+    queue_client = EodhdMongoClient(mongo_uri) if env_var.EODHD_RESUMABLE else None
+    job_queue = JobQueue(queue_client, run_id=env_var.EODHD_RUN_ID or date.today().isoformat()) if queue_client else None
+    cache = ResponseCache(env_var.EODHD_CACHE_PATH) if env_var.EODHD_CACHE_PATH else None
+    failed_operations = await collecting_data(
+        eodhd_api_token,
+        mongo_uri,
+        job_queue=job_queue,
+        pipeline=env_var.EODHD_PIPELINE,
+        exchanges=env_var.EODHD_EXCHANGES,
+        universe_refresh_seconds=env_var.EODHD_UNIVERSE_REFRESH_SECONDS,
+        symbol_types=env_var.EODHD_SYMBOL_TYPES,
+        fundamental_sections=env_var.EODHD_FUNDAMENTAL_SECTIONS,
+        bulk_fundamentals=env_var.EODHD_BULK_FUNDAMENTALS,
+        bulk_exchange=env_var.EODHD_BULK_EXCHANGE,
+        incremental=env_var.EODHD_INCREMENTAL,
+        streaming=env_var.EODHD_STREAMING,
+        storage_layout=env_var.EODHD_STORAGE_LAYOUT,
+        skip_unchanged=env_var.EODHD_SKIP_UNCHANGED,
+        requests_per_minute=env_var.EODHD_REQUESTS_PER_MINUTE,
+        max_concurrency=env_var.EODHD_MAX_CONCURRENCY,
+        cache=cache
+    )
+    if cache:
+        await asyncio.to_thread(cache.close)
+    if queue_client:
+        queue_client.close()
+    if env_var.EODHD_ADJUST_SPLITS:
+        with EodhdMongoClient(mongo_uri, storage_layout=env_var.EODHD_STORAGE_LAYOUT) as adjustment_client:
+            await asyncio.to_thread(AdjustmentEngine(adjustment_client).run)
+    if env_var.EODHD_METRICS_PATH:
+        with open(env_var.EODHD_METRICS_PATH, 'w') as metrics_file:
+            metrics_file.write(metrics.registry.to_json())
+        logging.info(f"Metrics summary written to {env_var.EODHD_METRICS_PATH}")
+    if metrics_server:
+        await metrics_server.cleanup()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,225 @@
+import asyncio
+import bisect
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+from aiohttp import web
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed durations.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by linear interpolation inside the bucket that contains it.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and latency histograms.
+    Storage calls run in worker threads, so every update takes the registry lock.
+    """
+
+    def __init__(self, log_calls: bool = False):
+        """
+        Initialize the Metrics registry.
+
+        :param log_calls: Log every timed call at INFO level instead of DEBUG
+        """
+        self.log_calls = log_calls
+        self.__lock = threading.Lock()
+        self.__counters: Dict[str, Dict[Labels, float]] = {}
+        self.__histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def configure(self, log_calls: bool = None):
+        if log_calls is not None:
+            self.log_calls = log_calls
+
+    def reset(self):
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self.__lock:
+            series = self.__counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    def histogram(self, name: str) -> Histogram:
+        """
+        Returns the histogram name merged over all label sets.
+        """
+        merged = Histogram()
+        with self.__lock:
+            for histogram in self.__histograms.get(name, {}).values():
+                if histogram.buckets != merged.buckets:
+                    raise ValueError(f"Histograms of {name} have different buckets")
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.sum += histogram.sum
+                merged.count += histogram.count
+        return merged
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Records the duration of the block in the histogram name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            logger.log(
+                logging.INFO if self.log_calls else logging.DEBUG,
+                f"{name} {dict(labels)}: {elapsed:.4f} seconds"
+            )
+
+    def summary(self) -> Dict[str, list]:
+        """
+        Returns a JSON-serializable summary with counters and p50/p99 latencies.
+        """
+        with self.__lock:
+            counters = {
+                name: [{'labels': dict(labels), 'value': value} for labels, value in series.items()]
+                for name, series in self.__counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        'labels': dict(labels),
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                        'p50': histogram.quantile(0.5),
+                        'p99': histogram.quantile(0.99)
+                    }
+                    for labels, histogram in series.items()
+                ]
+                for name, series in self.__histograms.items()
+            }
+        return {**counters, **histograms}
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2, sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        def format_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{label}="{value}"' for label, value in pairs) + '}'
+
+        lines = []
+        with self.__lock:
+            for name, series in sorted(self.__counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+            for name, series in sorted(self.__histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{name}_bucket{format_labels(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    async def start_http_server(self, host: str = '0.0.0.0', port: int = 9100) -> web.AppRunner:
+        """
+        Serves the metrics at /metrics (Prometheus text) and /metrics.json.
+
+        :return: Runner; call its cleanup() to stop the server
+        """
+        async def prometheus(request):
+            return web.Response(text=self.to_prometheus(), content_type='text/plain')
+
+        async def summary(request):
+            return web.json_response(self.summary())
+
+        app = web.Application()
+        app.router.add_get('/metrics', prometheus)
+        app.router.add_get('/metrics.json', summary)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return runner
+
+
+# Registry shared by the API session, the storage layer and the collector
+registry = Metrics()
+
+
+def timed(name: str):
+    """
+    Decorator recording the duration of a sync or async function in the histogram name,
+    labelled with the function name.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with registry.timer(name, method=func.__name__):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with registry.timer(name, method=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
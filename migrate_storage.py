@@ -0,0 +1,30 @@
+import argparse
+import logging
+
+import env_var
+from db_operations import EodhdMongoClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-symbol collections to the consolidated storage layout")
+    parser.add_argument('--mongo-uri', default=f"mongodb://{env_var.MONGO_HOST}:27017/")
+    parser.add_argument('--data-types', nargs='+', default=list(EodhdMongoClient.MIGRATED_DATA_TYPES),
+                        choices=EodhdMongoClient.MIGRATED_DATA_TYPES)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--drop-source', action='store_true',
+                        help="Drop each per-symbol collection once it has been copied")
+    parser.add_argument('--drop-legacy-indexes', action='store_true',
+                        help="Drop the all-fields earnings and trends indexes created by older versions")
+    args = parser.parse_args()
+
+    with EodhdMongoClient(args.mongo_uri) as client:
+        if args.drop_legacy_indexes:
+            client.drop_legacy_indexes()
+        copied = client.migrate_to_consolidated(args.data_types, args.batch_size, args.drop_source)
+    logging.info(f"Migration completed: {copied}")
+
+
+if __name__ == '__main__':
+    main()
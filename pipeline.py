@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (data type, key) of a collection job, e.g. ('historical', 'AAPL')
+Job = Tuple[str, str]
+# (store type, store key, payload) produced by a fetch
+Payload = Tuple[str, str, Any]
+
+
+class CollectionPipeline:
+    """
+    Staged fetch/store pipeline.
+    Fetcher tasks run the fetch stage and put payloads on a bounded queue, so
+    fetching pauses when the writers fall behind. Writer tasks drain the queue
+    and coalesce the list payloads of one store type into a single write across
+    store keys (e.g. the bars of many symbols) when store_many is given.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str], Awaitable[Payload]],
+        store: Callable[[str, str, Any], Awaitable],
+        fetchers: int = 8,
+        writers: int = 2,
+        queue_size: int = 100,
+        max_coalesce: int = 32,
+        store_many: Callable[[str, Dict[str, list]], Awaitable] = None
+    ):
+        """
+        Initialize the CollectionPipeline.
+
+        :param fetch: Coroutine function (data type, key) -> (store type, store key, payload)
+        :param store: Coroutine function (store type, store key, payload) writing a payload
+        :param fetchers: Number of concurrent fetcher tasks
+        :param writers: Number of concurrent writer tasks
+        :param queue_size: Maximum number of payloads waiting to be written
+        :param max_coalesce: Maximum number of queued payloads a writer takes at once
+        :param store_many: Optional coroutine function (store type, {store key: list payload}) writing the
+                           payloads of many store keys at once; returns {store key: exception} for keys that failed
+        """
+        self.__fetch = fetch
+        self.__store = store
+        self.__store_many = store_many
+        self.__fetchers = fetchers
+        self.__writers = writers
+        self.__queue_size = queue_size
+        self.__max_coalesce = max_coalesce
+        self.__queue = None
+        self.__started_at = None
+        self.__stats = {
+            'fetched': 0,
+            'fetch_failed': 0,
+            'fetch_seconds': 0.0,
+            'payloads_written': 0,
+            'writes': 0,
+            'write_failed': 0,
+            'write_seconds': 0.0,
+            'max_queue_depth': 0,
+            'elapsed': 0.0
+        }
+
+    async def run(self, jobs: Iterable[Job]) -> Dict[str, Dict[str, Exception]]:
+        """
+        Runs all jobs through the pipeline.
+
+        :param jobs: (data type, key) pairs to collect
+        :return: Failed jobs as {data type: {key: exception}}
+        """
+        failed: Dict[str, Dict[str, Exception]] = {}
+        pending = asyncio.Queue()
+        for job in jobs:
+            pending.put_nowait(job)
+        self.__queue = asyncio.Queue(maxsize=self.__queue_size)
+        self.__started_at = time.perf_counter()
+
+        async def fetcher():
+            while True:
+                try:
+                    data_type, key = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                fetch_start = time.perf_counter()
+                try:
+                    store_type, store_key, payload = await self.__fetch(data_type, key)
+                except Exception as e:
+                    self.__stats['fetch_failed'] += 1
+                    failed.setdefault(data_type, {})[key] = e
+                    continue
+                finally:
+                    self.__stats['fetch_seconds'] += time.perf_counter() - fetch_start
+                self.__stats['fetched'] += 1
+                # Blocks while the queue is full, which applies backpressure to the fetch stage
+                await self.__queue.put(((data_type, key), store_type, store_key, payload))
+                self.__stats['max_queue_depth'] = max(self.__stats['max_queue_depth'], self.__queue.qsize())
+
+        async def writer():
+            stopping = False
+            while not stopping:
+                item = await self.__queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                while len(batch) < self.__max_coalesce:
+                    try:
+                        item = self.__queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                await self._write_batch(batch, failed)
+
+        writer_tasks = [asyncio.create_task(writer()) for _ in range(self.__writers)]
+        await asyncio.gather(*(fetcher() for _ in range(self.__fetchers)))
+        for _ in writer_tasks:
+            await self.__queue.put(None)
+        await asyncio.gather(*writer_tasks)
+
+        self.__stats['elapsed'] = time.perf_counter() - self.__started_at
+        logger.info(f"Pipeline finished: {self.stats()}")
+        return failed
+
+    async def _write_batch(self, batch: List, failed: Dict[str, Dict[str, Exception]]):
+        # List payloads of a store type are merged per store key and written together through store_many;
+        # without store_many they are written once per store key. Other payloads are written one by one.
+        groups: Dict[str, Tuple[Dict[str, List[Job]], Dict[str, list]]] = {}
+        singles = []
+        for job, store_type, store_key, payload in batch:
+            if isinstance(payload, list):
+                jobs, payloads = groups.setdefault(store_type, ({}, {}))
+                jobs.setdefault(store_key, []).append(job)
+                payloads.setdefault(store_key, []).extend(payload)
+            else:
+                singles.append(({store_key: [job]}, store_type, store_key, payload))
+
+        for store_type, (jobs, payloads) in groups.items():
+            if self.__store_many is not None:
+                await self._write(jobs, failed, self.__store_many(store_type, payloads), per_key_errors=True)
+            else:
+                for store_key, payload in payloads.items():
+                    await self._write({store_key: jobs[store_key]}, failed, self.__store(store_type, store_key, payload))
+        for jobs, store_type, store_key, payload in singles:
+            await self._write(jobs, failed, self.__store(store_type, store_key, payload))
+
+    async def _write(
+        self,
+        jobs: Dict[str, List[Job]],
+        failed: Dict[str, Dict[str, Exception]],
+        write: Awaitable,
+        per_key_errors: bool = False
+    ):
+        # jobs maps every store key of the write to the jobs whose payloads it carries
+        write_start = time.perf_counter()
+        try:
+            result = await write
+        except Exception as e:
+            self.__stats['write_failed'] += 1
+            errors = dict.fromkeys(jobs, e)
+        else:
+            self.__stats['writes'] += 1
+            errors = (result or {}) if per_key_errors else {}
+        finally:
+            self.__stats['write_seconds'] += time.perf_counter() - write_start
+
+        for store_key, key_jobs in jobs.items():
+            error = errors.get(store_key)
+            for data_type, key in key_jobs:
+                if error is None:
+                    self.__stats['payloads_written'] += 1
+                else:
+                    failed.setdefault(data_type, {})[key] = error
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns per-stage counters, throughput and queue depth.
+        """
+        stats = dict(self.__stats)
+        stats['queue_depth'] = self.__queue.qsize() if self.__queue is not None else 0
+        elapsed = stats['elapsed']
+        if not elapsed and self.__started_at is not None:
+            elapsed = time.perf_counter() - self.__started_at
+        stats['fetch_per_second'] = stats['fetched'] / elapsed if elapsed else 0.0
+        stats['payloads_written_per_second'] = stats['payloads_written'] / elapsed if elapsed else 0.0
+        return stats
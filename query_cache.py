@@ -0,0 +1,126 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (data type, symbol) covered by a cached result; a symbol of None covers the whole data type
+Tag = Tuple[str, Optional[str]]
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Returns an estimate of the memory held by a query result in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return len(json.dumps(value, default=str))
+
+
+class QueryCache:
+    """
+    In-process LRU cache of query results bounded by their estimated size.
+    Every entry is tagged with the (data type, symbol) pairs it covers, so a
+    write to one symbol only drops the entries that read that symbol.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the QueryCache.
+
+        :param max_bytes: Maximum total estimated size of cached results
+        """
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+        self.__entries: "OrderedDict[Hashable, Tuple[Any, int, frozenset]]" = OrderedDict()
+        self.__tag_index: Dict[Tag, set] = {}
+        self.__total_bytes = 0
+        # Incremented by every invalidation, so results read before a write landed are not cached
+        self.__generation = 0
+        self.__stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Returns a cached result or None.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__stats['misses'] += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__stats['hits'] += 1
+            return entry[0]
+
+    @property
+    def generation(self) -> int:
+        return self.__generation
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Tag], generation: int = None):
+        """
+        Stores a result; results larger than the cache are not stored.
+
+        :param generation: Generation read before the query ran; the result is dropped if an invalidation happened since
+        """
+        size = estimate_size(value)
+        if size > self.__max_bytes:
+            return
+        tags = frozenset(tags)
+        with self.__lock:
+            if generation is not None and generation != self.__generation:
+                return
+            self._remove(key)
+            self.__entries[key] = (value, size, tags)
+            self.__total_bytes += size
+            for tag in tags:
+                self.__tag_index.setdefault(tag, set()).add(key)
+            self.__stats['stores'] += 1
+            while self.__total_bytes > self.__max_bytes:
+                self._remove(next(iter(self.__entries)))
+                self.__stats['evictions'] += 1
+
+    def invalidate(self, data_type: str, symbol: str = None):
+        """
+        Drops the entries covering a symbol of a data type, including entries
+        covering the whole data type. Without a symbol all entries of the data type are dropped.
+        """
+        with self.__lock:
+            self.__generation += 1
+            if symbol is None:
+                keys = set().union(*(keys for tag, keys in self.__tag_index.items() if tag[0] == data_type))
+            else:
+                keys = self.__tag_index.get((data_type, symbol), set()) | self.__tag_index.get((data_type, None), set())
+            for key in list(keys):
+                self._remove(key)
+                self.__stats['invalidations'] += 1
+
+    def _remove(self, key: Hashable):
+        # Caller holds the lock
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return
+        self.__total_bytes -= entry[1]
+        for tag in entry[2]:
+            keys = self.__tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__tag_index[tag]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__tag_index.clear()
+            self.__total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {**self.__stats, 'entries': len(self.__entries), 'bytes': self.__total_bytes}
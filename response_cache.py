@@ -0,0 +1,196 @@
+import asyncio
+import functools
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds a response stays fresh, matched by the longest endpoint prefix
+DEFAULT_TTLS = {
+    '/api/fundamentals/': 24 * 3600,
+    '/api/exchange-symbol-list/': 24 * 3600,
+    '/api/macro-indicator/': 24 * 3600,
+}
+
+
+class ResponseCache:
+    """
+    On-disk cache of decoded EODHD API responses.
+    Entries are stored in SQLite, keyed on endpoint and request parameters
+    (without the API token), expire after a per-endpoint TTL and are evicted
+    in least-recently-used order once the cache exceeds its size limit.
+    SQLite calls block, so asynchronous callers use get_async and set_async,
+    which run them on a dedicated thread. Access times of hits are kept in
+    memory and written in batches instead of committing on every hit.
+    """
+
+    EXCLUDED_PARAMS = ('api_token',)
+
+    def __init__(self, path: str = 'eodhd_cache.sqlite', ttls: Dict[str, float] = None,
+                 default_ttl: float = 0, max_bytes: int = 512 * 1024 * 1024, access_flush_size: int = 100):
+        """
+        Initialize the ResponseCache.
+
+        :param path: Path of the SQLite database file
+        :param ttls: Mapping of endpoint prefix to TTL in seconds
+        :param default_ttl: TTL for endpoints without a matching prefix; 0 disables caching
+        :param max_bytes: Maximum total size of cached payloads
+        :param access_flush_size: Number of hits whose access times are buffered before they are written
+        """
+        self.__ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.__default_ttl = default_ttl
+        self.__max_bytes = max_bytes
+        self.__access_flush_size = access_flush_size
+        self.__accessed: Dict[str, float] = {}
+        self.__stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        # One thread serializes all asynchronous calls, so the connection is never used concurrently
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='eodhd-cache')
+        self.__db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, payload BLOB NOT NULL, '
+            'size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self.__db.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self.__db.commit()
+        self.__total_bytes = self.__db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def close(self):
+        self.__executor.shutdown()
+        self.flush()
+        self.__db.close()
+
+    async def _run(self, func, *args):
+        """
+        Runs a blocking cache method on the cache thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(func, *args))
+
+    async def get_async(self, endpoint: str, params: Dict[str, Any]):
+        return await self._run(self.get, endpoint, params)
+
+    async def set_async(self, endpoint: str, params: Dict[str, Any], data):
+        return await self._run(self.set, endpoint, params, data)
+
+    async def flush_async(self):
+        return await self._run(self.flush)
+
+    def flush(self):
+        """
+        Writes the buffered access times of cache hits.
+        """
+        if self.__accessed:
+            self._write_access_times()
+            self.__db.commit()
+
+    def _write_access_times(self):
+        self.__db.executemany(
+            'UPDATE responses SET accessed_at = ? WHERE key = ?',
+            [(accessed_at, key) for key, accessed_at in self.__accessed.items()]
+        )
+        self.__accessed.clear()
+
+    def ttl(self, endpoint: str) -> float:
+        """
+        Returns the TTL for the endpoint, using the longest matching prefix.
+        """
+        matches = [prefix for prefix in self.__ttls if endpoint.startswith(prefix)]
+        if not matches:
+            return self.__default_ttl
+        return self.__ttls[max(matches, key=len)]
+
+    def key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        cache_params = {k: v for k, v in params.items() if k not in self.EXCLUDED_PARAMS}
+        return f"{endpoint}?{json.dumps(cache_params, sort_keys=True, default=str)}"
+
+    def get(self, endpoint: str, params: Dict[str, Any]):
+        """
+        Returns the cached response or None on a miss.
+        """
+        if self.ttl(endpoint) <= 0:
+            return None
+
+        key = self.key(endpoint, params)
+        row = self.__db.execute('SELECT payload, size, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.__stats['misses'] += 1
+            return None
+        payload, size, expires_at = row
+        if expires_at <= now:
+            self.__db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.__db.commit()
+            self.__total_bytes -= size
+            self.__stats['expired'] += 1
+            self.__stats['misses'] += 1
+            return None
+
+        self.__accessed[key] = now
+        if len(self.__accessed) >= self.__access_flush_size:
+            self.flush()
+        self.__stats['hits'] += 1
+        return json.loads(payload)
+
+    def set(self, endpoint: str, params: Dict[str, Any], data):
+        """
+        Stores a decoded response if its endpoint is cacheable.
+        """
+        ttl = self.ttl(endpoint)
+        if ttl <= 0:
+            return
+
+        key = self.key(endpoint, params)
+        payload = json.dumps(data).encode()
+        size = len(payload)
+        if size > self.__max_bytes:
+            logger.warning(f"Response for {endpoint} is larger than the cache ({size} bytes), not caching")
+            return
+
+        now = time.time()
+        previous = self.__db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+        self.__db.execute(
+            'INSERT OR REPLACE INTO responses (key, endpoint, payload, size, expires_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (key, endpoint, payload, size, now + ttl, now)
+        )
+        self.__total_bytes += size - (previous[0] if previous else 0)
+        self.__stats['stores'] += 1
+        self._evict(now)
+        self.__db.commit()
+
+    def _evict(self, now: float):
+        # Other processes share the database, so the size is recomputed from it instead of
+        # tracked per process
+        self.__total_bytes = self.__db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if self.__total_bytes <= self.__max_bytes:
+            return
+        # Buffered access times are written first, so the least-recently-used order includes recent hits
+        self._write_access_times()
+        expired_count, expired_bytes = self.__db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE expires_at <= ?', (now,)
+        ).fetchone()
+        self.__db.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        self.__total_bytes -= expired_bytes
+        self.__stats['evictions'] += expired_count
+        while self.__total_bytes > self.__max_bytes:
+            row = self.__db.execute('SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1').fetchone()
+            if row is None:
+                break
+            key, size = row
+            self.__db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.__total_bytes -= size
+            self.__stats['evictions'] += 1
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self.__stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['bytes'] = self.__total_bytes
+        return stats
@@ -0,0 +1,272 @@
+import env_var
+import asyncio
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from async_eodhd_api import SharedTokenBucket
+from data_collection import DataCollector
+from main import collecting_data
+from response_cache import ResponseCache
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Data types collected per symbol; every shard collects these for its own symbols.
+# The remaining data types (earnings, ipos, splits, macro indicators, indices) are collected by shard 0 only.
+SYMBOL_DATA_TYPES = ('historical', 'fundamental', 'news', 'trends')
+SHARED_DATA_TYPES = ('earnings', 'ipos', 'splits', 'macro_indicators', 'indices')
+# Options of collecting_data that also configure the coordinator's DataCollector
+COLLECTOR_OPTIONS = ('storage_layout', 'skip_unchanged', 'max_concurrency')
+
+# (symbols, data types, options overriding the collection options) of one collecting_data call
+ShardGroup = Tuple[List[str], Tuple[str, ...], Dict[str, Any]]
+
+# Rate limiter shared by all workers of the pool, set by _init_worker
+_rate_limiter = None
+
+
+def shard_for(symbol: str, shards: int) -> int:
+    """
+    Returns the shard of a symbol. crc32 is stable across processes and runs,
+    unlike the built-in hash() of a string.
+    """
+    return zlib.crc32(symbol.encode('utf-8')) % shards
+
+
+def shard_symbols(symbols: List[str], shards: int) -> List[List[str]]:
+    """
+    Splits symbols into shards by hashing the ticker.
+
+    :param symbols: Symbols to split
+    :param shards: Number of shards
+    :return: One list of symbols per shard; shards may be empty
+    """
+    result = [[] for _ in range(shards)]
+    for symbol in symbols:
+        result[shard_for(symbol, shards)].append(symbol)
+    return result
+
+
+def _init_worker(rate_limiter: SharedTokenBucket):
+    global _rate_limiter
+    _rate_limiter = rate_limiter
+
+
+def plan_shard_groups(
+    shard: int,
+    symbols: List[str],
+    per_symbol_history: Optional[Iterable[str]] = None,
+    per_symbol_fundamentals: Optional[Iterable[str]] = None
+) -> List[ShardGroup]:
+    """
+    Plans the collecting_data calls of a shard.
+    When the coordinator already stored the bulk data, history and fundamentals are
+    only collected for the shard's symbols the bulk data did not cover.
+
+    :param shard: Index of the shard; shard 0 also collects the data types shared by all symbols
+    :param symbols: Symbols of the shard
+    :param per_symbol_history: Symbols that still need per-symbol history, or None without bulk history
+    :param per_symbol_fundamentals: Symbols that still need per-symbol fundamentals, or None without bulk fundamentals
+    :return: (symbols, data types, option overrides) per collecting_data call
+    """
+    bulk_types = {'historical': per_symbol_history, 'fundamental': per_symbol_fundamentals}
+    data_types = tuple(
+        data_type for data_type in SYMBOL_DATA_TYPES if bulk_types.get(data_type) is None
+    ) if symbols else ()
+    if shard == 0:
+        data_types += SHARED_DATA_TYPES
+    # collecting_data falls back to default symbols when given none, so empty groups are never planned
+    groups = [(symbols, data_types, {})] if data_types else []
+    for data_type, remaining in bulk_types.items():
+        if remaining is None:
+            continue
+        remaining = set(remaining)
+        group_symbols = [symbol for symbol in symbols if symbol in remaining]
+        if group_symbols:
+            # Symbols with stored history only fetch the bars after their latest date
+            groups.append((group_symbols, (data_type,), {'incremental': True} if data_type == 'historical' else {}))
+    return groups
+
+
+def _run_shard(
+    shard: int,
+    groups: List[ShardGroup],
+    eodhd_api_token: str,
+    mongo_uri: str,
+    cache_path: str = None,
+    **collection_options
+) -> Dict[str, Dict[str, str]]:
+    # Runs in a worker process with its own event loop, API session and MongoDB client;
+    # the groups of the shard share one response cache
+    failed_operations = {}
+    cache = ResponseCache(cache_path) if cache_path else None
+    try:
+        for symbols, data_types, overrides in groups:
+            group_failures = asyncio.run(collecting_data(
+                eodhd_api_token,
+                mongo_uri,
+                symbols=symbols,
+                data_types=data_types,
+                rate_limiter=_rate_limiter,
+                cache=cache,
+                **{**collection_options, **overrides}
+            ))
+            for data_type, failures in group_failures.items():
+                failed_operations.setdefault(data_type, {}).update(failures)
+    finally:
+        if cache is not None:
+            cache.close()
+    # Exceptions (e.g. aiohttp errors) are not reliably picklable, so only their text is sent back
+    return {
+        data_type: {key: f"{type(error).__name__}: {error}" for key, error in failures.items()}
+        for data_type, failures in failed_operations.items()
+    }
+
+
+async def _collect_bulk(
+    eodhd_api_token: str,
+    mongo_uri: str,
+    exchange: str,
+    symbols: List[str],
+    bulk_fundamentals: bool,
+    failed_operations: Dict[str, Dict[str, str]],
+    fundamental_sections: List[str] = None,
+    cache_path: str = None,
+    **collector_options
+) -> Tuple[List[str], Optional[List[str]]]:
+    # Runs once in the coordinator, so the exchange-wide bulk payloads are downloaded once per run
+    per_symbol_history, per_symbol_fundamentals = [], None
+    cache = ResponseCache(cache_path) if cache_path else None
+    try:
+        async with DataCollector(eodhd_api_token, mongo_uri, cache=cache, **collector_options) as dc:
+            try:
+                per_symbol_history = await dc.collect_and_store_bulk_last_day(exchange, symbols)
+            except Exception as e:
+                logger.error(f"Bulk historical data of {exchange} failed: {e}")
+                failed_operations.setdefault('historical', {})['all_data'] = f"{type(e).__name__}: {e}"
+            if bulk_fundamentals:
+                # Symbols of other exchanges are not in the bulk payload and are left to their shards
+                symbol_map, other_exchanges = DataCollector._exchange_symbol_map(exchange, symbols)
+                try:
+                    missing = (
+                        await dc.collect_and_store_bulk_fundamental_data(
+                            exchange, list(symbol_map.values()), sections=fundamental_sections
+                        ) if symbol_map else []
+                    )
+                except Exception as e:
+                    logger.error(f"Bulk fundamental data of {exchange} failed: {e}")
+                    failed_operations.setdefault('fundamental', {})['all_data'] = f"{type(e).__name__}: {e}"
+                    missing = []
+                per_symbol_fundamentals = missing + other_exchanges
+    finally:
+        if cache is not None:
+            await asyncio.to_thread(cache.close)
+    return per_symbol_history, per_symbol_fundamentals
+
+
+def collect_sharded(
+    eodhd_api_token: str,
+    mongo_uri: str,
+    symbols: List[str],
+    processes: int = None,
+    requests_per_minute: float = None,
+    burst: float = None,
+    bulk_exchange: str = None,
+    bulk_fundamentals: bool = False,
+    **collection_options: Any
+) -> Dict[str, Dict[str, str]]:
+    """
+    Collects data for a large symbol universe with one process per shard.
+    Every worker runs its own event loop, API session and MongoDB client, while all
+    workers draw from one shared rate budget of requests_per_minute.
+
+    :param eodhd_api_token: EODHD API token
+    :param mongo_uri: MongoDB connection URI
+    :param symbols: Symbols to collect
+    :param processes: Number of worker processes, defaults to the number of CPUs
+    :param requests_per_minute: Global request budget shared by all workers
+    :param burst: Burst size of the shared budget
+    :param bulk_exchange: Exchange whose bulk last-day data is fetched once by the coordinator
+    :param bulk_fundamentals: Also fetch the bulk fundamentals of bulk_exchange once by the coordinator
+    :param collection_options: Further options passed to collecting_data in every worker
+    :return: Failed operations of all shards as {data type: {key: error text}}
+    """
+    processes = max(1, min(processes or multiprocessing.cpu_count(), len(symbols) or 1))
+    shards = shard_symbols(symbols, processes)
+    # The shared limiter must exist before the workers start; spawn avoids forking a running event loop
+    context = multiprocessing.get_context('spawn')
+    rate_limiter = SharedTokenBucket(requests_per_minute, burst, context=context) if requests_per_minute else None
+
+    failed_operations: Dict[str, Dict[str, str]] = {}
+    per_symbol_history = per_symbol_fundamentals = None
+    if bulk_exchange:
+        per_symbol_history, per_symbol_fundamentals = asyncio.run(_collect_bulk(
+            eodhd_api_token,
+            mongo_uri,
+            bulk_exchange,
+            symbols,
+            bulk_fundamentals,
+            failed_operations,
+            fundamental_sections=collection_options.get('fundamental_sections'),
+            cache_path=collection_options.get('cache_path'),
+            rate_limiter=rate_limiter,
+            **{option: collection_options[option] for option in COLLECTOR_OPTIONS if option in collection_options}
+        ))
+
+    groups = [
+        plan_shard_groups(shard, shard_symbols_, per_symbol_history, per_symbol_fundamentals)
+        for shard, shard_symbols_ in enumerate(shards)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=context, initializer=_init_worker, initargs=(rate_limiter,)
+    ) as pool:
+        futures = {
+            pool.submit(_run_shard, shard, shard_groups, eodhd_api_token, mongo_uri, **collection_options): shard
+            for shard, shard_groups in enumerate(groups)
+            if shard_groups
+        }
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                shard_failures = future.result()
+            except Exception as e:
+                # The worker process died; report all of its symbols as failed
+                logger.error(f"Shard {shard} failed: {e}")
+                for symbol in shards[shard]:
+                    failed_operations.setdefault('shard', {})[symbol] = f"{type(e).__name__}: {e}"
+                continue
+            logger.info(f"Shard {shard} finished with {sum(len(f) for f in shard_failures.values())} failures")
+            for data_type, failures in shard_failures.items():
+                failed_operations.setdefault(data_type, {}).update(failures)
+
+    return failed_operations
+
+
+def main():
+    symbols = [symbol.strip() for symbol in (env_var.EODHD_SYMBOLS or '').split(',') if symbol.strip()]
+    failed_operations = collect_sharded(
+        env_var.EODHD_REAL_TOKEN,
+        f"mongodb://{env_var.MONGO_HOST}:27017/",
+        symbols or ['AAPL', 'TSLA', 'MSFT'],
+        processes=env_var.EODHD_PROCESSES,
+        requests_per_minute=env_var.EODHD_REQUESTS_PER_MINUTE,
+        bulk_exchange=env_var.EODHD_BULK_EXCHANGE,
+        bulk_fundamentals=env_var.EODHD_BULK_FUNDAMENTALS,
+        fundamental_sections=env_var.EODHD_FUNDAMENTAL_SECTIONS,
+        incremental=env_var.EODHD_INCREMENTAL,
+        streaming=env_var.EODHD_STREAMING,
+        storage_layout=env_var.EODHD_STORAGE_LAYOUT,
+        skip_unchanged=env_var.EODHD_SKIP_UNCHANGED,
+        max_concurrency=env_var.EODHD_MAX_CONCURRENCY,
+        cache_path=env_var.EODHD_CACHE_PATH
+    )
+    if failed_operations:
+        logger.error(f"Sharded collection finished with failures in: {', '.join(failed_operations)}")
+    else:
+        logger.info("Sharded collection completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock
+from adjustments import AdjustmentEngine, adjust_bars, adjustment_factors, codes_by_ticker, split_code, split_ratios
+
+
+def make_bars(symbol, dates, close):
+    return pd.DataFrame({
+        'symbol': symbol,
+        'date': pd.to_datetime(dates),
+        'open': close, 'high': close, 'low': close, 'close': close,
+        'volume': [100] * len(dates)
+    })
+
+
+def test_adjustment_factors_compound_later_splits():
+    dates = pd.to_datetime(['2020-01-01', '2020-06-01', '2021-01-01', '2022-01-01']).to_numpy()
+    split_dates = pd.to_datetime(['2020-06-01', '2021-06-01']).to_numpy()
+    # The split day itself already trades on the new share count
+    assert np.allclose(adjustment_factors(dates, split_dates, [4.0, 2.0]), [0.125, 0.5, 0.5, 1.0])
+
+
+def test_adjust_bars_only_touches_split_symbols():
+    splits = split_ratios(pd.DataFrame([
+        {'code': 'AAPL.US', 'split_date': '2020-08-31', 'old_shares': 1, 'new_shares': 4},
+    ]))
+    bars = pd.concat([
+        make_bars('AAPL', ['2020-08-28', '2020-08-31'], [400.0, 100.0]),
+        make_bars('MSFT', ['2020-08-28'], [200.0]),
+    ], ignore_index=True)
+    adjusted = adjust_bars(bars, splits)
+    assert list(adjusted['close']) == [100.0, 100.0, 200.0]
+    assert list(adjusted['volume']) == [400, 100, 100]
+    assert list(bars['close']) == [400.0, 100.0, 200.0]
+
+
+class FakeClient:
+    def __init__(self, bars, splits):
+        self.bars = bars
+        self.splits = splits
+        self.state = {}
+        self.reads = []
+        self.stored = []
+        state_collection = MagicMock()
+        state_collection.find.side_effect = lambda query: [
+            {'_id': symbol, **state} for symbol, state in self.state.items() if symbol in query['_id']['$in']
+        ]
+        state_collection.replace_one.side_effect = lambda query, document, upsert: self.state.update(
+            {query['_id']: document}
+        )
+        self.database = {'state': state_collection}
+
+    def __getitem__(self, name):
+        return self.database
+
+    def symbols_with_history(self):
+        return sorted(self.bars['symbol'].unique())
+
+    def get_calendar_window(self, data_type, output='frame'):
+        return pd.DataFrame(self.splits)
+
+    def get_historical_range(self, symbols, from_date=None, to_date=None):
+        self.reads.append((symbols[0], from_date, to_date))
+        bars = self.bars[self.bars['symbol'].isin(symbols)]
+        if from_date:
+            bars = bars[bars['date'] >= from_date]
+        if to_date:
+            bars = bars[bars['date'] <= to_date]
+        return bars
+
+    def store_adjusted_data(self, symbol, data):
+        self.stored.append((symbol, data))
+        return len(data)
+
+
+def test_engine_recomputes_only_bars_affected_by_a_new_split():
+    bars = pd.concat([
+        make_bars('AAPL', ['2024-01-02', '2024-01-03', '2024-01-04'], [300.0, 100.0, 100.0]),
+        make_bars('MSFT', ['2024-01-02', '2024-01-03'], [400.0, 400.0]),
+    ], ignore_index=True)
+    client = FakeClient(bars, [])
+    engine = AdjustmentEngine(client)
+    assert engine.run() == {'AAPL': 3, 'MSFT': 2}
+
+    # Nothing new: no reads, no writes
+    client.reads.clear()
+    assert engine.run() == {}
+    assert client.reads == [('AAPL', '2024-01-05', None), ('MSFT', '2024-01-04', None)]
+
+    client.splits = [{'code': 'AAPL.US', 'split_date': '2024-01-03', 'old_shares': 1, 'new_shares': 3}]
+    client.reads.clear()
+    client.stored.clear()
+    assert engine.run() == {'AAPL': 1}
+    assert client.reads[0] == ('AAPL', None, '2024-01-02')
+    symbol, adjusted = client.stored[0]
+    assert symbol == 'AAPL' and list(adjusted['close']) == [100.0] and list(adjusted['volume']) == [300]
+    assert client.state['AAPL']['splits'] == [['2024-01-03', 3.0]]
+    assert client.state['AAPL']['last_date'] == '2024-01-04'
+
+
+def test_splits_only_apply_to_their_own_exchange():
+    splits = split_ratios(pd.DataFrame([
+        {'code': 'VOD.US', 'split_date': '2020-08-31', 'old_shares': 1, 'new_shares': 2},
+    ]))
+    bars = pd.concat([
+        make_bars('VOD.US', ['2020-08-28'], [100.0]),
+        make_bars('VOD.LSE', ['2020-08-28'], [100.0]),
+        make_bars('VOD', ['2020-08-28'], [100.0]),
+    ], ignore_index=True)
+    assert list(adjust_bars(bars, splits)['close']) == [50.0, 100.0, 50.0]
+    grouped = codes_by_ticker(['VOD.US', 'VOD.LSE', 'BP.LSE', 'SHEL.LSE', 'SHEL.AS'])
+    assert split_code('VOD', grouped) == 'VOD.US'
+    assert split_code('BP', grouped) == 'BP.LSE'
+    assert split_code('SHEL', grouped) is None
+    assert split_code('BP.US', grouped) is None
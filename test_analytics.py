@@ -0,0 +1,47 @@
+import functools
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import (
+    cross_sectional_ranks, data_quality_report, find_duplicates, map_symbols, returns, rolling_volatility, to_wide
+)
+
+def make_bars():
+    dates = pd.bdate_range('2024-01-01', periods=30)
+    frames = []
+    for i, symbol in enumerate(['AAA', 'BBB', 'CCC']):
+        frames.append(pd.DataFrame({'symbol': symbol, 'date': dates, 'adjusted_close': 100.0 * (1 + 0.01 * (i + 1)) ** np.arange(30)}))
+    bars = pd.concat(frames, ignore_index=True)
+    # BBB misses two dates, CCC has a duplicate date
+    bars = bars.drop(bars[(bars['symbol'] == 'BBB') & bars['date'].isin(dates[10:12])].index)
+    return pd.concat([bars, bars[bars['symbol'] == 'CCC'].iloc[[5]]], ignore_index=True), dates
+
+def test_returns_volatility_and_ranks():
+    bars, _ = make_bars()
+    prices = to_wide(bars)
+    daily = returns(prices)
+    assert daily['AAA'].iloc[1:].round(6).eq(0.01).all()
+    volatility = rolling_volatility(daily, window=5)
+    assert volatility['AAA'].dropna().abs().max() < 1e-9
+    ranks = cross_sectional_ranks(prices)
+    assert list(ranks.iloc[-1]) == pytest.approx([1 / 3, 2 / 3, 1.0])
+
+def test_data_quality_report():
+    bars, dates = make_bars()
+    report = data_quality_report(bars)
+    assert report.loc['BBB', 'missing_dates'] == 2
+    assert report.loc['CCC', 'duplicate_dates'] == 1
+    assert report.loc['AAA', ['missing_dates', 'duplicate_dates']].tolist() == [0, 0]
+    parallel = map_symbols(functools.partial(data_quality_report, calendar=dates), bars, processes=2)
+    pd.testing.assert_frame_equal(parallel.sort_index(), report, check_freq=False)
+
+def test_find_duplicates_exact_and_near():
+    news = pd.DataFrame({
+        'date': ['2024-01-01', '2024-01-01', '2024-01-01', '2024-01-02'],
+        'title': ['Apple beats estimates', 'Apple beats estimates', 'APPLE beats estimates!', 'Other'],
+        'symbols': [['AAPL'], ['AAPL'], ['AAPL'], ['MSFT']],
+    })
+    assert len(find_duplicates(news)) == 2
+    near = find_duplicates(news, key_columns=['date', 'title'], text_columns=['title'])
+    assert len(near) == 3
+    assert set(near['duplicate_count']) == {3}
@@ -1,7 +1,12 @@
 import pytest
 import asyncio
-from async_eodhd_api import EodhdAPISession
-from aiohttp import ClientSession, ClientResponseError, RequestInfo
+import contextlib
+import json
+from async_eodhd_api import EodhdAPISession, TokenBucket
+from data_collection import DataCollector
+from db_operations import news_key
+from metrics import registry
+from aiohttp import ClientSession, ClientResponseError, RequestInfo, web
 from yarl import URL
 from unittest.mock import patch, MagicMock
 
@@ -29,6 +34,40 @@ async def test_get_historical_data(api_key):
             assert data == mock_data
             mock_request.assert_called_once_with('/api/eod/AAPL', {'period': 'd'})
 
+@pytest.mark.asyncio
+async def test_get_historical_data_date_range(api_key):
+    async with EodhdAPISession(api_key) as session:
+        with patch.object(session, '_make_request') as mock_request:
+            mock_request.return_value = [{"date": "2023-06-02", "close": 101}]
+            await session.get_historical_data("AAPL", from_date="2023-06-02")
+            mock_request.assert_called_once_with('/api/eod/AAPL', {'period': 'd', 'from': '2023-06-02'})
+
+@pytest.mark.asyncio
+async def test_get_historical_data_columnar(api_key):
+    async with EodhdAPISession(api_key) as session:
+        with patch.object(session, '_make_request') as mock_request:
+            mock_request.return_value = [{"date": "2023-06-01", "close": 100, "volume": 10}]
+            _, array = await session.get_historical_data("AAPL", output='array')
+            assert array['close'].tolist() == [100.0]
+            _, frame = await session.get_historical_data("AAPL", output='frame')
+            assert frame['volume'].tolist() == [10]
+            with pytest.raises(ValueError):
+                await session.get_historical_data("AAPL", output='xml')
+
+@pytest.mark.asyncio
+async def test_get_bulk_last_day_data(api_key):
+    async with EodhdAPISession(api_key) as session:
+        with patch.object(session, '_make_request') as mock_request:
+            mock_data = [
+                {"code": "AAPL", "exchange_short_name": "US", "date": "2023-06-02", "close": 101},
+                {"code": "MSFT", "exchange_short_name": "US", "date": "2023-06-02", "close": 250},
+            ]
+            mock_request.return_value = mock_data
+            exchange, data = await session.get_bulk_last_day_data("US")
+            assert exchange == "US"
+            assert data == mock_data
+            mock_request.assert_called_once_with('/api/eod-bulk-last-day/US', {})
+
 @pytest.mark.asyncio
 async def test_get_fundamental_data(api_key):
     async with EodhdAPISession(api_key) as session:
@@ -83,5 +122,241 @@ async def test_make_request_failure(api_key):
                 await session._make_request('/test', {})
             assert mock_get.call_count == 3
 
+@pytest.mark.asyncio
+async def test_make_request_honours_retry_after(api_key):
+    async with EodhdAPISession(api_key, max_retries=3, retry_delay=10) as session:
+        with patch.object(session.session, 'get') as mock_get:
+            mock_response = MagicMock()
+            request_info = RequestInfo(URL("https://eodhd.com/test"), "GET", ())
+            mock_response.raise_for_status.side_effect = [
+                ClientResponseError(request_info, (), status=429, headers={'Retry-After': '0.01'}),
+                None
+            ]
+            mock_response.json.return_value = asyncio.Future()
+            mock_response.json.return_value.set_result({"data": "test"})
+            mock_get.return_value.__aenter__.return_value = mock_response
+
+            result = await session._make_request('/test', {})
+            assert result == {"data": "test"}
+            stats = session.throttle_stats()
+            assert stats['rate_limited_responses'] == 1
+            assert stats['retry_after_wait'] == pytest.approx(0.01)
+
+@contextlib.asynccontextmanager
+async def local_server(routes):
+    app = web.Application()
+    for path, handler in routes.items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        yield f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    finally:
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_connection_stats_reuse(api_key):
+    async def handler(request):
+        return web.json_response({"ok": True})
+
+    async with local_server({'/api/test': handler}) as base_url:
+        async with EodhdAPISession(api_key, pool_size=1, base_url=base_url) as session:
+            for _ in range(3):
+                assert await session._make_request('/api/test', {}) == {"ok": True}
+            stats = session.connection_stats()
+            assert stats['requests'] == 3
+            assert stats['connections_created'] == 1
+            assert stats['connections_reused'] == 2
+            assert stats['reuse_ratio'] == pytest.approx(2 / 3)
+
+@pytest.mark.asyncio
+async def test_stream_historical_data(api_key):
+    bars = [{"date": f"2023-06-{day:02d}", "close": 100 + day} for day in range(1, 11)]
+
+    async def handler(request):
+        assert request.query['from'] == '2023-06-01'
+        response = web.StreamResponse()
+        await response.prepare(request)
+        payload = json.dumps(bars).encode()
+        for start in range(0, len(payload), 7):
+            await response.write(payload[start:start + 7])
+        return response
+
+    async with local_server({'/api/eod/AAPL': handler}) as base_url:
+        async with EodhdAPISession(api_key, base_url=base_url) as session:
+            batches = [batch async for batch in session.stream_historical_data("AAPL", from_date="2023-06-01", batch_size=4)]
+            assert [len(batch) for batch in batches] == [4, 4, 2]
+            assert [bar for batch in batches for bar in batch] == bars
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(requests_per_minute=1200, burst=1)
+    waits = [await bucket.acquire() for _ in range(3)]
+    assert waits[0] < 0.01
+    assert sum(waits) >= 0.09
+
+@pytest.mark.asyncio
+async def test_token_bucket_pause():
+    bucket = TokenBucket(requests_per_minute=60000)
+    bucket.pause(0.05)
+    assert await bucket.acquire() >= 0.04
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_coalesced(api_key):
+    hits = []
+
+    async def handler(request):
+        hits.append(request.query.get('from'))
+        await asyncio.sleep(0.05)
+        return web.json_response([{"date": "2023-06-01", "close": 100.0}])
+
+    async with local_server({'/api/eod/AAPL': handler}) as base_url:
+        async with EodhdAPISession(api_key, base_url=base_url) as session:
+            results = await asyncio.gather(
+                *(session.get_historical_data("AAPL", from_date="2023-06-01") for _ in range(4)),
+                session.get_historical_data("AAPL", from_date="2023-06-02")
+            )
+            assert [data for _, data in results[:4]] == [[{"date": "2023-06-01", "close": 100.0}]] * 4
+            assert sorted(hits) == ['2023-06-01', '2023-06-02']
+            stats = session.coalesce_stats()
+            assert stats['requests'] == 5
+            assert stats['coalesced'] == 3
+
+@pytest.mark.asyncio
+async def test_earnings_are_chunked_merged_and_deduplicated(api_key):
+    requests = []
+
+    async def handler(request):
+        symbols = request.query['symbols'].split(',')
+        requests.append((tuple(symbols), request.query['from'], request.query['to']))
+        if 'BAD' in symbols:
+            return web.Response(status=400)
+        # The same record is returned for every window
+        return web.json_response({"type": "Earnings", "earnings": [
+            {"code": symbol, "date": "2024-01-15"} for symbol in symbols
+        ]})
+
+    symbols = ['AAA', 'BBB', 'CCC', 'BAD']
+    async with local_server({'/api/calendar/earnings': handler}) as base_url:
+        async with EodhdAPISession(api_key, base_url=base_url, max_retries=1) as session:
+            data = await session.get_earnings_data(
+                symbols, from_date='2024-01-01', to_date='2024-02-10', window_days=31, max_symbols_chars=8
+            )
+    assert len(requests) == 4
+    assert {(window_from, window_to) for _, window_from, window_to in requests} == {
+        ('2024-01-01', '2024-01-31'), ('2024-02-01', '2024-02-10')
+    }
+    assert data['earnings'] == [
+        {"code": "AAA", "date": "2024-01-15"}, {"code": "BBB", "date": "2024-01-15"}
+    ]
+    assert sorted(data['failed_chunks']) == ['CCC..BAD@2024-01-01..2024-01-31', 'CCC..BAD@2024-02-01..2024-02-10']
+
+@pytest.mark.asyncio
+async def test_request_metrics(api_key):
+    registry.reset()
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            return web.Response(status=503)
+        return web.json_response({"ok": True})
+
+    async with local_server({'/api/eod/AAPL': handler}) as base_url:
+        async with EodhdAPISession(api_key, base_url=base_url, retry_delay=0.01) as session:
+            assert await session._make_request('/api/eod/AAPL', {}) == {"ok": True}
+
+    summary = registry.summary()
+    statuses = {item['labels']['status']: item['value'] for item in summary['eodhd_http_responses_total']}
+    assert statuses == {'503': 1, '200': 1}
+    assert summary['eodhd_http_retries_total'] == [{'labels': {'endpoint': '/api/eod/{code}'}, 'value': 1}]
+    assert summary['eodhd_http_request_seconds'][0]['count'] == 2
+    assert summary['eodhd_http_response_bytes_total'][0]['value'] > 0
+
+@pytest.mark.asyncio
+async def test_bulk_fundamentals_are_paginated(api_key):
+    offsets = []
+
+    async def handler(request):
+        offset, limit = int(request.query['offset']), int(request.query['limit'])
+        offsets.append(offset)
+        rows = [{"General": {"Code": f"C{i}"}} for i in range(offset, min(offset + limit, 5))]
+        return web.json_response({str(i): row for i, row in enumerate(rows)})
+
+    async with local_server({'/api/bulk-fundamentals/US': handler}) as base_url:
+        async with EodhdAPISession(api_key, base_url=base_url) as session:
+            pages = [page async for page in session.iter_bulk_fundamental_data('US', page_size=2)]
+    assert offsets == [0, 2, 4]
+    assert [[row["General"]["Code"] for row in page] for page in pages] == [["C0", "C1"], ["C2", "C3"], ["C4"]]
+
+@pytest.mark.asyncio
+async def test_bulk_fundamentals_split_long_symbol_lists(api_key):
+    requested = []
+
+    async def handler(request):
+        codes = request.query['symbols'].split(',')
+        requested.append(codes)
+        return web.json_response({str(i): {"General": {"Code": code}} for i, code in enumerate(codes)})
+
+    symbols = [f"SYM{i:03d}" for i in range(300)]
+    async with local_server({'/api/bulk-fundamentals/US': handler}) as base_url:
+        async with EodhdAPISession(api_key, base_url=base_url) as session:
+            pages = [page async for page in session.iter_bulk_fundamental_data('US', symbols=symbols)]
+    assert len(requested) > 1
+    assert all(len(','.join(codes)) < 1500 for codes in requested)
+    assert [row["General"]["Code"] for page in pages for row in page] == symbols
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_pages", [10, 1])
+async def test_incremental_news_sync_stops_at_stored_articles(api_key, max_pages):
+    # The page cap does not apply once a watermark bounds the sync
+    requests = []
+    # Newest first; the feed repeats "b", "d" is stored and "e" was published later on the watermark day
+    feed = [{"date": f"2024-01-0{day}T{hour}:00:00+00:00", "title": title}
+            for day, hour, title in ((9, 10, "a"), (8, 10, "b"), (8, 10, "b"), (7, 10, "c"), (6, 12, "e"), (6, 10, "d"),
+                                     (5, 10, "f"), (4, 10, "g"))]
+
+    async def handler(request):
+        offset, limit = int(request.query['offset']), int(request.query['limit'])
+        requests.append((request.query['from'], offset))
+        articles = [article for article in feed if article["date"] >= request.query['from']]
+        return web.json_response(articles[offset:offset + limit])
+
+    async with local_server({'/api/news': handler}) as base_url:
+        collector = DataCollector(api_key, 'mongodb://localhost:1', base_url=base_url)
+        mongo_client = collector._DataCollector__mongo_client
+        with patch.object(mongo_client, 'get_news_sync_state', return_value=("2024-01-06", {news_key(feed[5])})):
+            articles = await collector._fetch_news("AAPL", incremental=True, page_size=2, max_pages=max_pages)
+        await collector._DataCollector__session.close()
+        await mongo_client.close()
+    assert [article["title"] for article in articles] == ["a", "b", "c", "e"]
+    assert requests == [("2024-01-06", 0), ("2024-01-06", 2), ("2024-01-06", 4)]
+
+@pytest.mark.asyncio
+async def test_first_news_sync_warns_when_capped(api_key, caplog):
+    feed = [{"date": f"2024-01-0{day}T10:00:00+00:00", "title": str(day)} for day in range(9, 0, -1)]
+
+    async def handler(request):
+        offset, limit = int(request.query['offset']), int(request.query['limit'])
+        return web.json_response(feed[offset:offset + limit])
+
+    async with local_server({'/api/news': handler}) as base_url:
+        collector = DataCollector(api_key, 'mongodb://localhost:1', base_url=base_url)
+        mongo_client = collector._DataCollector__mongo_client
+        with patch.object(mongo_client, 'get_news_sync_state', return_value=(None, set())):
+            articles = await collector._fetch_news("AAPL", incremental=True, page_size=2, max_pages=2)
+        await collector._DataCollector__session.close()
+        await mongo_client.close()
+    assert [article["title"] for article in articles] == ["9", "8", "7", "6"]
+    assert "older articles were not fetched" in caplog.text
+
+def test_retry_after_parsing():
+    assert EodhdAPISession._retry_after({'Retry-After': '2'}) == 2.0
+    assert EodhdAPISession._retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0.0
+    assert EodhdAPISession._retry_after({}) is None
+    assert EodhdAPISession._retry_after(None) is None
+
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file
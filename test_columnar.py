@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from columnar import bars_to_array, bars_to_frame, to_records
+
+BARS = [
+    {"date": "2023-06-01", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "adjusted_close": 1.4, "volume": 100},
+    {"date": "2023-06-02", "open": 1.5, "high": 2.5, "low": 1.0, "close": None, "adjusted_close": 2.0, "volume": 200},
+]
+
+def test_bars_to_array_types():
+    array = bars_to_array(BARS)
+    assert array['date'].dtype == np.dtype('datetime64[D]')
+    assert array['volume'].tolist() == [100, 200]
+    assert np.isnan(array['close'][1])
+
+def test_bars_to_frame_types():
+    frame = bars_to_frame(BARS)
+    assert pd.api.types.is_datetime64_any_dtype(frame['date'])
+    assert frame['close'].dtype == np.float64
+    assert frame['volume'].dtype == np.int64
+
+def test_round_trip_to_records():
+    assert to_records(bars_to_array(BARS)) == BARS
+    assert to_records(bars_to_frame(BARS)) == BARS
+    assert to_records(BARS) is BARS
@@ -0,0 +1,85 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+from data_collection import DataCollector
+from db_operations import StoreError
+
+@pytest_asyncio.fixture
+async def collector():
+    collector = DataCollector("test_api_key", 'mongodb://localhost:1')
+    yield collector
+    await collector._DataCollector__session.close()
+    await collector._DataCollector__mongo_client.close()
+
+def test_exchange_symbol_map_keeps_other_exchanges_apart():
+    symbol_map, other_exchanges = DataCollector._exchange_symbol_map('US', ['VOD.US', 'VOD.LSE', 'AAPL'])
+    assert symbol_map == {'VOD': 'VOD.US', 'AAPL': 'AAPL'}
+    assert other_exchanges == ['VOD.LSE']
+
+@pytest.mark.asyncio
+async def test_bulk_history_updates_other_exchanges_per_symbol(collector):
+    session = collector._DataCollector__session
+    mongo_client = collector._DataCollector__mongo_client
+    with patch.object(mongo_client, 'symbols_without_history', AsyncMock(return_value=['NEW.US'])), \
+            patch.object(mongo_client, 'store_bulk_historical_data', AsyncMock()) as store_bulk, \
+            patch.object(session, 'get_bulk_last_day_data', AsyncMock(return_value=('US', [{'code': 'VOD'}]))), \
+            patch.object(collector, 'collect_and_store_historical_data', AsyncMock()) as collect_symbol:
+        failed = await collector.collect_and_store_bulk_historical_data('US', ['VOD.US', 'VOD.LSE', 'NEW.US'])
+    assert failed == {}
+    assert store_bulk.call_args[0][1] == {'VOD': 'VOD.US'}
+    assert sorted(call.args[0] for call in collect_symbol.call_args_list) == ['NEW.US', 'VOD.LSE']
+
+@pytest.mark.asyncio
+async def test_pipeline_history_fetch_is_incremental(collector):
+    session = collector._DataCollector__session
+    mongo_client = collector._DataCollector__mongo_client
+    bars = [{'date': '2024-01-02', 'close': 1.0}, {'date': '2024-01-03', 'close': 2.0}]
+    with patch.object(mongo_client, 'get_latest_historical_date', AsyncMock(return_value='2024-01-02')), \
+            patch.object(session, 'get_historical_data', AsyncMock(return_value=('AAPL.US', bars))) as get_history:
+        payload = await collector._fetch_payload('historical', 'AAPL.US', [], incremental=True)
+    assert get_history.call_args.kwargs['from_date'] == '2024-01-03'
+    assert payload == ('historical', 'AAPL.US', [bars[1]])
+
+@pytest.mark.asyncio
+async def test_bulk_fundamentals_keep_trimmed_sections_apart(collector):
+    session = collector._DataCollector__session
+    mongo_client = collector._DataCollector__mongo_client
+    company = {'General': {'Code': 'AAPL'}, 'Highlights': {}, 'Earnings': {'History': {}}, 'Financials': {}}
+
+    async def pages(*args, **kwargs):
+        yield [company]
+
+    with patch.object(session, 'iter_bulk_fundamental_data', pages), \
+            patch.object(mongo_client, 'store_fundamental_data', AsyncMock()) as store:
+        missing = await collector.collect_and_store_bulk_fundamental_data('US', ['AAPL.US'])
+    assert missing == []
+    symbol, sections = store.call_args.args
+    assert symbol == 'AAPL.US'
+    assert sorted(sections) == ['BulkEarnings', 'BulkFinancials', 'General', 'Highlights']
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_failed_writes_per_symbol(collector):
+    mongo_client = collector._DataCollector__mongo_client
+    failure = StoreError('historical_data', {'MSFT': RuntimeError("1 of 1 documents not written")})
+    with patch.object(mongo_client, 'store_historical_data_many', AsyncMock(side_effect=failure)):
+        errors = await collector._store_payloads('historical', {'AAPL': [{}], 'MSFT': [{}]})
+    assert list(errors) == ['MSFT']
+
+@pytest.mark.asyncio
+async def test_bulk_fundamentals_of_a_large_universe_are_filtered_locally(collector):
+    session = collector._DataCollector__session
+    mongo_client = collector._DataCollector__mongo_client
+    requested = []
+
+    async def pages(exchange, symbols=None, page_size=500):
+        requested.append(symbols)
+        yield [{'General': {'Code': 'AAPL'}}, {'General': {'Code': 'UNLISTED'}}]
+
+    with patch.object(session, 'iter_bulk_fundamental_data', pages), \
+            patch.object(mongo_client, 'store_fundamental_data', AsyncMock()) as store:
+        missing = await collector.collect_and_store_bulk_fundamental_data(
+            'US', ['AAPL.US', 'MSFT.US', 'TSLA.US'], max_filtered_symbols=2
+        )
+    assert requested == [None]
+    assert [call.args[0] for call in store.call_args_list] == ['AAPL.US']
+    assert missing == ['MSFT.US', 'TSLA.US']
@@ -0,0 +1,278 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from db_operations import BulkWriter, EodhdMongoClient, StoreError, content_hash, news_key
+
+def make_client(storage_layout=EodhdMongoClient.PER_SYMBOL):
+    return EodhdMongoClient('mongodb://localhost:1', storage_layout=storage_layout)
+
+def test_index_specs_are_narrow():
+    client = make_client()
+    assert client._index_specs('earnings_data', {}) == [[("date", ASCENDING), ("report_date", ASCENDING)]]
+    assert client._index_specs('historical_data', {"symbol": "AAPL"}) == [
+        [("symbol", ASCENDING), ("date", ASCENDING)],
+        [("date", ASCENDING), ("symbol", ASCENDING)],
+    ]
+
+def test_indexes_are_created_once_per_collection():
+    client = make_client()
+    collection = MagicMock()
+    collection.full_name = 'historical_data.AAPL'
+    for _ in range(3):
+        client._ensure_indexes(collection, 'historical_data', {})
+    collection.create_index.assert_called_once_with([("date", ASCENDING)], unique=True)
+
+def test_store_earnings_succeeds_when_legacy_duplicates_block_the_unique_index():
+    client = make_client()
+    collection = MagicMock()
+    collection.full_name = 'earnings_data.AAPL.US'
+    # A legacy collection holding two documents for 2024-03-31
+    collection.create_index.side_effect = DuplicateKeyError("E11000 duplicate key error")
+    database = MagicMock()
+    database.__getitem__.return_value = collection
+    with patch.object(EodhdMongoClient, '__getitem__', return_value=database):
+        client.store_earnings_data({'earnings': [
+            {"code": "AAPL.US", "date": "2024-03-31", "report_date": "2024-05-02", "actual": 1.5}
+        ]})
+    operation = collection.bulk_write.call_args[0][0][0]
+    assert operation._filter == {"date": "2024-03-31", "report_date": "2024-05-02"}
+
+def test_deduplicate_keeps_the_newest_document_per_date():
+    client = make_client()
+    collection = MagicMock()
+    collection.aggregate.return_value = [{"_id": {"date": "2024-03-31", "period": "0q"}, "ids": [1, 2, 3]}]
+    collection.delete_many.return_value.deleted_count = 2
+    assert client._deduplicate(collection, 'trends_data', {}) == 2
+    collection.delete_many.assert_called_once_with({"_id": {"$in": [1, 2]}})
+    # Rows of different periods on one date are not duplicates
+    group = collection.aggregate.call_args[0][0][1]["$group"]
+    assert group["_id"] == {"date": "$date", "period": "$period"}
+
+def test_store_earnings_upserts_on_symbol_and_dates():
+    client = make_client(EodhdMongoClient.CONSOLIDATED)
+    collection = MagicMock()
+    with patch.object(client, '_symbol_collection', return_value=(collection, {"symbol": "AAPL.US"})):
+        client.store_earnings_data({'earnings': [
+            {"code": "AAPL.US", "date": "2024-03-31", "report_date": "2024-05-02", "actual": 1.5}
+        ]})
+    operation = collection.bulk_write.call_args[0][0][0]
+    assert operation._filter == {"symbol": "AAPL.US", "date": "2024-03-31", "report_date": "2024-05-02"}
+
+def test_store_trends_keeps_every_period_of_a_date():
+    client = make_client()
+    collection = MagicMock()
+    rows = [
+        {"code": "AAPL.US", "date": "2024-03-31", "period": "0q", "earningsEstimateAvg": 1.5},
+        {"code": "AAPL.US", "date": "2024-03-31", "period": "0y", "earningsEstimateAvg": 6.5},
+    ]
+    with patch.object(client, '_symbol_collection', return_value=(collection, {})):
+        client.store_trends_data({'trends': [rows]})
+    operations = collection.bulk_write.call_args[0][0]
+    assert [operation._filter for operation in operations] == [
+        {"date": "2024-03-31", "period": "0q"}, {"date": "2024-03-31", "period": "0y"}
+    ]
+    assert client._index_specs('trends_data', {}) == [[("date", ASCENDING), ("period", ASCENDING)]]
+
+def test_skip_unchanged_only_writes_changed_documents():
+    client = EodhdMongoClient('mongodb://localhost:1', skip_unchanged=True)
+    unchanged = {"date": "2023-06-01", "close": 100.0}
+    changed = {"date": "2023-06-02", "close": 101.0}
+    new = {"date": "2023-06-03", "close": 102.0}
+    collection = MagicMock()
+    collection.find.return_value = [
+        {"date": "2023-06-01", "_hash": content_hash(unchanged)},
+        {"date": "2023-06-02", "_hash": content_hash({"date": "2023-06-02", "close": 99.0})},
+    ]
+    operations = client._upsert_operations(collection, 'historical_data', {}, [unchanged, changed, new])
+    assert [operation._filter for operation in operations] == [{"date": "2023-06-02"}, {"date": "2023-06-03"}]
+    assert operations[0]._doc["$set"]["_hash"] == content_hash(changed)
+    query = collection.find.call_args[0][0]
+    assert query == {"date": {"$gte": "2023-06-01", "$lte": "2023-06-03"}}
+
+def test_skip_unchanged_lookup_is_narrowed_by_the_natural_key():
+    client = EodhdMongoClient('mongodb://localhost:1', skip_unchanged=True)
+    items = [
+        {"CountryCode": "USA", "Indicator": "gdp_current_usd", "Date": "2022-12-31", "Value": 1.0},
+        {"CountryCode": "USA", "Indicator": "inflation_consumer_prices_annual", "Date": "2022-12-31", "Value": 8.0},
+    ]
+    collection = MagicMock()
+    collection.find.return_value = []
+    client._upsert_operations(collection, 'macro_indicators', {}, items)
+    assert collection.find.call_args[0][0] == {
+        "Date": {"$gte": "2022-12-31", "$lte": "2022-12-31"},
+        "CountryCode": "USA",
+        "Indicator": {"$in": ["gdp_current_usd", "inflation_consumer_prices_annual"]}
+    }
+
+def test_skip_unchanged_handles_items_without_a_range_value():
+    client = EodhdMongoClient('mongodb://localhost:1', skip_unchanged=True)
+    dated = {"code": "ABC.US", "start_date": "2024-05-01", "name": "ABC"}
+    undated = {"code": "XYZ.US", "start_date": None, "name": "XYZ"}
+    collection = MagicMock()
+    collection.find.return_value = [{"code": "XYZ.US", "start_date": None, "_hash": content_hash(undated)}]
+    operations = client._upsert_operations(collection, 'ipos', {}, [dated, undated])
+    assert [operation._filter for operation in operations] == [{"code": "ABC.US", "start_date": "2024-05-01"}]
+    assert collection.find.call_args[0][0] == {
+        "$or": [{"start_date": {"$gte": "2024-05-01", "$lte": "2024-05-01"}}, {"start_date": None}],
+        "code": {"$in": ["ABC.US", "XYZ.US"]}
+    }
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": 2}) == content_hash({"b": 2, "a": 1})
+
+def test_bulk_writer_chunks_unordered_and_collects_errors():
+    from pymongo.errors import BulkWriteError
+    writer = BulkWriter(chunk_size=2)
+    collection = MagicMock()
+    collection.full_name = 'historical_data.AAPL'
+    ok = MagicMock(inserted_count=0, upserted_count=2, modified_count=0, matched_count=0)
+    failure = BulkWriteError({
+        'nInserted': 0, 'nUpserted': 1, 'nModified': 0, 'nMatched': 0,
+        'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate key'}], 'writeConcernErrors': []
+    })
+    collection.bulk_write.side_effect = [ok, failure, ok]
+    summary = writer.write(collection, list(range(6)))
+    assert [call.args[0] for call in collection.bulk_write.call_args_list] == [[0, 1], [2, 3], [4, 5]]
+    assert all(call.kwargs == {'ordered': False} for call in collection.bulk_write.call_args_list)
+    assert summary['upserted'] == 5
+    assert summary['failed'] == 1
+    assert summary['errors'][0]['write_errors'][0]['index'] == 3
+    assert writer.stats()['documents'] == 6
+    writer.close()
+
+def test_failed_bulk_writes_are_raised_per_symbol():
+    client = make_client()
+    ok, broken = MagicMock(), MagicMock()
+    ok.bulk_write.return_value = MagicMock(inserted_count=0, upserted_count=1, modified_count=0, matched_count=0)
+    broken.full_name = 'historical_data.MSFT'
+    broken.bulk_write.side_effect = BulkWriteError({
+        'nInserted': 0, 'nUpserted': 0, 'nModified': 0, 'nMatched': 0,
+        'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'document failed validation'}], 'writeConcernErrors': []
+    })
+    collections = {'AAPL': (ok, {}), 'MSFT': (broken, {})}
+    with patch.object(client, '_symbol_collection', side_effect=lambda data_type, symbol: collections[symbol]):
+        with pytest.raises(StoreError) as error:
+            client.store_historical_data_many({'AAPL': [{"date": "2024-01-02"}], 'MSFT': [{"date": "2024-01-02"}]})
+    assert list(error.value.failures) == ['MSFT']
+    assert 'document failed validation' in str(error.value.failures['MSFT'])
+    ok.bulk_write.assert_called_once()
+
+def test_store_universe_diffs_against_previous_list():
+    client = make_client()
+    universe = MagicMock()
+    universe.exchanges.find_one.return_value = {"symbols": ["AAPL.US", "OLD.US"]}
+    with patch.object(client, 'universe', universe, create=True):
+        added, delisted = client.store_universe('US', ["AAPL.US", "NEW.US"])
+    assert added == ["NEW.US"]
+    assert delisted == ["OLD.US"]
+    document = universe.exchanges.replace_one.call_args[0][1]
+    assert document["symbols"] == ["AAPL.US", "NEW.US"]
+
+def test_fundamental_sections_are_written_only_when_changed():
+    client = make_client()
+    highlights = {"MarketCapitalization": 1000}
+    collection = MagicMock()
+    collection.find_one.return_value = {"_hashes": {"Highlights": content_hash(highlights), "General": "stale"}}
+    fundamental_data = MagicMock()
+    fundamental_data.__getitem__.return_value = collection
+    history = MagicMock()
+    with patch.object(client, 'fundamental_data', fundamental_data, create=True), \
+            patch.object(client, 'fundamental_history', history, create=True):
+        changed = client.store_fundamental_data('AAPL', {"General": {"Code": "AAPL"}, "Highlights": highlights})
+    assert changed == ["General"]
+    update = collection.update_one.call_args[0][1]["$set"]
+    assert "Highlights" not in update
+    assert update["General"] == {"Code": "AAPL"}
+    assert update["_hashes.General"] == content_hash({"Code": "AAPL"})
+    entry = history.changes.insert_many.call_args[0][0][0]
+    assert (entry["section"], entry["previous_hash"]) == ("General", "stale")
+
+def test_historical_range_is_cached_until_a_store_lands():
+    client = make_client(EodhdMongoClient.CONSOLIDATED)
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value = [
+        {"symbol": "AAPL", "date": "2024-01-02", "close": 101.0},
+        {"symbol": "AAPL", "date": "2024-01-01", "close": 100.0},
+    ]
+    database = MagicMock()
+    database.__getitem__.return_value = collection
+    with patch.object(EodhdMongoClient, '__getitem__', return_value=database):
+        frame = client.get_historical_range(["AAPL"], from_date="2024-01-01", fields=("close",))
+        client.get_historical_range(["AAPL"], from_date="2024-01-01", fields=("close",))
+        assert collection.find.call_count == 1
+        query, projection = collection.find.call_args[0]
+        assert query == {"date": {"$gte": "2024-01-01"}, "symbol": {"$in": ["AAPL"]}}
+        assert projection == {"date": 1, "close": 1, "_id": 0, "symbol": 1}
+        assert list(frame["close"]) == [100.0, 101.0]
+
+        client._invalidate('historical_data', 'AAPL')
+        client.get_historical_range(["AAPL"], from_date="2024-01-01", fields=("close",))
+        assert collection.find.call_count == 2
+
+def test_store_news_drops_duplicate_articles_before_the_bulk_write():
+    client = make_client()
+    collection = MagicMock()
+    collection.bulk_write.return_value.upserted_count = 2
+    collection.bulk_write.return_value.modified_count = 0
+    article = {"date": "2024-01-02T10:00:00+00:00", "title": "Apple earnings"}
+    with patch.object(client, '_symbol_collection', return_value=(collection, {})):
+        written = client.store_news_data("AAPL", [article, dict(article), {**article, "title": "Other"}])
+    assert len(collection.bulk_write.call_args[0][0]) == 2
+    assert written == 2
+
+def test_news_sync_state_covers_the_watermark_day():
+    client = make_client()
+    collection = MagicMock()
+    collection.find_one.return_value = {"date": "2024-01-02T15:30:00+00:00"}
+    stored = [{"date": "2024-01-02T09:00:00+00:00", "title": "a"}, {"date": "2024-01-02T15:30:00+00:00", "title": "b"}]
+    collection.find.return_value = stored
+    database = MagicMock()
+    database.__getitem__.return_value = collection
+    with patch.object(EodhdMongoClient, '__getitem__', return_value=database):
+        from_date, seen = client.get_news_sync_state("AAPL")
+    assert from_date == "2024-01-02"
+    assert seen == {news_key(article) for article in stored}
+    assert collection.find.call_args[0][0] == {"date": {"$gte": "2024-01-02"}}
+
+def test_latest_historical_date_does_not_create_the_collection():
+    client = make_client()
+    collection = MagicMock()
+    collection.find_one.return_value = None
+    database = MagicMock()
+    database.__getitem__.return_value = collection
+    with patch.object(EodhdMongoClient, '__getitem__', return_value=database):
+        assert client.get_latest_historical_date("NEW.US") is None
+    collection.create_index.assert_not_called()
+
+def test_empty_history_collections_still_need_a_backfill():
+    client = make_client()
+    collections = {"AAPL.US": MagicMock(), "EMPTY.US": MagicMock()}
+    collections["AAPL.US"].find_one.return_value = {"_id": 1}
+    collections["EMPTY.US"].find_one.return_value = None
+    database = MagicMock()
+    database.list_collection_names.return_value = list(collections)
+    database.__getitem__.side_effect = collections.__getitem__
+    with patch.object(EodhdMongoClient, '__getattr__', return_value=database):
+        assert client.symbols_without_history(["AAPL.US", "EMPTY.US", "NEW.US"]) == ["EMPTY.US", "NEW.US"]
+
+def test_migration_copies_earnings_to_the_consolidated_layout():
+    client = make_client()
+    source, target = MagicMock(), MagicMock()
+    source.find.return_value.sort.return_value = [
+        {"date": "2024-03-31", "report_date": "2024-05-02", "actual": 1.4},
+        {"date": "2024-03-31", "report_date": "2024-05-02", "actual": 1.5}
+    ]
+    source_database = MagicMock()
+    source_database.list_collection_names.return_value = ["AAPL.US"]
+    source_database.__getitem__.return_value = source
+    target_database = MagicMock()
+    target_database.__getitem__.return_value = target
+    databases = {"earnings_data": source_database, EodhdMongoClient.CONSOLIDATED_DB: target_database}
+    with patch.object(EodhdMongoClient, '__getitem__', side_effect=databases.__getitem__):
+        assert client.migrate_to_consolidated(["earnings_data"]) == {"earnings_data": 2}
+    operations = target.bulk_write.call_args[0][0]
+    assert [operation._filter for operation in operations] == [
+        {"symbol": "AAPL.US", "date": "2024-03-31", "report_date": "2024-05-02"}
+    ] * 2
+    assert operations[-1]._doc["$set"]["actual"] == 1.5
@@ -0,0 +1,191 @@
+import asyncio
+import itertools
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from pymongo import ReturnDocument
+from job_queue import JobQueue
+from main import run_queued_jobs
+
+def matches(document, query):
+    # Evaluates the subset of the MongoDB query language used by JobQueue
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+            continue
+        value = document.get(field)
+        if isinstance(condition, dict) and any(operator.startswith("$") for operator in condition):
+            for operator, operand in condition.items():
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+                if operator in ("$lt", "$gt"):
+                    if value is None or not (value < operand if operator == "$lt" else value > operand):
+                        return False
+                if operator == "$not" and matches(document, {field: operand}):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+        self.ids = itertools.count()
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def bulk_write(self, operations, ordered=True):
+        upserted = 0
+        for operation in operations:
+            if not any(matches(document, operation._filter) for document in self.documents):
+                self.documents.append({"_id": next(self.ids), **operation._filter, **operation._doc["$setOnInsert"]})
+                upserted += 1
+        return type("Result", (), {"upserted_count": upserted})()
+
+    def find_one_and_update(self, query, update, sort, return_document):
+        candidates = [document for document in self.documents if matches(document, query)]
+        if not candidates:
+            return None
+        document = min(candidates, key=lambda d: tuple(d[field] for field, _ in sort))
+        document.update(update["$set"])
+        for field, value in update["$inc"].items():
+            document[field] += value
+        assert return_document == ReturnDocument.AFTER
+        return dict(document)
+
+    def update_one(self, query, update):
+        for document in self.documents:
+            if matches(document, query):
+                document.update(update["$set"])
+                return type("Result", (), {"matched_count": 1})()
+        return type("Result", (), {"matched_count": 0})()
+
+    def find_one(self, query, projection=None, sort=None):
+        candidates = [document for document in self.documents if matches(document, query)]
+        return min(candidates, key=lambda d: d["not_before"] or datetime.min.replace(tzinfo=timezone.utc)) if candidates else None
+
+    def find(self, query):
+        return [document for document in self.documents if matches(document, query)]
+
+def make_queue(**options):
+    collection = FakeCollection()
+    queue = JobQueue({'collector': {'jobs': collection}}, run_id='2024-01-02', **options)
+    return queue, collection
+
+def test_lease_complete_and_enqueue_keeps_state():
+    queue, _ = make_queue()
+    assert queue.enqueue('historical', ['AAPL', 'MSFT']) == 2
+    job = queue.lease('w1')
+    queue.complete(job)
+    assert queue.enqueue('historical', ['AAPL', 'MSFT']) == 0
+    assert queue.lease('w1')['key'] == 'MSFT'
+    assert queue.lease('w1') is None
+
+def test_lease_only_returns_requested_data_types():
+    queue, _ = make_queue()
+    queue.enqueue('earnings', ['all_data'])
+    queue.enqueue('historical', ['AAPL'])
+    assert queue.lease('w1', data_types=['historical'])['data_type'] == 'historical'
+    assert queue.lease('w1', data_types=['historical']) is None
+
+def test_failed_jobs_back_off_before_they_are_retried():
+    queue, _ = make_queue(retry_delay_seconds=60)
+    queue.enqueue('news', ['AAPL'])
+    queue.fail(queue.lease('w1'), RuntimeError("429"))
+    assert queue.lease('w1') is None
+    assert 59 < queue.next_retry_in() <= 60
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=61)
+    with patch('job_queue.datetime') as clock:
+        clock.now.return_value = later
+        job = queue.lease('w1')
+    assert job['attempts'] == 2
+
+def test_jobs_stay_failed_after_max_attempts():
+    queue, _ = make_queue(max_attempts=2, retry_delay_seconds=0)
+    queue.enqueue('news', ['AAPL'])
+    queue.fail(queue.lease('w1'), RuntimeError("first"))
+    queue.fail(queue.lease('w1'), RuntimeError("second"))
+    assert queue.lease('w1') is None
+    assert queue.next_retry_in() is None
+    assert queue.failed_operations() == {'news': {'AAPL': 'RuntimeError: second'}}
+
+def test_permanent_failures_are_not_retried():
+    queue, _ = make_queue(retry_delay_seconds=0)
+    queue.enqueue('historical', ['AAPL'])
+    queue.fail(queue.lease('w1'), ValueError("not part of this run"), retry=False)
+    assert queue.lease('w1') is None
+
+def test_expired_leases_are_leased_again():
+    queue, collection = make_queue(lease_seconds=600)
+    queue.enqueue('historical', ['AAPL'])
+    queue.lease('crashed-worker')
+    assert queue.lease('w2') is None
+    collection.documents[0]['lease_expires_at'] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    job = queue.lease('w2')
+    assert (job['worker_id'], job['attempts']) == ('w2', 2)
+
+@pytest.mark.asyncio
+async def test_workers_fail_jobs_left_by_another_configuration():
+    queue, _ = make_queue()
+    # Left by an earlier run of the day: a shard's earnings job and a per-symbol job under a bulk config
+    queue.enqueue('earnings', ['all_data'])
+    queue.enqueue('historical', ['AAPL'])
+    collected = []
+
+    async def collect(key):
+        collected.append(key)
+
+    await asyncio.wait_for(run_queued_jobs(queue, {'historical': (['all_data'], collect)}, workers=2), 5)
+    assert collected == ['all_data']
+    assert list(queue.failed_operations()) == ['historical']
+    assert 'not part of this run' in queue.failed_operations()['historical']['AAPL']
+
+def test_complete_and_fail_require_the_lease():
+    queue, collection = make_queue(lease_seconds=600)
+    queue.enqueue('historical', ['AAPL'])
+    stale = queue.lease('w1')
+    collection.documents[0]['lease_expires_at'] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    current = queue.lease('w2')
+    assert queue.renew(stale) is False
+    assert queue.complete(stale) is False
+    assert queue.fail(stale, RuntimeError("late")) is False
+    assert collection.documents[0]['worker_id'] == 'w2'
+    assert queue.renew(current) is True
+    assert queue.complete(current) is True
+    assert collection.documents[0]['state'] == JobQueue.DONE
+
+def test_lease_skips_excluded_jobs():
+    queue, _ = make_queue()
+    queue.enqueue('historical', ['AAPL', 'MSFT'])
+    first = queue.lease('w1')
+    assert queue.lease('w1', exclude_ids={first['_id']})['key'] == 'MSFT'
+
+@pytest.mark.asyncio
+async def test_running_jobs_keep_their_lease():
+    queue, collection = make_queue(lease_seconds=0.3, retry_delay_seconds=0.2)
+    queue.enqueue('historical', ['all_data'])
+    queue.enqueue('news', ['AAPL'])
+    runs = []
+
+    async def collect_history(key):
+        runs.append(key)
+        await asyncio.sleep(0.5)
+        # Another process cannot take over the job once its initial lease has run out
+        assert queue.lease('other-process', ['historical']) is None
+        await asyncio.sleep(0.3)
+
+    async def collect_news(key):
+        raise RuntimeError("429")
+
+    await asyncio.wait_for(run_queued_jobs(queue, {
+        'historical': (['all_data'], collect_history), 'news': (['AAPL'], collect_news)
+    }, workers=2), 10)
+    # The idle worker waits out the news backoff while the history job outlives its initial lease
+    assert runs == ['all_data']
+    history = next(document for document in collection.documents if document['data_type'] == 'historical')
+    assert (history['state'], history['attempts']) == (JobQueue.DONE, 1)
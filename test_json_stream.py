@@ -0,0 +1,44 @@
+import json
+import pytest
+from json_stream import JSONStreamParser
+
+def feed_in_chunks(payload: bytes, size: int):
+    parser = JSONStreamParser()
+    items = []
+    for start in range(0, len(payload), size):
+        items.extend(parser.feed(payload[start:start + size]))
+    items.extend(parser.close())
+    return items
+
+@pytest.mark.parametrize("size", [1, 3, 64, 4096])
+def test_array_elements(size):
+    rows = [{"date": "2023-06-01", "close": 100.5, "name": "café"}, 12345, "text", None, [1, 2]]
+    assert feed_in_chunks(json.dumps(rows).encode(), size) == rows
+
+@pytest.mark.parametrize("size", [1, 5, 4096])
+def test_object_members(size):
+    data = {"General": {"Code": "AAPL"}, "Highlights": {"PERatio": 30.1}, "Count": 42}
+    assert feed_in_chunks(json.dumps(data).encode(), size) == list(data.items())
+
+def test_truncated_stream_raises():
+    parser = JSONStreamParser()
+    parser.feed(b'[{"date": "2023-06-01"}, {"date": ')
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+
+@pytest.mark.parametrize("split", ['{"k0": 1, "k1": 2.', '{"k0": 1, "k1": 2', '{"k0": 1, "k1": 2.5e', '{"k0": 1, "k1": 2.5e-'])
+def test_numbers_split_across_chunks(split):
+    payload = '{"k0": 1, "k1": 2.5e-3, "k2": -4}'
+    parser = JSONStreamParser()
+    items = parser.feed(split.encode())
+    items += parser.feed(payload[len(split):].encode())
+    items += parser.close()
+    assert items == [('k0', 1), ('k1', 0.0025), ('k2', -4)]
+
+def test_split_array_numbers():
+    parser = JSONStreamParser()
+    items = parser.feed(b'[1, -')
+    items += parser.feed(b'2.')
+    items += parser.feed(b'5]')
+    items += parser.close()
+    assert items == [1, -2.5]
@@ -0,0 +1,51 @@
+import pytest
+from metrics import Histogram, Metrics, registry, timed
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.2, 0.5))
+    for value in [0.05] * 50 + [0.15] * 49 + [0.4]:
+        histogram.observe(value)
+    assert histogram.count == 100
+    assert 0.0 < histogram.quantile(0.5) <= 0.1
+    assert 0.2 < histogram.quantile(0.995) <= 0.5
+
+def test_prometheus_and_summary_export():
+    metrics = Metrics()
+    metrics.inc('eodhd_http_responses_total', endpoint='/api/eod/{code}', status=200)
+    metrics.inc('eodhd_http_responses_total', endpoint='/api/eod/{code}', status=200)
+    with metrics.timer('eodhd_http_request_seconds', endpoint='/api/eod/{code}'):
+        pass
+
+    text = metrics.to_prometheus()
+    assert 'eodhd_http_responses_total{endpoint="/api/eod/{code}",status="200"} 2' in text
+    assert 'eodhd_http_request_seconds_bucket{endpoint="/api/eod/{code}",le="+Inf"} 1' in text
+    assert 'eodhd_http_request_seconds_count{endpoint="/api/eod/{code}"} 1' in text
+
+    summary = metrics.summary()
+    assert summary['eodhd_http_responses_total'] == [{'labels': {'endpoint': '/api/eod/{code}', 'status': '200'}, 'value': 2}]
+    assert summary['eodhd_http_request_seconds'][0]['count'] == 1
+
+@pytest.mark.asyncio
+async def test_timed_records_sync_and_async_calls():
+    registry.reset()
+
+    @timed('test_seconds')
+    def store():
+        return 1
+
+    @timed('test_seconds')
+    async def fetch():
+        return 2
+
+    assert store() == 1
+    assert await fetch() == 2
+    methods = {item['labels']['method']: item['count'] for item in registry.summary()['test_seconds']}
+    assert methods == {'store': 1, 'fetch': 1}
+
+def test_histogram_merges_label_sets():
+    metrics = Metrics()
+    metrics.observe('eodhd_http_request_seconds', 0.01, endpoint='/api/news')
+    metrics.observe('eodhd_http_request_seconds', 0.2, endpoint='/api/eod/{code}')
+    merged = metrics.histogram('eodhd_http_request_seconds')
+    assert merged.count == 2
+    assert merged.sum == pytest.approx(0.21)
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from pipeline import CollectionPipeline
+
+@pytest.mark.asyncio
+async def test_pipeline_coalesces_and_reports_failures():
+    writes = []
+
+    async def fetch(data_type, key):
+        if key == 'BAD':
+            raise RuntimeError("fetch failed")
+        return 'historical', 'ALL', [f"{data_type}:{key}"]
+
+    async def store(store_type, store_key, payload):
+        await asyncio.sleep(0.01)
+        writes.append((store_type, store_key, list(payload)))
+
+    pipeline = CollectionPipeline(fetch, store, fetchers=4, writers=1, queue_size=2)
+    failed = await pipeline.run([('historical', key) for key in ['A', 'B', 'C', 'D', 'BAD']])
+
+    assert list(failed['historical']) == ['BAD']
+    assert sorted(item for _, _, payload in writes for item in payload) == [
+        'historical:A', 'historical:B', 'historical:C', 'historical:D'
+    ]
+    assert len(writes) < 4
+    stats = pipeline.stats()
+    assert stats['fetched'] == 4
+    assert stats['payloads_written'] == 4
+    assert stats['max_queue_depth'] <= 2
+
+@pytest.mark.asyncio
+async def test_pipeline_write_failure_marks_all_coalesced_jobs():
+    async def fetch(data_type, key):
+        return 'news', 'AAPL', [key]
+
+    async def store(store_type, store_key, payload):
+        raise RuntimeError("write failed")
+
+    pipeline = CollectionPipeline(fetch, store, fetchers=2, writers=1)
+    failed = await pipeline.run([('news', 'x'), ('news', 'y')])
+    assert set(failed['news']) == {'x', 'y'}
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_symbols_through_store_many():
+    calls = []
+
+    async def fetch(data_type, key):
+        return 'historical', key, [f"{key}:bar"]
+
+    async def store(store_type, store_key, payload):
+        raise AssertionError("list payloads go through store_many")
+
+    async def store_many(store_type, payloads):
+        await asyncio.sleep(0.01)
+        calls.append(dict(payloads))
+        return {'BAD': RuntimeError("write failed")} if 'BAD' in payloads else {}
+
+    pipeline = CollectionPipeline(fetch, store, fetchers=4, writers=1, store_many=store_many)
+    failed = await pipeline.run([('historical', key) for key in ['A', 'B', 'C', 'D', 'BAD']])
+
+    assert list(failed['historical']) == ['BAD']
+    assert sorted(key for payloads in calls for key in payloads) == ['A', 'B', 'BAD', 'C', 'D']
+    assert len(calls) < 5
+    assert pipeline.stats()['payloads_written'] == 4
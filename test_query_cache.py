@@ -0,0 +1,31 @@
+import pandas as pd
+from query_cache import QueryCache, estimate_size
+
+def test_lru_eviction_by_size():
+    cache = QueryCache(max_bytes=estimate_size([{"close": 1.0}]) * 2)
+    cache.set('a', [{"close": 1.0}], [('historical_data', 'A')])
+    cache.set('b', [{"close": 2.0}], [('historical_data', 'B')])
+    assert cache.get('a') is not None
+    cache.set('c', [{"close": 3.0}], [('historical_data', 'C')])
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_invalidation_by_symbol_and_data_type():
+    cache = QueryCache()
+    frame = pd.DataFrame({"close": [1.0, 2.0]})
+    cache.set('aapl', frame, [('historical_data', 'AAPL')])
+    cache.set('msft', frame, [('historical_data', 'MSFT')])
+    cache.set('ipos', frame, [('ipos', None)])
+    cache.invalidate('historical_data', 'AAPL')
+    assert cache.get('aapl') is None
+    assert cache.get('msft') is not None
+    cache.invalidate('ipos', 'ANY')
+    assert cache.get('ipos') is None
+
+def test_results_read_before_an_invalidation_are_not_stored():
+    cache = QueryCache()
+    generation = cache.generation
+    cache.invalidate('news_data', 'AAPL')
+    cache.set('news', [{"title": "stale"}], [('news_data', 'AAPL')], generation=generation)
+    assert cache.get('news') is None
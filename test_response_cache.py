@@ -0,0 +1,66 @@
+import sqlite3
+import time
+import pytest
+from response_cache import ResponseCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttls={'/api/fundamentals/': 60}, max_bytes=200)
+    yield cache
+    cache.close()
+
+def test_cache_hit_ignores_api_token(cache):
+    cache.set('/api/fundamentals/AAPL', {'api_token': 'a', 'fmt': 'json'}, {"General": {"Code": "AAPL"}})
+    assert cache.get('/api/fundamentals/AAPL', {'api_token': 'b', 'fmt': 'json'}) == {"General": {"Code": "AAPL"}}
+    assert cache.stats()['hits'] == 1
+
+def test_cache_skips_endpoints_without_ttl(cache):
+    cache.set('/api/eod/AAPL', {'period': 'd'}, [{"date": "2023-06-01"}])
+    assert cache.get('/api/eod/AAPL', {'period': 'd'}) is None
+    assert cache.stats()['stores'] == 0
+
+def test_cache_expires_entries(cache, monkeypatch):
+    cache.set('/api/fundamentals/AAPL', {}, {"General": {}})
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    assert cache.get('/api/fundamentals/AAPL', {}) is None
+    assert cache.stats()['expired'] == 1
+
+def test_cache_evicts_least_recently_used(cache):
+    payload = {"data": "x" * 60}
+    cache.set('/api/fundamentals/AAPL', {}, payload)
+    cache.set('/api/fundamentals/MSFT', {}, payload)
+    assert cache.get('/api/fundamentals/AAPL', {}) == payload
+    cache.set('/api/fundamentals/TSLA', {}, payload)
+    assert cache.get('/api/fundamentals/MSFT', {}) is None
+    assert cache.get('/api/fundamentals/AAPL', {}) == payload
+    assert cache.stats()['evictions'] == 1
+
+def test_cache_hits_buffer_access_times(cache, tmp_path):
+    cache.set('/api/fundamentals/AAPL', {}, {"General": {}})
+    reader = sqlite3.connect(str(tmp_path / 'cache.sqlite'))
+    stored = reader.execute('SELECT accessed_at FROM responses').fetchone()[0]
+    time.sleep(0.01)
+    assert cache.get('/api/fundamentals/AAPL', {}) == {"General": {}}
+    assert reader.execute('SELECT accessed_at FROM responses').fetchone()[0] == stored
+    cache.flush()
+    assert reader.execute('SELECT accessed_at FROM responses').fetchone()[0] > stored
+    reader.close()
+
+def test_cache_evicts_by_the_size_of_all_processes(cache, tmp_path):
+    # Another shard sharing the database file
+    other = ResponseCache(str(tmp_path / 'cache.sqlite'), ttls={'/api/fundamentals/': 60}, max_bytes=200)
+    payload = {"data": "x" * 60}
+    cache.set('/api/fundamentals/AAPL', {}, payload)
+    other.set('/api/fundamentals/MSFT', {}, payload)
+    cache.set('/api/fundamentals/TSLA', {}, payload)
+    other.close()
+    assert cache.get('/api/fundamentals/AAPL', {}) is None
+    assert cache.stats()['bytes'] <= 200
+
+@pytest.mark.asyncio
+async def test_cache_async_calls(cache):
+    await cache.set_async('/api/fundamentals/AAPL', {}, {"General": {}})
+    assert await cache.get_async('/api/fundamentals/AAPL', {}) == {"General": {}}
+    await cache.flush_async()
+    assert cache.stats()['hits'] == 1
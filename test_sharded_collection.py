@@ -0,0 +1,79 @@
+import asyncio
+import multiprocessing
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from async_eodhd_api import SharedTokenBucket
+from data_collection import DataCollector
+from sharded_collection import SHARED_DATA_TYPES, _collect_bulk, _run_shard, plan_shard_groups, shard_for, shard_symbols
+
+def test_shard_symbols_is_stable_and_complete():
+    symbols = [f"SYM{i}" for i in range(100)]
+    shards = shard_symbols(symbols, 4)
+    assert sorted(s for shard in shards for s in shard) == sorted(symbols)
+    assert shards == shard_symbols(symbols, 4)
+    for index, shard in enumerate(shards):
+        assert all(shard_for(symbol, 4) == index for symbol in shard)
+
+def _take_tokens(bucket, count):
+    async def take():
+        for _ in range(count):
+            await bucket.acquire()
+    asyncio.run(take())
+
+def test_shared_token_bucket_limits_across_processes():
+    context = multiprocessing.get_context('spawn')
+    bucket = SharedTokenBucket(requests_per_minute=600, burst=2, context=context)
+    start = time.monotonic()
+    workers = [context.Process(target=_take_tokens, args=(bucket, 4)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    # 8 tokens at 10/s with a burst of 2 need at least 0.6 s in total
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert time.monotonic() - start >= 0.6
+
+@pytest.mark.asyncio
+async def test_shared_token_bucket_pause():
+    bucket = SharedTokenBucket(requests_per_minute=6000, burst=1)
+    bucket.pause(0.2)
+    assert await bucket.acquire() >= 0.15
+
+def test_shards_only_backfill_symbols_missing_from_the_bulk_data():
+    # Shard 0 collects the shared data types; bulk-covered symbols are not fetched again
+    groups = plan_shard_groups(0, ['AAPL', 'NEW', 'VOD.LSE'], ['NEW', 'VOD.LSE', 'OTHER'], ['VOD.LSE'])
+    assert groups == [
+        (['AAPL', 'NEW', 'VOD.LSE'], ('news', 'trends') + SHARED_DATA_TYPES, {}),
+        (['NEW', 'VOD.LSE'], ('historical',), {'incremental': True}),
+        (['VOD.LSE'], ('fundamental',), {})
+    ]
+    assert plan_shard_groups(1, ['AAPL'], ['NEW'], None) == [(['AAPL'], ('fundamental', 'news', 'trends'), {})]
+    assert plan_shard_groups(1, [], [], []) == []
+    assert plan_shard_groups(0, [], None, None) == [([], SHARED_DATA_TYPES, {})]
+
+def test_bulk_data_is_fetched_once_by_the_coordinator():
+    collector = MagicMock()
+    collector.__aenter__ = AsyncMock(return_value=collector)
+    collector.__aexit__ = AsyncMock(return_value=False)
+    collector.collect_and_store_bulk_last_day = AsyncMock(return_value=['NEW'])
+    collector.collect_and_store_bulk_fundamental_data = AsyncMock(return_value=['GONE'])
+    failed = {}
+    with patch('sharded_collection.DataCollector', return_value=collector) as data_collector:
+        data_collector._exchange_symbol_map = DataCollector._exchange_symbol_map
+        result = asyncio.run(_collect_bulk('token', 'uri', 'US', ['AAPL', 'GONE', 'NEW', 'VOD.LSE'], True, failed))
+    assert result == (['NEW'], ['GONE', 'VOD.LSE'])
+    collector.collect_and_store_bulk_last_day.assert_awaited_once()
+    collector.collect_and_store_bulk_fundamental_data.assert_awaited_once_with(
+        'US', ['AAPL', 'GONE', 'NEW'], sections=None
+    )
+    assert failed == {}
+
+def test_shard_groups_share_one_closed_response_cache():
+    groups = [(['AAPL'], ('news',), {}), (['AAPL'], ('historical',), {'incremental': True})]
+    with patch('sharded_collection.collecting_data', AsyncMock(return_value={})) as collect, \
+            patch('sharded_collection.ResponseCache') as response_cache:
+        assert _run_shard(1, groups, 'token', 'uri', cache_path='cache.sqlite') == {}
+    response_cache.assert_called_once_with('cache.sqlite')
+    assert [call.kwargs['cache'] for call in collect.call_args_list] == [response_cache.return_value] * 2
+    response_cache.return_value.close.assert_called_once()